@@ -1,5 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+
+from games_platform.pagination import EstimatedCountPaginator
 from .models import CustomUser
 from .forms import CustomUserCreationForm
 
@@ -9,6 +11,9 @@ class CustomUserAdmin(UserAdmin):
     model = CustomUser
     list_display = ['username', 'email', 'user_type', 'is_staff', 'created_at']
     list_filter = ['user_type', 'is_staff', 'is_active']
+    # Без точного COUNT(*) по всей таблице на каждую загрузку списка
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     fieldsets = UserAdmin.fieldsets + (
         (None, {'fields': ('user_type', 'bio', 'avatar', 'created_at')}),
     )
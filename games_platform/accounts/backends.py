@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from .models import user_cache_key
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который берет request.user из кеша, а не из БД.
+
+    Кеш сбрасывается в CustomUser.save()/delete(), то есть при
+    user_edit, user_toggle_active и user_delete.
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+
+        return user if self.user_can_authenticate(user) else None
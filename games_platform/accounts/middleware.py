@@ -1,3 +1,7 @@
+from games.jobs import enqueue
+from games_platform.ratelimit import client_ip
+
+
 class LastIPMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -5,15 +9,8 @@ class LastIPMiddleware:
     def __call__(self, request):
         response = self.get_response(request)
 
-        # Сохраняем IP при успешном входе
+        # Сохраняем IP при успешном входе (запись - в фоновой задаче)
         if request.user.is_authenticated and request.path == '/login/' and request.method == 'POST':
-            x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-            if x_forwarded_for:
-                ip = x_forwarded_for.split(',')[0]
-            else:
-                ip = request.META.get('REMOTE_ADDR')
-
-            request.user.last_login_ip = ip
-            request.user.save()
+            enqueue('accounts.record_login_ip', {'user_id': request.user.pk, 'ip': client_ip(request)})
 
         return response
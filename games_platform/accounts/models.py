@@ -1,7 +1,13 @@
 from django.contrib.auth.models import AbstractUser
+from django.core.cache import cache
 from django.db import models
 
 
+def user_cache_key(user_id):
+    """Ключ кеша строки пользователя для CachedModelBackend"""
+    return f'accounts:user:{user_id}'
+
+
 class CustomUser(AbstractUser):
     USER_TYPE_CHOICES = (
         ('player', 'Игрок'),
@@ -27,9 +33,26 @@ class CustomUser(AbstractUser):
     is_active = models.BooleanField(default=True, verbose_name='Активен')
     last_login_ip = models.GenericIPAddressField(null=True, blank=True, verbose_name='IP последнего входа')
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Фильтры и счетчики в списке пользователей
+            models.Index(fields=['user_type', 'is_active'], name='user_type_active_idx'),
+        ]
+
     def __str__(self):
         return f"{self.username} ({self.get_user_type_display()})"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Редактирование, блокировка и т.п. сбрасывают закешированного пользователя
+        cache.delete(user_cache_key(self.pk))
+
+    def delete(self, *args, **kwargs):
+        user_id = self.pk
+        result = super().delete(*args, **kwargs)
+        cache.delete(user_cache_key(user_id))
+        return result
+
     def is_owner(self):
         return self.user_type == 'owner'
 
@@ -0,0 +1,11 @@
+from django.core.cache import cache
+
+from games.jobs import job
+from .models import CustomUser, user_cache_key
+
+
+@job('accounts.record_login_ip')
+def record_login_ip(user_id, ip):
+    """Сохранить IP последнего входа одним UPDATE, без полного save() пользователя"""
+    CustomUser.objects.filter(pk=user_id).update(last_login_ip=ip)
+    cache.delete(user_cache_key(user_id))
@@ -1,3 +1,120 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from games.models import Game, Comment
+from .models import CustomUser, user_cache_key
+
+
+def auth_queries(context):
+    """Запросы за сессией или пользователем"""
+    return [
+        q['sql'] for q in context.captured_queries
+        if 'django_session' in q['sql'] or 'accounts_customuser' in q['sql']
+    ]
+
+
+class CachedUserTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = CustomUser.objects.create_user(
+            username='owner', password='pass12345', user_type='owner'
+        )
+        self.player = CustomUser.objects.create_user(
+            username='player', password='pass12345', user_type='player'
+        )
+        self.game = Game.objects.create(
+            title='Test game', description='Описание', developer=self.owner,
+            html_file='games/html/index.html', status='approved',
+        )
+
+    def play(self, client):
+        return client.post(
+            reverse('increment_play_count', args=[self.game.pk]),
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+
+    def test_hot_path_makes_no_auth_queries(self):
+        self.client.force_login(self.player)
+        self.play(self.client)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.play(self.client)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(auth_queries(queries), [])
+
+    def test_user_edit_invalidates_cache(self):
+        self.client.force_login(self.player)
+        self.play(self.client)
+        self.assertIsNotNone(cache.get(user_cache_key(self.player.pk)))
+
+        admin_client = self.client_class()
+        admin_client.force_login(self.owner)
+        admin_client.post(reverse('user_edit', args=[self.player.pk]), {
+            'username': 'player', 'email': 'p@example.com', 'user_type': 'developer',
+            'bio': '', 'is_active': 'on',
+        })
+
+        self.assertIsNone(cache.get(user_cache_key(self.player.pk)))
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(response.context['user'].user_type, 'developer')
+
+    def test_toggle_active_logs_user_out(self):
+        self.client.force_login(self.player)
+        self.play(self.client)
+
+        admin_client = self.client_class()
+        admin_client.force_login(self.owner)
+        admin_client.get(reverse('user_toggle_active', args=[self.player.pk]))
+
+        response = self.play(self.client)
+        self.assertEqual(response.status_code, 302)
+
+    def test_user_delete_invalidates_cache(self):
+        self.client.force_login(self.player)
+        self.play(self.client)
+
+        admin_client = self.client_class()
+        admin_client.force_login(self.owner)
+        admin_client.post(reverse('user_delete', args=[self.player.pk]))
+
+        self.assertIsNone(cache.get(user_cache_key(self.player.pk)))
+        response = self.play(self.client)
+        self.assertEqual(response.status_code, 302)
+
+
+class UserDeletionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = CustomUser.objects.create_user(username='owner', password='pass12345', user_type='owner')
+        self.developer = CustomUser.objects.create_user(
+            username='prolific', password='pass12345', user_type='developer'
+        )
+        for i in range(3):
+            game = Game.objects.create(
+                title=f'Game {i}', description='Описание', developer=self.developer,
+                html_file='games/html/index.html', status='approved',
+            )
+            Comment.objects.create(user=self.owner, game=game, text='Комментарий')
+        self.client.force_login(self.owner)
+
+    def test_user_is_hidden_then_deleted_in_background(self):
+        self.client.post(reverse('user_delete', args=[self.developer.pk]))
+
+        self.developer.refresh_from_db()
+        self.assertFalse(self.developer.is_active)
+        self.assertFalse(Game.objects.filter(developer=self.developer).exclude(status='deleting').exists())
+        users = self.client.get(reverse('user_list')).context['users']
+        self.assertNotIn(self.developer, users)
+
+        call_command('process_deletions', '--batch-size', '1', stdout=StringIO())
 
-# Create your tests here.
+        self.assertFalse(CustomUser.objects.filter(pk=self.developer.pk).exists())
+        self.assertFalse(Game.objects.filter(developer_id=self.developer.pk).exists())
+        self.assertEqual(Comment.objects.count(), 0)
@@ -4,10 +4,15 @@ from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Q
+from games.deletion import pending_user_deletion_ids, schedule_user_deletion
+from games.page_cache import anonymous_page_cache
+from games_platform.routers import read_from_replica
 from .forms import CustomUserCreationForm, LoginForm, UserEditForm, UserAdminCreateForm
 from .models import CustomUser
 
 
+@anonymous_page_cache()
+@read_from_replica
 def home(request):
     context = {}
 
@@ -15,6 +20,8 @@ def home(request):
         Game = apps.get_model('games', 'Game')
         recent_games = Game.objects.filter(status='approved').order_by('-created_at')[:3]
         context['recent_games'] = recent_games
+        RecentlyPlayed = apps.get_model('games', 'RecentlyPlayed')
+        context['continue_playing'] = RecentlyPlayed.games_for(request.user.pk, limit=3)
 
     return render(request, 'accounts/home.html', context)
 
@@ -61,7 +68,11 @@ def user_logout(request):
 
 @login_required
 def profile(request):
-    return render(request, 'accounts/profile.html', {'user': request.user})
+    RecentlyPlayed = apps.get_model('games', 'RecentlyPlayed')
+    return render(request, 'accounts/profile.html', {
+        'user': request.user,
+        'recently_played': RecentlyPlayed.games_for(request.user.pk),
+    })
 
 
 @login_required
@@ -71,7 +82,10 @@ def user_list(request):
         messages.error(request, 'Доступ только для администраторов')
         return redirect('home')
 
-    users = CustomUser.objects.all().order_by('-date_joined')
+    # Пользователи в очереди на удаление уже скрыты
+    users = CustomUser.objects.exclude(
+        pk__in=pending_user_deletion_ids()
+    ).order_by('-date_joined')
 
     # Поиск пользователей
     search_query = request.GET.get('search', '')
@@ -121,7 +135,7 @@ def user_detail(request, pk):
     # Получаем игры пользователя
     Game = apps.get_model('games', 'Game')
     if user.is_developer() or user.is_admin():
-        user_games = Game.objects.filter(developer=user)
+        user_games = Game.objects.filter(developer=user).exclude(status='deleting')
     else:
         user_games = None
 
@@ -234,7 +248,8 @@ def user_delete(request, pk):
 
     if request.method == 'POST':
         username = user.username
-        user.delete()
+        # Пользователь сразу блокируется, а его данные удаляются порциями в фоне
+        schedule_user_deletion(user, request.user)
         messages.success(request, f'Пользователь {username} удален')
         return redirect('user_list')
 
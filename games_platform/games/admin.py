@@ -1,23 +1,135 @@
 from django.contrib import admin
-from .models import Game
+
+from games_platform.pagination import EstimatedCountPaginator
+from .models import Game, Tag, DeletionTask, Job, ModerationEvent, GameSave
+from .moderation import STATUS_ACTIONS, moderate, moderate_queryset
 
 
 @admin.register(Game)
 class GameAdmin(admin.ModelAdmin):
-    list_display = ['title', 'developer', 'status', 'created_at']
+    list_display = ['title', 'developer', 'status', 'views', 'plays', 'rating', 'created_at']
     list_filter = ['status', 'created_at']
     search_fields = ['title', 'description', 'developer__username']
     list_editable = ['status']
+    list_select_related = ['developer']
+    filter_horizontal = ['tags']
     actions = ['approve_games', 'reject_games']
+    # Без точного COUNT(*) по всей таблице на каждую загрузку списка
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # Статистика строк страницы - подзапросами в том же SELECT, а не запросом на строку
+        queryset = super().get_queryset(request)
+        if request.resolver_match and request.resolver_match.url_name.endswith('_changelist'):
+            queryset = queryset.with_stats('view_count', 'play_count')
+        return queryset
+
+    def save_model(self, request, obj, form, change):
+        # Смена статуса в форме или прямо в списке тоже попадает в журнал модерации
+        action = STATUS_ACTIONS.get(obj.status)
+        if change and action and 'status' in form.changed_data:
+            obj.status = form.initial['status']
+            moderate(obj, action, request.user, source='admin')
+        else:
+            super().save_model(request, obj, form, change)
+
+    # Сортировка - по хранимым столбцам, а не по аннотациям: подзапрос с агрегатом
+    # пришлось бы вычислить для каждой строки таблицы. Просмотры и запуски сортируются
+    # по свернутым в GameStat итогам (без еще не свернутых шардов), рейтинг - по rating_score
+
+    def views(self, obj):
+        return obj.view_count
+
+    views.short_description = 'Просмотры'
+    views.admin_order_field = 'stats__views'
+
+    def plays(self, obj):
+        return obj.play_count
+
+    plays.short_description = 'Запуски'
+    plays.admin_order_field = 'stats__play_count'
+
+    def rating(self, obj):
+        return round(obj.rating_sum / obj.rating_votes, 1) if obj.rating_votes else 0
+
+    rating.short_description = 'Рейтинг'
+    rating.admin_order_field = 'rating_score'
 
     def approve_games(self, request, queryset):
-        queryset.update(status='approved')
+        moderate_queryset(queryset, 'approve', request.user)
         self.message_user(request, 'Выбранные игры одобрены')
 
     approve_games.short_description = 'Одобрить выбранные игры'
 
     def reject_games(self, request, queryset):
-        queryset.update(status='rejected')
+        moderate_queryset(queryset, 'reject', request.user)
         self.message_user(request, 'Выбранные игры отклонены')
 
     reject_games.short_description = 'Отклонить выбранные игры'
+
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ['name', 'slug']
+    search_fields = ['name']
+    prepopulated_fields = {'slug': ['name']}
+
+
+@admin.register(DeletionTask)
+class DeletionTaskAdmin(admin.ModelAdmin):
+    list_display = ['target_repr', 'target_type', 'status', 'progress', 'deleted_rows', 'total_rows',
+                    'requested_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'target_type']
+    readonly_fields = [field.name for field in DeletionTask._meta.fields]
+
+    def progress(self, obj):
+        return f'{obj.get_progress()}%'
+
+    progress.short_description = 'Прогресс'
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'attempts', 'max_attempts', 'run_at', 'locked_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'name']
+    readonly_fields = [field.name for field in Job._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ModerationEvent)
+class ModerationEventAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'moderator_name', 'action', 'game_title', 'from_status', 'to_status', 'source']
+    list_filter = ['action', 'source']
+    search_fields = ['game_title', 'moderator_name']
+    date_hierarchy = 'created_at'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(GameSave)
+class GameSaveAdmin(admin.ModelAdmin):
+    """Слоты можно посмотреть и удалить; состояние меняет только игра через API"""
+    list_display = ['user', 'game', 'slot', 'version', 'size', 'stored_size', 'updated_at']
+    list_select_related = ['user', 'game']
+    search_fields = ['user__username', 'game__title', 'slot']
+    readonly_fields = [field.name for field in GameSave._meta.fields]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,384 @@
+import base64
+import hashlib
+import json
+import math
+from datetime import datetime
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_GET, require_http_methods
+
+from games_platform.ratelimit import rate_limit
+from games_platform.routers import read_from_replica
+from . import saves
+from .autocomplete import title_index
+from .models import Game, Comment
+
+API_VERSION = 1
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Поле API -> (поле запроса, аннотация with_stats или None)
+GAME_FIELDS = {
+    'id': ('pk', None),
+    'title': ('title', None),
+    'description': ('description', None),
+    'developer': ('developer__username', None),
+    'thumbnail': ('thumbnail', None),
+    'created_at': ('created_at', None),
+    'published_at': ('published_at', None),
+    'views': ('view_count', 'view_count'),
+    'plays': ('play_count', 'play_count'),
+    'likes': ('like_count', 'like_count'),
+    'dislikes': ('dislike_count', 'dislike_count'),
+    'rating': ('average_rating', 'average_rating'),
+    'rating_count': ('rating_votes', None),
+    'score': ('rating_score', None),
+    'comments': ('comment_count', 'comment_count'),
+}
+STAT_ANNOTATIONS = {stat for _, stat in GAME_FIELDS.values() if stat}
+LIST_FIELDS = ['id', 'title', 'developer', 'thumbnail', 'created_at', 'views', 'plays', 'rating']
+
+# Счетчики для пакетного запроса с карточек (GameStats в static/js/game-stats.js)
+STATS_FIELDS = ['views', 'plays', 'likes', 'dislikes', 'rating', 'rating_count', 'comments']
+MAX_STATS_IDS = 300
+
+COMMENT_FIELDS = {
+    'id': 'pk',
+    'user': 'user__username',
+    'text': 'text',
+    'created_at': 'created_at',
+    'is_edited': 'is_edited',
+}
+
+# Таблица лидеров: (условие отбора, поле сортировки по убыванию)
+LEADERBOARDS = {
+    'best-rated': ({'rating_votes__gt': 0}, 'rating_score'),
+    'most-viewed': ({}, 'view_count'),
+    'most-played': ({}, 'play_count'),
+}
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _json_response(request, data, status=200):
+    body = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+    etag = quote_etag(hashlib.md5(body).hexdigest())
+    if status == 200:
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return response
+    response = HttpResponse(body, status=status, content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def api_view(view_func):
+    """GET-представление API: чтение с реплики, ошибки в JSON, ETag и 304"""
+    @require_GET
+    @read_from_replica
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        try:
+            data = view_func(request, *args, **kwargs)
+        except ApiError as exc:
+            return _json_response(request, {'error': str(exc)}, status=exc.status)
+        except Http404:
+            return _json_response(request, {'error': 'Не найдено'}, status=404)
+        return _json_response(request, data)
+
+    return wrapper
+
+
+def save_api_view(methods):
+    """Облачные сохранения: только для вошедших, без реплики (версия должна быть свежей).
+
+    Конфликт версий - 409 с текущей версией слота в поле version.
+    """
+    def decorator(view_func):
+        @require_http_methods(methods)
+        @rate_limit('game_save', methods=('PUT', 'PATCH', 'DELETE'))
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                return _json_response(request, {'error': 'Требуется вход'}, status=401)
+            try:
+                data = view_func(request, *args, **kwargs)
+            except saves.SaveConflict as exc:
+                return _json_response(request, {'error': str(exc), 'version': exc.version}, status=409)
+            except (ApiError, saves.SaveError) as exc:
+                return _json_response(request, {'error': str(exc)}, status=exc.status)
+            except Http404:
+                return _json_response(request, {'error': 'Не найдено'}, status=404)
+            return _json_response(request, data)
+
+        return wrapper
+
+    return decorator
+
+
+def _requested_fields(request, default):
+    """Поля из ?fields=a,b,c (неизвестные - ошибка 400)"""
+    raw = request.GET.get('fields')
+    if not raw:
+        return default
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in GAME_FIELDS]
+    if unknown:
+        raise ApiError('Неизвестные поля: ' + ', '.join(unknown))
+    return fields
+
+
+def _page_size(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ApiError('limit должен быть числом')
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def encode_cursor(value, pk):
+    if isinstance(value, datetime):
+        # DjangoJSONEncoder обрезает до миллисекунд - курсору нужна полная точность
+        value = value.isoformat()
+    raw = json.dumps([value, pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _cursor_value(value, order_field):
+    """Значение из курсора того же типа, что order_field, или None"""
+    if order_field == 'created_at':
+        value = parse_datetime(value) if isinstance(value, str) else None
+        return value if value is not None and value.tzinfo is not None else None
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+        return value
+    return None
+
+
+def decode_cursor(cursor, order_field):
+    """(значение order_field, pk) из курсора; подделанный курсор - ошибка 400"""
+    try:
+        value, pk = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        value = _cursor_value(value, order_field)
+    except (ValueError, TypeError):
+        value = None
+    if value is None or not isinstance(pk, int) or isinstance(pk, bool):
+        raise ApiError('Некорректный cursor')
+    return value, pk
+
+
+def paginate(request, queryset, order_field):
+    """Курсорная пагинация: order_field по убыванию, при равенстве - pk по возрастанию.
+
+    Курсор - значения последней строки страницы, поэтому следующая страница -
+    это индексный диапазон, а не OFFSET. pk по возрастанию совпадает с порядком
+    rowid внутри индекса (status, -order_field), и SQLite не сортирует строки.
+    """
+    limit = _page_size(request)
+    queryset = queryset.order_by(f'-{order_field}', 'pk')
+
+    cursor = request.GET.get('cursor')
+    if cursor:
+        value, pk = decode_cursor(cursor, order_field)
+        queryset = queryset.filter(
+            Q(**{f'{order_field}__lt': value}) | Q(**{order_field: value, 'pk__gt': pk})
+        )
+
+    rows = list(queryset[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][order_field], rows[-1]['pk'])
+    return rows, next_cursor
+
+
+def _game_rows(queryset, fields, extra=()):
+    """values() только по запрошенным полям (+ служебные для курсора)"""
+    lookups = {GAME_FIELDS[name][0] for name in fields} | {'pk', *extra}
+    stats = lookups & STAT_ANNOTATIONS
+    if stats:
+        queryset = queryset.with_stats(*stats)
+    return queryset.values(*lookups)
+
+
+def _serialize_game(row, fields):
+    game = {}
+    for name in fields:
+        value = row[GAME_FIELDS[name][0]]
+        if name == 'thumbnail':
+            value = default_storage.url(value) if value else None
+        elif name == 'rating':
+            value = round(value, 1)
+        elif name == 'score':
+            value = round(value, 2)
+        game[name] = value
+    return game
+
+
+def _approved_games():
+    return Game.objects.filter(status='approved')
+
+
+@api_view
+def game_list(request):
+    """Каталог одобренных игр, новые первыми"""
+    fields = _requested_fields(request, LIST_FIELDS)
+    rows, next_cursor = paginate(request, _game_rows(_approved_games(), fields, ['created_at']), 'created_at')
+    return {
+        'version': API_VERSION,
+        'results': [_serialize_game(row, fields) for row in rows],
+        'next': next_cursor,
+    }
+
+
+def _requested_ids(request):
+    """ID из ?ids=1,2,3 (не больше MAX_STATS_IDS)"""
+    try:
+        ids = {int(value) for value in request.GET.get('ids', '').split(',') if value.strip()}
+    except ValueError:
+        raise ApiError('ids должны быть числами через запятую')
+    if not ids:
+        raise ApiError('Не переданы ids')
+    if len(ids) > MAX_STATS_IDS:
+        raise ApiError(f'Не больше {MAX_STATS_IDS} ids за запрос')
+    return ids
+
+
+@api_view
+def game_stats(request):
+    """Счетчики многих игр одним запросом к БД; неизвестные ID пропускаются"""
+    rows = _game_rows(_approved_games().filter(pk__in=_requested_ids(request)), STATS_FIELDS)
+    return {
+        'version': API_VERSION,
+        'results': {row['pk']: _serialize_game(row, STATS_FIELDS) for row in rows},
+    }
+
+
+@api_view
+def game_suggest(request):
+    """Подсказки поиска по префиксу ?q= из индекса в памяти, популярные первыми"""
+    return {
+        'version': API_VERSION,
+        'results': [
+            {'id': pk, 'title': title, 'url': reverse('game_detail', args=[pk])}
+            for pk, title in title_index.suggest(request.GET.get('q', ''))
+        ],
+    }
+
+
+@api_view
+def game_detail(request, pk):
+    """Одна одобренная игра, по умолчанию со всеми полями"""
+    fields = _requested_fields(request, list(GAME_FIELDS))
+    row = get_object_or_404(_game_rows(_approved_games(), fields), pk=pk)
+    return {'version': API_VERSION, 'result': _serialize_game(row, fields)}
+
+
+@api_view
+def leaderboard(request, board):
+    """Таблица лидеров (LEADERBOARDS) с курсорной пагинацией"""
+    if board not in LEADERBOARDS:
+        raise ApiError('Неизвестная таблица лидеров', status=404)
+    condition, order_field = LEADERBOARDS[board]
+    fields = _requested_fields(request, LIST_FIELDS)
+    queryset = _game_rows(_approved_games().filter(**condition), fields, [order_field])
+    rows, next_cursor = paginate(request, queryset, order_field)
+    return {
+        'version': API_VERSION,
+        'results': [_serialize_game(row, fields) for row in rows],
+        'next': next_cursor,
+    }
+
+
+@api_view
+def game_comments(request, pk):
+    """Комментарии игры, новые первыми"""
+    game = get_object_or_404(_approved_games().only('pk'), pk=pk)
+    lookups = list(COMMENT_FIELDS.values())
+    queryset = Comment.objects.filter(game=game).values(*lookups)
+    rows, next_cursor = paginate(request, queryset, 'created_at')
+    return {
+        'version': API_VERSION,
+        'results': [{name: row[lookup] for name, lookup in COMMENT_FIELDS.items()} for row in rows],
+        'next': next_cursor,
+    }
+
+
+def _save_body(request):
+    """JSON-объект тела запроса записи сохранения"""
+    # Служебные поля сверх самого состояния укладываются в килобайт
+    if len(request.body) > settings.SAVE_MAX_BYTES + 1024:
+        raise ApiError(f'Сохранение больше {settings.SAVE_MAX_BYTES} байт', status=413)
+    try:
+        body = json.loads(request.body)
+    except ValueError:
+        raise ApiError('Некорректный JSON')
+    if not isinstance(body, dict):
+        raise ApiError('Ожидается JSON-объект')
+    return body
+
+
+def _save_version(value):
+    if isinstance(value, str) and value.isdigit():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise ApiError('version должен быть неотрицательным числом')
+    return value
+
+
+@save_api_view(['GET'])
+def game_saves(request, pk):
+    """Слоты сохранений текущего пользователя в игре"""
+    game = get_object_or_404(_approved_games().only('pk'), pk=pk)
+    return {
+        'version': API_VERSION,
+        'results': saves.list_slots(request.user, game),
+        'max_slots': settings.SAVE_MAX_SLOTS,
+        'max_bytes': settings.SAVE_MAX_BYTES,
+    }
+
+
+@save_api_view(['GET', 'PUT', 'PATCH', 'DELETE'])
+def game_save(request, pk, slot):
+    """Слот сохранения: GET - состояние, PUT - замена целиком, PATCH - JSON merge patch, DELETE.
+
+    Запись принимает {"version": N, "data" | "patch": ...}, где N - последняя
+    известная клиенту версия слота (0 - создать слот).
+    """
+    game = get_object_or_404(_approved_games().only('pk'), pk=pk)
+
+    if request.method == 'GET':
+        result = saves.load(request.user, game, slot)
+        if result is None:
+            raise Http404
+        return {'version': API_VERSION, 'result': result}
+
+    if request.method == 'DELETE':
+        saves.delete(request.user, game, slot, _save_version(request.GET.get('version')))
+        return {'version': API_VERSION, 'result': None}
+
+    body = _save_body(request)
+    version = _save_version(body.get('version'))
+    if request.method == 'PUT':
+        if 'data' not in body:
+            raise ApiError('Не передано поле data')
+        result = saves.write(request.user, game, slot, body['data'], version)
+    else:
+        if not isinstance(body.get('patch'), dict):
+            raise ApiError('patch должен быть JSON-объектом')
+        result = saves.patch(request.user, game, slot, body['patch'], version)
+    return {'version': API_VERSION, 'result': result}
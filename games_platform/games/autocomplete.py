@@ -0,0 +1,142 @@
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+
+from .page_cache import catalog_version
+
+# Ключ индексируется с начала каждого из первых MAX_WORDS слов названия
+MAX_WORDS = 5
+# Кешированных ответов на префиксы, после - кеш очищается целиком
+MAX_CACHED_PREFIXES = 10000
+
+
+def normalize(text):
+    """Нижний регистр, ё -> е, слова через один пробел без пунктуации"""
+    return ' '.join(re.findall(r'\w+', text.casefold().replace('ё', 'е')))
+
+
+def title_keys(title):
+    """Хвосты названия от начала каждого слова: "space invaders" -> ..., "invaders" """
+    words = normalize(title).split(' ')
+    return {' '.join(words[i:]) for i in range(min(len(words), MAX_WORDS)) if words[i]}
+
+
+class TitleIndex:
+    """Префиксный индекс названий одобренных игр в памяти процесса.
+
+    entries - отсортированный список (ключ, id игры), префикс ищется бинарным
+    поиском; среди совпадений берутся самые просматриваемые. Ответы на префиксы
+    кешируются и сбрасываются точечно при изменении игры.
+
+    Свои изменения применяются сигналами Game. Изменения в других процессах
+    видны по версии каталога в общем кеше VERSION_CACHE (bump_catalog_version) -
+    тогда индекс перестраивается одним запросом. Популярность и все прочее
+    обновляются не реже раза в AUTOCOMPLETE_REFRESH.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.built = False
+        self.entries = []
+        self.titles = {}  # id -> название
+        self.views = {}  # id -> просмотры на момент перестройки
+        self.prefixes = {}
+        self.version = None
+        self.refresh_at = 0
+
+    def rebuild(self):
+        from .models import Game
+
+        version = catalog_version()
+        rows = Game.objects.filter(status='approved').with_stats('view_count').values_list(
+            'pk', 'title', 'view_count'
+        )
+        titles, views = {}, {}
+        for pk, title, view_count in rows:
+            titles[pk] = title
+            views[pk] = view_count
+        entries = sorted((key, pk) for pk, title in titles.items() for key in title_keys(title))
+        with self._lock:
+            self.titles, self.views, self.entries, self.prefixes = titles, views, entries, {}
+            self.version = version
+            self.refresh_at = time.monotonic() + settings.AUTOCOMPLETE_REFRESH
+            self.built = True
+
+    def _ensure_fresh(self):
+        if not self.built or time.monotonic() >= self.refresh_at or catalog_version() != self.version:
+            self.rebuild()
+
+    def _forget_prefixes(self, keys):
+        for key in keys:
+            for end in range(1, len(key) + 1):
+                self.prefixes.pop(key[:end], None)
+
+    def _remove_locked(self, game_id):
+        title = self.titles.pop(game_id, None)
+        views = self.views.pop(game_id, 0)
+        if title is None:
+            return 0
+        keys = title_keys(title)
+        for key in keys:
+            position = bisect_left(self.entries, (key, game_id))
+            if position < len(self.entries) and self.entries[position] == (key, game_id):
+                del self.entries[position]
+        self._forget_prefixes(keys)
+        return views
+
+    def update(self, game):
+        """Добавить, переименовать или убрать игру (сигнал post_save)"""
+        if not self.built:
+            return
+        with self._lock:
+            views = self._remove_locked(game.pk)
+            if game.status == 'approved':
+                self.titles[game.pk] = game.title
+                self.views[game.pk] = views
+                keys = title_keys(game.title)
+                for key in keys:
+                    insort(self.entries, (key, game.pk))
+                self._forget_prefixes(keys)
+            # Версию каталога уже сдвинул сигнал invalidate_catalog_pages - это наше же изменение
+            self.version = catalog_version()
+
+    def remove(self, game_id):
+        if not self.built:
+            return
+        with self._lock:
+            self._remove_locked(game_id)
+            self.version = catalog_version()
+
+    def _match(self, prefix, limit):
+        start = bisect_left(self.entries, (prefix,))
+        end = bisect_left(self.entries, (prefix + '\uffff',), start)
+        ids = dict.fromkeys(pk for _, pk in self.entries[start:end])
+        return heapq.nlargest(limit, ids, key=self.views.__getitem__)
+
+    def suggest(self, query, limit=None):
+        """До limit игр [(id, название)], чье название или слово в нем начинается с query"""
+        limit = limit or settings.AUTOCOMPLETE_LIMIT
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        self._ensure_fresh()
+
+        with self._lock:
+            ids = self.prefixes.get(prefix) if limit == settings.AUTOCOMPLETE_LIMIT else None
+            if ids is None:
+                ids = self._match(prefix, limit)
+                if limit == settings.AUTOCOMPLETE_LIMIT:
+                    if len(self.prefixes) >= MAX_CACHED_PREFIXES:
+                        self.prefixes = {}
+                    self.prefixes[prefix] = ids
+            return [(pk, self.titles[pk]) for pk in ids]
+
+
+title_index = TitleIndex()
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Sum
+
+from .models import Game, dashboard_cache_key
+
+DASHBOARD_FIELDS = (
+    'pk', 'title', 'status', 'view_count', 'play_count', 'like_count',
+    'average_rating', 'rating_count', 'comment_count',
+)
+
+
+def developer_dashboard_data(developer):
+    """Статистика по играм разработчика и итоги портфеля (кешируется)"""
+    key = dashboard_cache_key(developer.pk)
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    games = Game.objects.filter(developer=developer).exclude(status='deleting').with_stats()
+
+    status_names = dict(Game.STATUS_CHOICES)
+    rows = list(games.values(*DASHBOARD_FIELDS))
+    for row in rows:
+        row['status_display'] = status_names[row['status']]
+        row['average_rating'] = round(row['average_rating'], 1)
+
+    # Итоги портфеля - одним агрегирующим запросом
+    totals = games.aggregate(
+        games=Count('pk'),
+        views=Sum('view_count'),
+        plays=Sum('play_count'),
+        likes=Sum('like_count'),
+        ratings=Sum('rating_count'),
+        rating_sum=Sum(F('average_rating') * F('rating_count')),
+        comments=Sum('comment_count'),
+    )
+    totals = {name: value or 0 for name, value in totals.items()}
+    totals['average_rating'] = (
+        round(totals['rating_sum'] / totals['ratings'], 1) if totals['ratings'] else 0
+    )
+
+    data = {'games': rows, 'totals': totals}
+    cache.set(key, data, settings.DASHBOARD_CACHE_TIMEOUT)
+    return data
@@ -0,0 +1,135 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from .jobs import enqueue, heartbeat
+from .models import (
+    Game, GameRating, Comment, GameStat, GameStatShard, GameViewerSketch, GameSave, GameSaveRecord, DeletionTask
+)
+from .page_cache import bump_catalog_version
+
+User = get_user_model()
+
+
+def _game_steps(game_filter):
+    """Зависимые таблицы игр в порядке удаления, сама игра - последней"""
+    related_filter = {f'game__{key}': value for key, value in game_filter.items()}
+    return [
+        GameRating.objects.filter(**related_filter),
+        Comment.objects.filter(**related_filter),
+        GameStatShard.objects.filter(**related_filter),
+        GameViewerSketch.objects.filter(**related_filter),
+        GameStat.objects.filter(**related_filter),
+        GameSaveRecord.objects.filter(**{f'save_slot__{key}': value for key, value in related_filter.items()}),
+        GameSave.objects.filter(**related_filter),
+        Game.objects.filter(**game_filter),
+    ]
+
+
+def deletion_steps(task):
+    """Список querysets, которые удаляются по очереди порциями"""
+    if task.target_type == 'game':
+        return _game_steps({'pk': task.target_id})
+
+    return _game_steps({'developer_id': task.target_id}) + [
+        GameRating.objects.filter(user_id=task.target_id),
+        Comment.objects.filter(user_id=task.target_id),
+        GameSaveRecord.objects.filter(save_slot__user_id=task.target_id),
+        GameSave.objects.filter(user_id=task.target_id),
+        User.objects.filter(pk=task.target_id),
+    ]
+
+
+def _schedule(target_type, target, requested_by):
+    task = DeletionTask(
+        target_type=target_type,
+        target_id=target.pk,
+        target_repr=str(target)[:255],
+        requested_by=requested_by,
+    )
+    task.total_rows = sum(qs.count() for qs in deletion_steps(task))
+    task.save()
+    enqueue('games.run_deletion', {'task_id': task.pk})
+    return task
+
+
+def schedule_game_deletion(game, requested_by):
+    """Сразу скрыть игру и поставить удаление в очередь.
+
+    Повторный вызов (двойной POST, игра уже удаляется вместе с автором)
+    новую задачу не создает и возвращает уже поставленную или None.
+    """
+    with transaction.atomic():
+        status = Game.objects.select_for_update().filter(pk=game.pk).values_list('status', flat=True).first()
+        existing = DeletionTask.objects.filter(target_type='game', target_id=game.pk).exclude(status='done').first()
+        if status is None or status == 'deleting' or existing is not None:
+            return existing
+        game.status = 'deleting'
+        game.save(update_fields=['status', 'updated_at'])
+        return _schedule('game', game, requested_by)
+
+
+def schedule_user_deletion(user, requested_by):
+    """Сразу заблокировать пользователя, скрыть его игры и поставить удаление в очередь"""
+    with transaction.atomic():
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        Game.objects.filter(developer=user).update(status='deleting', updated_at=timezone.now())
+        bump_catalog_version()
+        return _schedule('user', user, requested_by)
+
+
+def pending_user_deletion_ids():
+    """ID пользователей, которые стоят в очереди на удаление"""
+    return DeletionTask.objects.filter(
+        target_type='user', status__in=['pending', 'running']
+    ).values('target_id')
+
+
+def run_deletion_task(task, batch_size=None):
+    """Удалить объект задачи порциями по batch_size строк, каждая - в своей транзакции"""
+    batch_size = batch_size or settings.DELETION_BATCH_SIZE
+
+    task.status = 'running'
+    task.save(update_fields=['status'])
+
+    try:
+        for queryset in deletion_steps(task):
+            while True:
+                ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+                if not ids:
+                    break
+                with transaction.atomic():
+                    # delete() экземпляров, чтобы сработали сигналы и сброс кешей
+                    objects = queryset.model.objects.filter(pk__in=ids)
+                    if queryset.model in (Game, User):
+                        deleted = sum(obj.delete()[0] for obj in objects)
+                    else:
+                        deleted, _ = objects.delete()
+                    task.deleted_rows += deleted
+                    task.save(update_fields=['deleted_rows'])
+                heartbeat()
+    except Exception as exc:
+        task.status = 'failed'
+        task.error = repr(exc)
+        task.save(update_fields=['status', 'error'])
+        raise
+
+    task.status = 'done'
+    task.finished_at = timezone.now()
+    task.save(update_fields=['status', 'finished_at'])
+    return task
+
+
+def process_pending_deletions(batch_size=None):
+    """Выполнить все задачи удаления из очереди, вернуть число завершенных"""
+    done = 0
+    for task in DeletionTask.objects.filter(status__in=['pending', 'running']):
+        try:
+            run_deletion_task(task, batch_size)
+        except Exception:
+            # Ошибка сохранена в задаче, остальные задачи продолжаем
+            continue
+        done += 1
+    return done
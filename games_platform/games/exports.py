@@ -0,0 +1,115 @@
+import csv
+import json
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, IntegerField
+from django.db.models.functions import Coalesce
+
+from .models import Game, Comment, GameRating, related_aggregate
+
+User = get_user_model()
+
+# Строк в одном запросе к серверному курсору и в одном отдаваемом куске ответа
+EXPORT_CHUNK_SIZE = 2000
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json',
+}
+
+
+def games_queryset():
+    return Game.objects.with_stats().order_by('pk')
+
+
+def users_queryset():
+    return User.objects.annotate(
+        game_count=Coalesce(related_aggregate(Game, Count('pk'), IntegerField(), link='developer'), 0),
+        comment_count=Coalesce(related_aggregate(Comment, Count('pk'), IntegerField(), link='user'), 0),
+        rating_count=Coalesce(related_aggregate(GameRating, Count('pk'), IntegerField(), link='user'), 0),
+    ).order_by('pk')
+
+
+# Набор данных: (queryset, [(колонка в выгрузке, поле запроса), ...])
+DATASETS = {
+    'games': (games_queryset, [
+        ('id', 'pk'),
+        ('title', 'title'),
+        ('developer', 'developer__username'),
+        ('status', 'status'),
+        ('created_at', 'created_at'),
+        ('published_at', 'published_at'),
+        ('views', 'view_count'),
+        ('plays', 'play_count'),
+        ('likes', 'like_count'),
+        ('dislikes', 'dislike_count'),
+        ('average_rating', 'average_rating'),
+        ('rating_count', 'rating_count'),
+        ('comment_count', 'comment_count'),
+    ]),
+    'users': (users_queryset, [
+        ('id', 'pk'),
+        ('username', 'username'),
+        ('email', 'email'),
+        ('user_type', 'user_type'),
+        ('is_active', 'is_active'),
+        ('date_joined', 'date_joined'),
+        ('last_login', 'last_login'),
+        ('game_count', 'game_count'),
+        ('comment_count', 'comment_count'),
+        ('rating_count', 'rating_count'),
+    ]),
+}
+
+
+class _Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def _chunks(rows):
+    while True:
+        chunk = list(islice(rows, EXPORT_CHUNK_SIZE))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _rows(dataset):
+    """Строки выгрузки одним запросом через серверный итератор"""
+    queryset, columns = DATASETS[dataset]
+    lookups = [lookup for _, lookup in columns]
+    return queryset().values_list(*lookups).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def _stream_csv(names, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(names)
+    for chunk in _chunks(rows):
+        yield ''.join(writer.writerow(row) for row in chunk)
+
+
+def _stream_json(names, rows):
+    yield '['
+    separator = ''
+    for chunk in _chunks(rows):
+        yield separator + ','.join(
+            json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder, ensure_ascii=False)
+            for row in chunk
+        )
+        separator = ','
+    yield ']'
+
+
+def stream_export(dataset, fmt):
+    """Генератор кусков выгрузки; память не зависит от числа строк"""
+    _, columns = DATASETS[dataset]
+    names = [name for name, _ in columns]
+    rows = _rows(dataset)
+    if fmt == 'csv':
+        return _stream_csv(names, rows)
+    return _stream_json(names, rows)
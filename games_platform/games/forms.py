@@ -5,9 +5,10 @@ from .models import Game, Comment, GameRating
 class GameForm(forms.ModelForm):
     class Meta:
         model = Game
-        fields = ['title', 'description', 'html_file', 'thumbnail']
+        fields = ['title', 'description', 'tags', 'html_file', 'thumbnail']
         widgets = {
             'description': forms.Textarea(attrs={'rows': 4}),
+            'tags': forms.CheckboxSelectMultiple(),
         }
 
     def clean_html_file(self):
@@ -0,0 +1,46 @@
+import hashlib
+import math
+
+# 2**11 однобайтовых регистров: блоб 2 КБ, стандартная ошибка ~2.3%
+PRECISION = 11
+REGISTER_COUNT = 1 << PRECISION
+_VALUE_BITS = 64 - PRECISION
+_ALPHA = 0.7213 / (1 + 1.079 / REGISTER_COUNT)
+
+
+def empty():
+    return bytes(REGISTER_COUNT)
+
+
+def position(value):
+    """Регистр и ранг значения: первые PRECISION бит хеша - номер регистра,
+    ранг - позиция первой единицы в остальных битах"""
+    digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+    x = int.from_bytes(digest, 'big')
+    index = x >> _VALUE_BITS
+    rest = x & ((1 << _VALUE_BITS) - 1)
+    return index, _VALUE_BITS - rest.bit_length() + 1
+
+
+def add(registers, value):
+    """Добавить значение в bytearray регистров; True, если скетч изменился"""
+    index, rank = position(value)
+    if registers[index] >= rank:
+        return False
+    registers[index] = rank
+    return True
+
+
+def merge(*sketches):
+    """Объединение скетчей (дни, процессы) - поэлементный максимум"""
+    return bytes(map(max, *sketches)) if len(sketches) > 1 else bytes(sketches[0])
+
+
+def count(registers):
+    """Оценка числа различных значений"""
+    estimate = _ALPHA * REGISTER_COUNT ** 2 / sum(2.0 ** -r for r in registers)
+    zeros = registers.count(0)
+    if estimate <= 2.5 * REGISTER_COUNT and zeros:
+        # Поправка для малых множеств (linear counting)
+        estimate = REGISTER_COUNT * math.log(REGISTER_COUNT / zeros)
+    return round(estimate)
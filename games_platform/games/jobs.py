@@ -0,0 +1,225 @@
+import contextvars
+import os
+import random
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+
+# Имя задачи -> функция; заполняется декоратором @job из модулей <app>/tasks.py
+registry = {}
+# Задача, которую выполняет текущий поток воркера (для heartbeat)
+_current_job = contextvars.ContextVar('current_job', default=None)
+
+
+def job(name):
+    """Регистрирует функцию как задачу очереди; аргументы передаются через payload"""
+    def decorator(func):
+        registry[name] = func
+        return func
+
+    return decorator
+
+
+def autodiscover():
+    autodiscover_modules('tasks')
+
+
+def enqueue(name, payload=None, delay=0, max_attempts=None):
+    """Поставить задачу в очередь.
+
+    Строка пишется в той же транзакции, что и данные запроса: откат запроса
+    отменяет и задачу, а воркер увидит ее только после коммита.
+    """
+    if name not in registry:
+        raise ValueError(f'Неизвестная задача: {name}')
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def retry_delay(attempts):
+    """Экспоненциальная задержка перед повтором со случайным разбросом"""
+    delay = min(settings.JOB_RETRY_MAX_SECONDS, settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def release_stale_jobs():
+    """Вернуть в очередь задачи воркеров, которые упали посреди выполнения"""
+    deadline = timezone.now() - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    return Job.objects.filter(status='running', locked_at__lt=deadline).update(status='queued', locked_by='')
+
+
+def heartbeat():
+    """Продлить захват выполняемой задачи, чтобы release_stale_jobs не отдал ее другому воркеру.
+
+    Долгие задачи вызывают между порциями работы; вне воркера ничего не делает.
+    Запись в БД - не чаще раза в четверть JOB_LOCK_TIMEOUT.
+    """
+    job = _current_job.get()
+    if job is None:
+        return
+    now = timezone.now()
+    if now - job.locked_at < timedelta(seconds=settings.JOB_LOCK_TIMEOUT / 4):
+        return
+    job.locked_at = now
+    Job.objects.filter(pk=job.pk, status='running', locked_by=job.locked_by).update(locked_at=now)
+
+
+def claim_jobs(worker_id, limit=1):
+    """Захватить до limit готовых задач.
+
+    Где есть SELECT ... FOR UPDATE SKIP LOCKED (PostgreSQL, MySQL 8), воркеры
+    не ждут строки друг друга. В SQLite запись и так сериализована: кандидаты
+    захватываются условным UPDATE ... WHERE status='queued', и задачу получает
+    только тот, у кого UPDATE изменил строку.
+    """
+    now = timezone.now()
+    ready = Job.objects.filter(status='queued', run_at__lte=now).order_by('run_at')
+    claim = {'status': 'running', 'locked_by': worker_id, 'locked_at': now, 'attempts': F('attempts') + 1}
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(ready.select_for_update(skip_locked=True).values_list('pk', flat=True)[:limit])
+            Job.objects.filter(pk__in=ids).update(**claim)
+    else:
+        ids = []
+        for pk in ready.values_list('pk', flat=True)[:limit * 2]:
+            if Job.objects.filter(pk=pk, status='queued').update(**claim):
+                ids.append(pk)
+                if len(ids) == limit:
+                    break
+
+    return list(Job.objects.filter(pk__in=ids).order_by('run_at'))
+
+
+def run_job(job):
+    """Выполнить захваченную задачу: 'done', 'retry' или 'failed'"""
+    handler = registry.get(job.name)
+    token = _current_job.set(job)
+    try:
+        if handler is None:
+            raise LookupError(f'Неизвестная задача: {job.name}')
+        handler(**job.payload)
+    except Exception as exc:
+        job.last_error = repr(exc)
+        if handler is not None and job.attempts < job.max_attempts:
+            job.status = 'queued'
+            job.run_at = timezone.now() + timedelta(seconds=retry_delay(job.attempts))
+            result = 'retry'
+        else:
+            job.status = 'failed'
+            job.finished_at = timezone.now()
+            result = 'failed'
+    else:
+        job.status = 'done'
+        job.finished_at = timezone.now()
+        result = 'done'
+    finally:
+        _current_job.reset(token)
+
+    job.locked_by = ''
+    job.save(update_fields=['status', 'run_at', 'last_error', 'locked_by', 'finished_at'])
+    return result
+
+
+def queue_stats():
+    """Глубина очереди: число задач по статусам и возраст самой старой готовой (сек)"""
+    stats = dict(Job.objects.order_by().values_list('status').annotate(Count('pk')))
+    oldest = Job.objects.filter(status='queued', run_at__lte=timezone.now()).aggregate(Min('run_at'))['run_at__min']
+    stats['oldest_ready_age'] = (timezone.now() - oldest).total_seconds() if oldest else 0
+    return stats
+
+
+class Worker:
+    """Цикл обработки очереди с пулом потоков.
+
+    Для нескольких процессов запускают несколько команд run_jobs: задачи
+    распределяются захватом в БД.
+    """
+
+    def __init__(self, threads=1, poll_interval=None):
+        self.threads = threads
+        self.poll_interval = settings.JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.metrics = {'claimed': 0, 'done': 0, 'retry': 0, 'failed': 0}
+        self.started = time.monotonic()
+        self.stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    def throughput(self):
+        """Завершенных задач (успешно или окончательно с ошибкой) в секунду"""
+        elapsed = time.monotonic() - self.started
+        return (self.metrics['done'] + self.metrics['failed']) / elapsed if elapsed else 0.0
+
+    def _execute(self, job):
+        try:
+            result = run_job(job)
+        finally:
+            if self.threads > 1:
+                close_old_connections()
+        with self._lock:
+            self.metrics[result] += 1
+        return result
+
+    def run(self, once=False, max_jobs=None, on_batch=None):
+        """Обрабатывать задачи до stop(); once - выйти, когда очередь опустеет.
+
+        Новые задачи захватываются по мере освобождения потоков: долгая задача
+        не держит остальные потоки пула. Зависшие задачи упавших воркеров
+        возвращаются в очередь раз в интервал heartbeat.
+        """
+        pool = ThreadPoolExecutor(self.threads) if self.threads > 1 else None
+        running = set()
+        release_interval = settings.JOB_LOCK_TIMEOUT / 4
+        last_release = None
+        try:
+            while not self.stopping.is_set():
+                if last_release is None or time.monotonic() - last_release >= release_interval:
+                    release_stale_jobs()
+                    last_release = time.monotonic()
+
+                limit = self.threads - len(running)
+                if max_jobs is not None:
+                    limit = min(limit, max_jobs - self.metrics['claimed'])
+                jobs = claim_jobs(self.worker_id, limit) if limit > 0 else []
+                self.metrics['claimed'] += len(jobs)
+
+                if pool is None:
+                    for claimed in jobs:
+                        self._execute(claimed)
+                else:
+                    running.update(pool.submit(self._execute, claimed) for claimed in jobs)
+
+                if running:
+                    finished, running = wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        future.result()
+                    if not finished:
+                        continue
+                elif not jobs:
+                    if once or (max_jobs is not None and limit <= 0):
+                        break
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                if on_batch is not None:
+                    on_batch(self)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return self.metrics
+
+    def stop(self):
+        self.stopping.set()
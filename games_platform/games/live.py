@@ -0,0 +1,202 @@
+import asyncio
+import json
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+def merge_batch(batch, update):
+    """Слить обновление в пачку: счетчики суммируются, комментарии дописываются"""
+    for name, delta in update.get('stats', {}).items():
+        stats = batch.setdefault('stats', {})
+        stats[name] = stats.get(name, 0) + delta
+    if update.get('comments'):
+        comments = batch.setdefault('comments', [])
+        comments.extend(update['comments'])
+        del comments[:-settings.LIVE_MAX_COMMENTS]
+    return batch
+
+
+class _Channel:
+    """Канал игры: номер последней пачки и короткая история для догоняющих"""
+    __slots__ = ('seq', 'history', 'changed', 'subscribers')
+
+    def __init__(self):
+        self.seq = 0
+        self.history = deque(maxlen=settings.LIVE_HISTORY)
+        self.changed = asyncio.Event()
+        self.subscribers = 0
+
+
+class Subscription:
+    """Подписка на канал игры (async with hub.subscribe(...) as subscription).
+
+    Своей очереди у подписчика нет: он ждет общее событие канала и читает
+    историю с позиции cursor, поэтому простаивающая подписка почти не
+    занимает памяти.
+    """
+
+    def __init__(self, hub, game_id, cursor=None):
+        self.hub = hub
+        self.game_id = game_id
+        self.cursor = cursor
+        self.channel = None
+
+    async def __aenter__(self):
+        self.channel = self.hub._join(self.game_id)
+        if self.cursor is None:
+            self.cursor = self.channel.seq
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.hub._leave(self.game_id, self.channel)
+
+    async def get(self, timeout=None):
+        """(номер, пачка) после cursor; пачка None - пропущено слишком много,
+        клиенту нужно перечитать страницу. None - истек timeout."""
+        channel = self.channel
+        if channel.seq == self.cursor:
+            try:
+                await asyncio.wait_for(channel.changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+
+        missed = [(seq, batch) for seq, batch in channel.history if seq > self.cursor]
+        complete = bool(missed) and missed[0][0] == self.cursor + 1
+        self.cursor = channel.seq
+        if not complete:
+            return self.cursor, None
+
+        merged = {}
+        for _, batch in missed:
+            merge_batch(merged, batch)
+        return self.cursor, merged
+
+
+class LiveHub:
+    """Раздача обновлений игр подписчикам внутри процесса.
+
+    publish() можно вызывать из любого потока: обновления копятся в pending
+    и не чаще раза в LIVE_UPDATE_INTERVAL секунд рассылаются одной пачкой
+    на игру. Обновления игр без подписчиков сразу отбрасываются.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = {}
+        self._pending = {}
+        self._loop = None
+        self._wakeup = None
+        self._flusher = None
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Новый цикл событий (перезапуск сервера, тесты) - старые каналы не нужны
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._channels = {}
+            with self._lock:
+                self._pending = {}
+            self._flusher = None
+        if self._flusher is None or self._flusher.done():
+            self._flusher = loop.create_task(self._flush_loop())
+
+    def subscribe(self, game_id, last_seq=None):
+        return Subscription(self, game_id, last_seq)
+
+    def _join(self, game_id):
+        self._bind_loop()
+        channel = self._channels.get(game_id)
+        if channel is None:
+            channel = self._channels[game_id] = _Channel()
+        channel.subscribers += 1
+        return channel
+
+    def _leave(self, game_id, channel):
+        channel.subscribers -= 1
+        if not channel.subscribers and self._channels.get(game_id) is channel:
+            del self._channels[game_id]
+
+    def publish(self, game_id, update):
+        if game_id not in self._channels:
+            return
+        with self._lock:
+            merge_batch(self._pending.setdefault(game_id, {}), update)
+            loop, wakeup = self._loop, self._wakeup
+        try:
+            loop.call_soon_threadsafe(wakeup.set)
+        except RuntimeError:
+            # Цикл событий уже закрыт
+            pass
+
+    async def _flush_loop(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            self._flush()
+            # Ограничиваем частоту рассылки: все, что придет за паузу, уйдет одной пачкой
+            await asyncio.sleep(settings.LIVE_UPDATE_INTERVAL)
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for game_id, batch in pending.items():
+            channel = self._channels.get(game_id)
+            if channel is None:
+                continue
+            channel.seq += 1
+            channel.history.append((channel.seq, batch))
+            changed, channel.changed = channel.changed, asyncio.Event()
+            changed.set()
+
+
+hub = LiveHub()
+
+
+def publish_stats(game_id, **deltas):
+    """Изменение счетчиков игры: views, plays, likes, dislikes, comments"""
+    hub.publish(game_id, {'stats': deltas})
+
+
+def publish_comment(comment):
+    hub.publish(comment.game_id, {
+        'stats': {'comments': 1},
+        'comments': [{
+            'id': comment.pk,
+            'user': comment.user.username,
+            'text': comment.text,
+            'created_at': comment.created_at,
+        }],
+    })
+
+
+def _sse(event, data, event_id=None):
+    lines = [] if event_id is None else [f'id: {event_id}']
+    lines.append(f'event: {event}')
+    lines.append('data: ' + json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False))
+    return '\n'.join(lines) + '\n\n'
+
+
+async def event_stream(game_id, last_event_id=None):
+    """Поток server-sent events для страницы игры"""
+    try:
+        last_seq = int(last_event_id)
+    except (TypeError, ValueError):
+        last_seq = None
+
+    async with hub.subscribe(game_id, last_seq) as subscription:
+        yield f'retry: {settings.LIVE_RETRY_MS}\n\n'
+        while True:
+            item = await subscription.get(settings.LIVE_HEARTBEAT)
+            if item is None:
+                # Комментарий SSE не дает прокси закрыть простаивающее соединение
+                yield ': ping\n\n'
+                continue
+            seq, batch = item
+            if batch is None:
+                yield _sse('resync', {}, seq)
+            else:
+                yield _sse('update', batch, seq)
@@ -0,0 +1,77 @@
+import multiprocessing
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from games_platform.cache import SharedMemoryCache
+
+
+def _incr_worker(factory, key, count):
+    cache = factory()
+    for _ in range(count):
+        cache.incr(key)
+
+
+class Command(BaseCommand):
+    help = 'Сравнение SharedMemoryCache с LocMemCache и FileBasedCache: операций в секунду и общий счетчик воркеров'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ops', type=int, default=20000)
+        parser.add_argument('--keys', type=int, default=1000)
+        parser.add_argument('--processes', type=int, default=4)
+
+    def handle(self, *args, **options):
+        directory = Path(tempfile.mkdtemp(prefix='bench_cache_'))
+        backends = {
+            'LocMemCache': lambda: LocMemCache('bench', {}),
+            'FileBasedCache': lambda: FileBasedCache(str(directory / 'files'), {}),
+            'SharedMemoryCache': lambda: SharedMemoryCache(str(directory / 'shm'), {}),
+        }
+        try:
+            self.stdout.write(
+                f'{"бэкенд":<20} {"set/с":>10} {"get/с":>10} {"incr/с":>10} '
+                f'{"счетчик " + str(options["processes"]) + " проц.":>18}'
+            )
+            for label, factory in backends.items():
+                rates = self.measure(factory(), options['ops'], options['keys'])
+                total = self.shared_counter(factory, options['processes'], options['ops'] // 10)
+                self.stdout.write(
+                    f'{label:<20} {rates[0]:>10.0f} {rates[1]:>10.0f} {rates[2]:>10.0f} '
+                    f'{total:>8} из {options["processes"] * (options["ops"] // 10)}'
+                )
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def measure(self, cache, ops, keys):
+        value = {'views': 123, 'plays': 45, 'title': 'x' * 100}
+        rates = []
+        for operation in (
+            lambda i: cache.set(f'key:{i % keys}', value),
+            lambda i: cache.get(f'key:{i % keys}'),
+            lambda i: cache.incr('counter'),
+        ):
+            cache.set('counter', 0, None)
+            started = time.perf_counter()
+            for i in range(ops):
+                operation(i)
+            rates.append(ops / (time.perf_counter() - started))
+        return rates
+
+    def shared_counter(self, factory, processes, count):
+        """Итог incr одного ключа из нескольких процессов, как у воркеров gunicorn"""
+        factory().set('shared_counter', 0, None)
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=_incr_worker, args=(factory, 'shared_counter', count))
+            for _ in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return factory().get('shared_counter')
@@ -0,0 +1,60 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+from games.models import Game
+
+
+class Command(BaseCommand):
+    help = 'Время ответа JSON API каталога на страницу из --limit игр (создает и удаляет тестовые игры)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--games', type=int, default=1000)
+        parser.add_argument('--limit', type=int, default=100)
+        parser.add_argument('--requests', type=int, default=200)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        developer, _ = User.objects.get_or_create(
+            username='bench_catalog_api', defaults={'user_type': 'developer', 'is_active': False}
+        )
+        Game.objects.bulk_create(
+            Game(
+                title=f'bench_catalog_api {i}', description='', developer=developer,
+                html_file='bench.html', status='approved',
+            )
+            for i in range(options['games'])
+        )
+
+        client = Client(HTTP_HOST='localhost')
+        url = reverse('api_game_list')
+        try:
+            self.stdout.write(f'{"запрос":<40} {"медиана, мс":>12} {"p95, мс":>10} {"байт":>8}')
+            for label, params in [
+                ('первая страница', {}),
+                ('fields=id,title', {'fields': 'id,title'}),
+                ('вторая страница (cursor)', {'cursor': None}),
+            ]:
+                params = {'limit': options['limit'], **params}
+                if 'cursor' in params:
+                    params['cursor'] = client.get(url, {'limit': options['limit']}).json()['next']
+                timings, size = self.measure(client, url, params, options['requests'])
+                self.stdout.write(
+                    f'{label:<40} {statistics.median(timings):>12.2f} '
+                    f'{statistics.quantiles(timings, n=20)[-1]:>10.2f} {size:>8}'
+                )
+        finally:
+            Game.objects.filter(developer=developer).delete()
+            developer.delete()
+
+    def measure(self, client, url, params, requests):
+        timings = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = client.get(url, params)
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings, len(response.content)
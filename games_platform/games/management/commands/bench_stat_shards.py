@@ -0,0 +1,70 @@
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, OperationalError
+
+from games.models import Game, GameStatShard
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест записи счетчиков одной игры при разном числе шардов. '
+        'На SQLite запись блокирует всю базу, поэтому рост с K виден только на '
+        'СУБД со строковыми блокировками (PostgreSQL, MySQL).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=3.0)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        developer, _ = User.objects.get_or_create(
+            username='bench_stat_shards', defaults={'user_type': 'developer', 'is_active': False}
+        )
+        game = Game.objects.create(
+            title='bench_stat_shards', description='', developer=developer, html_file='bench.html'
+        )
+
+        try:
+            self.stdout.write(f'{"K":>4} {"записей":>10} {"записей/с":>12} {"ошибок":>8}')
+            for shards in options['shards']:
+                writes, errors, elapsed = self.run_round(
+                    game.pk, shards, options['threads'], options['seconds']
+                )
+                self.stdout.write(f'{shards:>4} {writes:>10} {writes / elapsed:>12.0f} {errors:>8}')
+        finally:
+            game.delete()
+            developer.delete()
+
+    def run_round(self, game_id, shards, threads, seconds):
+        counters = {'writes': 0, 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+
+        def worker():
+            writes = errors = 0
+            try:
+                while time.perf_counter() < deadline:
+                    try:
+                        GameStatShard.increment(game_id, 'views', shards=shards)
+                        writes += 1
+                    except OperationalError:
+                        errors += 1
+            finally:
+                connection.close()
+                with lock:
+                    counters['writes'] += writes
+                    counters['errors'] += errors
+
+        started = time.perf_counter()
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+
+        return counters['writes'], counters['errors'], time.perf_counter() - started
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from games.models import GameStatShard
+
+
+class Command(BaseCommand):
+    help = 'Переносит накопленные шарды счетчиков в GameStat (запускать периодически, например из cron)'
+
+    def handle(self, *args, **options):
+        game_ids = list(GameStatShard.games_with_pending_shards())
+        totals = {field: 0 for field in GameStatShard.COUNTER_FIELDS}
+
+        for game_id in game_ids:
+            collected = GameStatShard.collapse(game_id)
+            for field, value in collected.items():
+                totals[field] += value
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Игр обработано: {len(game_ids)}, '
+            f'просмотров перенесено: {totals["views"]}, '
+            f'запусков перенесено: {totals["play_count"]}'
+        ))
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from games.media_gc import delete_orphans, find_orphans
+
+
+class Command(BaseCommand):
+    help = (
+        'Ищет в MEDIA_ROOT файлы, на которые не ссылается ни одно FileField '
+        '(старые html/превью игр, замененные аватары), и показывает объем. '
+        'С --delete удаляет те, что старше grace-периода.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=float, default=settings.MEDIA_GC_GRACE_HOURS,
+            help='Не трогать файлы моложе этого возраста (идущие загрузки)'
+        )
+        parser.add_argument('--delete', action='store_true', help='Удалить найденные файлы')
+        parser.add_argument('--list', action='store_true', help='Вывести пути файлов')
+
+    def handle(self, *args, **options):
+        grace_seconds = options['grace_hours'] * 3600
+        orphans = list(find_orphans(grace_seconds))
+        total_bytes = sum(size for _, size in orphans)
+
+        if options['list']:
+            for name, size in orphans:
+                self.stdout.write(f'{name}\t{size}')
+
+        self.stdout.write(
+            f'Файлов без ссылок: {len(orphans)}, можно освободить: {filesizeformat(total_bytes)}'
+        )
+
+        if options['delete']:
+            files, freed = delete_orphans(orphans, grace_seconds)
+            self.stdout.write(self.style.SUCCESS(
+                f'Удалено файлов: {files}, освобождено: {filesizeformat(freed)}'
+            ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from games.exports import DATASETS, FORMATS, stream_export
+
+
+class Command(BaseCommand):
+    help = 'Потоковая выгрузка статистики игр или пользователей в CSV/JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(DATASETS))
+        parser.add_argument('--format', dest='fmt', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--output', help='Файл для записи (по умолчанию stdout)')
+
+    def handle(self, *args, **options):
+        chunks = stream_export(options['dataset'], options['fmt'])
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
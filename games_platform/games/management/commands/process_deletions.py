@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from games.deletion import process_pending_deletions
+
+
+class Command(BaseCommand):
+    help = 'Фоновое удаление игр и пользователей порциями (задачи из user_delete/game_delete)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--loop', action='store_true', help='Работать постоянно, опрашивая очередь')
+        parser.add_argument('--interval', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        while True:
+            done = process_pending_deletions(options['batch_size'])
+            if done:
+                self.stdout.write(f'Завершено задач удаления: {done}')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
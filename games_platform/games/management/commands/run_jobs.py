@@ -0,0 +1,48 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+
+from games.jobs import Worker, queue_stats
+
+
+class Command(BaseCommand):
+    help = 'Воркер фоновой очереди задач: захватывает задачи из БД и выполняет их в пуле потоков'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help='Потоков в пуле')
+        parser.add_argument('--once', action='store_true', help='Выйти, когда очередь опустеет')
+        parser.add_argument('--max-jobs', type=int, help='Выйти после указанного числа задач')
+        parser.add_argument('--poll-interval', type=float, help='Пауза опроса пустой очереди (сек)')
+        parser.add_argument('--report-interval', type=float, default=60, help='Как часто печатать метрики (сек)')
+        parser.add_argument('--stats', action='store_true', help='Только показать глубину очереди')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            for key, value in sorted(queue_stats().items()):
+                self.stdout.write(f'{key}: {value}')
+            return
+
+        worker = Worker(threads=options['threads'], poll_interval=options['poll_interval'])
+        signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+
+        last_report = [time.monotonic()]
+
+        def report(worker):
+            if time.monotonic() - last_report[0] >= options['report_interval']:
+                last_report[0] = time.monotonic()
+                self.stdout.write(self.format_metrics(worker))
+
+        try:
+            worker.run(once=options['once'], max_jobs=options['max_jobs'], on_batch=report)
+        except KeyboardInterrupt:
+            worker.stop()
+        self.stdout.write(self.style.SUCCESS(self.format_metrics(worker)))
+
+    def format_metrics(self, worker):
+        metrics = worker.metrics
+        return (
+            f'Захвачено: {metrics["claimed"]}, выполнено: {metrics["done"]}, '
+            f'отложено на повтор: {metrics["retry"]}, с ошибкой: {metrics["failed"]}, '
+            f'задач/с: {worker.throughput():.1f}'
+        )
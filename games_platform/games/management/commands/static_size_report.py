@@ -0,0 +1,76 @@
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from games_platform.views import PRECOMPRESSED_VARIANTS, is_hashed_static_name
+
+ASSET_RE = re.compile(r'(?:href|src)="%s([^"?#]+)"' % re.escape(settings.STATIC_URL))
+
+
+class Command(BaseCommand):
+    help = (
+        'Объем статики, который браузер скачивает для страницы: исходные файлы '
+        'против хешированных сжатых копий после collectstatic'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', nargs='?', default='/')
+
+    def handle(self, *args, **options):
+        response = Client(HTTP_HOST='localhost').get(options['url'])
+        if response.status_code != 200:
+            raise CommandError(f'{options["url"]} вернул {response.status_code}')
+
+        assets = ASSET_RE.findall(response.content.decode())
+        if not assets:
+            raise CommandError('На странице не найдено статических файлов')
+
+        html_size = len(response.content)
+        before_total = after_total = html_size
+        repeat_requests_before = 0
+
+        self.stdout.write(f'{"файл":<40} {"до":>10} {"после":>10}')
+        for asset in assets:
+            before, after = self.asset_sizes(asset)
+            before_total += before
+            after_total += after
+            # Без хеша в имени браузер перепроверяет файл на каждой навигации
+            repeat_requests_before += 1
+            self.stdout.write(f'{asset:<40} {before:>10} {after:>10}')
+
+        self.stdout.write(f'{"HTML":<40} {html_size:>10} {html_size:>10}')
+        self.stdout.write(f'{"итого, первый визит (байт)":<40} {before_total:>10} {after_total:>10}')
+        self.stdout.write(
+            f'{"повторная навигация (запросов статики)":<40} {repeat_requests_before:>10} {0:>10}'
+        )
+
+    def asset_sizes(self, asset):
+        """Размер исходного файла и наименьшего варианта, который отдаст serve_static"""
+        hashed_files = staticfiles_storage.hashed_files
+        if is_hashed_static_name(asset):
+            original_name, hashed_name = next(
+                (name, hashed) for name, hashed in hashed_files.items() if hashed == asset
+            )
+        else:
+            # В DEBUG шаблоны ссылаются на исходные имена
+            original_name, hashed_name = asset, hashed_files.get(asset)
+
+        source = finders.find(original_name)
+        if source is None:
+            raise CommandError(f'Исходный файл {original_name} не найден')
+        with open(source, 'rb') as f:
+            before = len(f.read())
+
+        if hashed_name is None:
+            self.stderr.write(f'{asset}: нет в манифесте, сначала запустите collectstatic')
+            return before, before
+
+        after = staticfiles_storage.size(hashed_name)
+        for _, suffix in PRECOMPRESSED_VARIANTS:
+            if staticfiles_storage.exists(hashed_name + suffix):
+                after = min(after, staticfiles_storage.size(hashed_name + suffix))
+        return before, after
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from games.models import Game
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает агрегаты оценок и байесовский рейтинг всех игр (после изменения RATING_PRIOR_*)'
+
+    def handle(self, *args, **options):
+        Game.update_rating_scores()
+        self.stdout.write(self.style.SUCCESS(f'Рейтинг пересчитан для игр: {Game.objects.count()}'))
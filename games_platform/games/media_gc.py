@@ -0,0 +1,96 @@
+import hashlib
+import os
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models
+
+
+def _path_key(name):
+    """8-байтовый хеш пути: множество целых компактнее множества строк.
+
+    Коллизия может только сохранить лишний файл, но не удалить нужный.
+    """
+    return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), 'big')
+
+
+def file_fields():
+    """Все FileField/ImageField проекта: (модель, имя поля)"""
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if isinstance(field, models.FileField):
+                yield model, field.name
+
+
+def referenced_media_keys():
+    """Ключи всех путей, на которые ссылается БД (значения читаются потоком)"""
+    keys = set()
+    for model, field_name in file_fields():
+        names = (
+            model._base_manager.exclude(**{field_name: ''})
+            .exclude(**{f'{field_name}__isnull': True})
+            .values_list(field_name, flat=True)
+            .iterator(chunk_size=5000)
+        )
+        keys.update(_path_key(name) for name in names)
+    return keys
+
+
+def is_referenced(name):
+    """Точная проверка одного пути в БД перед удалением"""
+    for model, field_name in file_fields():
+        if model._base_manager.filter(**{field_name: name}).exists():
+            return True
+    return False
+
+
+def scan_media(root=None):
+    """Обход MEDIA_ROOT через os.scandir: (имя относительно MEDIA_ROOT, размер, mtime)"""
+    root = os.fspath(root or settings.MEDIA_ROOT)
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    try:
+                        stat = entry.stat(follow_symlinks=False)
+                    except FileNotFoundError:
+                        continue
+                    name = os.path.relpath(entry.path, root).replace(os.sep, '/')
+                    yield name, stat.st_size, stat.st_mtime
+
+
+def find_orphans(grace_seconds, root=None):
+    """Файлы без ссылок в БД, которые старше grace_seconds"""
+    # Снимок ссылок берем до обхода: файлы, загруженные позже, отсеет grace-период
+    referenced = referenced_media_keys()
+    cutoff = time.time() - grace_seconds
+    for name, size, mtime in scan_media(root):
+        if mtime < cutoff and _path_key(name) not in referenced:
+            yield name, size
+
+
+def delete_orphans(orphans, grace_seconds, root=None):
+    """Удалить найденные файлы с повторной проверкой; вернуть (файлов, байт)"""
+    root = os.fspath(root or settings.MEDIA_ROOT)
+    deleted_files = deleted_bytes = 0
+    for name, size in orphans:
+        path = os.path.join(root, name)
+        try:
+            # Файл могли перезаписать или на него могли сослаться после снимка
+            if os.stat(path).st_mtime >= time.time() - grace_seconds or is_referenced(name):
+                continue
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        deleted_files += 1
+        deleted_bytes += size
+    return deleted_files, deleted_bytes
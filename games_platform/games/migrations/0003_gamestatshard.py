@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0002_comment_gamestat_gamerating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameStatShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField(verbose_name='Номер шарда')),
+                ('views', models.IntegerField(default=0, verbose_name='Просмотры')),
+                ('play_count', models.IntegerField(default=0, verbose_name='Количество запусков')),
+                ('last_played', models.DateTimeField(blank=True, null=True, verbose_name='Последний запуск')),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stat_shards', to='games.game', verbose_name='Игра')),
+            ],
+            options={
+                'verbose_name': 'Шард статистики игры',
+                'verbose_name_plural': 'Шарды статистики игр',
+                'unique_together': {('game', 'shard')},
+            },
+        ),
+    ]
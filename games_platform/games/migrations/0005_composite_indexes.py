@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0004_deletiontask'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['game', '-created_at'], name='comment_game_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['status', '-created_at'], name='game_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['developer', '-created_at'], name='game_developer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gamerating',
+            index=models.Index(fields=['game', 'rating'], name='rating_game_rating_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0005_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameViewerSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('registers', models.BinaryField(max_length=2048, verbose_name='Регистры')),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='viewer_sketches', to='games.game', verbose_name='Игра')),
+            ],
+            options={
+                'verbose_name': 'Скетч уникальных зрителей',
+                'verbose_name_plural': 'Скетчи уникальных зрителей',
+                'unique_together': {('game', 'day')},
+            },
+        ),
+    ]
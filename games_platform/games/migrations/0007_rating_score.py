@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:58
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_rating_scores(apps, schema_editor):
+    """Агрегаты и рейтинг для уже существующих оценок"""
+    Game = apps.get_model('games', 'Game')
+    GameRating = apps.get_model('games', 'GameRating')
+    weight = settings.RATING_PRIOR_WEIGHT
+    for row in GameRating.objects.values('game').annotate(votes=Count('pk'), total=Sum('rating')):
+        Game.objects.filter(pk=row['game']).update(
+            rating_votes=row['votes'],
+            rating_sum=row['total'],
+            rating_score=(settings.RATING_PRIOR_MEAN * weight + row['total']) / (weight + row['votes']),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0006_gameviewersketch'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='rating_score',
+            field=models.FloatField(default=0, verbose_name='Байесовский рейтинг'),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, verbose_name='Сумма оценок'),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='rating_votes',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество оценок'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['status', '-rating_score'], name='game_status_score_idx'),
+        ),
+        migrations.RunPython(fill_rating_scores, migrations.RunPython.noop),
+    ]
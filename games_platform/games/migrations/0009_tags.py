@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:20
+
+from django.db import migrations, models
+
+GENRES = [
+    ('Экшен', 'action'),
+    ('Аркада', 'arcade'),
+    ('Головоломка', 'puzzle'),
+    ('Платформер', 'platformer'),
+    ('Приключения', 'adventure'),
+    ('Гонки', 'racing'),
+    ('Стратегия', 'strategy'),
+    ('Спорт', 'sports'),
+]
+
+
+def create_genres(apps, schema_editor):
+    """Базовый набор жанров; остальные теги добавляются в админке"""
+    Tag = apps.get_model('games', 'Tag')
+    Tag.objects.bulk_create([Tag(name=name, slug=slug) for name, slug in GENRES], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0008_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Название')),
+                ('slug', models.SlugField(unique=True, verbose_name='Слаг')),
+            ],
+            options={
+                'verbose_name': 'Тег',
+                'verbose_name_plural': 'Теги',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='games', to='games.tag', verbose_name='Жанры и теги'),
+        ),
+        migrations.RunPython(create_genres, migrations.RunPython.noop),
+    ]
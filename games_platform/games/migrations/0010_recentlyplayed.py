@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_composite_indexes'),
+        ('games', '0009_tags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecentlyPlayed',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recently_played', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('entries', models.JSONField(default=list, verbose_name='Игры')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Недавние игры пользователя',
+                'verbose_name_plural': 'Недавние игры пользователей',
+            },
+        ),
+    ]
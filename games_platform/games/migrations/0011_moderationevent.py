@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:28
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0010_recentlyplayed'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModerationEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('game_title', models.CharField(max_length=200, verbose_name='Название игры')),
+                ('moderator_name', models.CharField(max_length=150, verbose_name='Имя модератора')),
+                ('action', models.CharField(choices=[('approve', 'Одобрение'), ('reject', 'Отклонение')], max_length=10, verbose_name='Действие')),
+                ('from_status', models.CharField(max_length=10, verbose_name='Прежний статус')),
+                ('to_status', models.CharField(max_length=10, verbose_name='Новый статус')),
+                ('source', models.CharField(choices=[('site', 'Сайт'), ('admin', 'Админка')], max_length=10, verbose_name='Источник')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время')),
+                ('game', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='moderation_events', to='games.game', verbose_name='Игра')),
+                ('moderator', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='moderation_events', to=settings.AUTH_USER_MODEL, verbose_name='Модератор')),
+            ],
+            options={
+                'verbose_name': 'Событие модерации',
+                'verbose_name_plural': 'Журнал модерации',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['game', '-created_at'], name='modevent_game_created_idx'), models.Index(fields=['moderator', '-created_at'], name='modevent_moderator_created_idx'), models.Index(fields=['created_at'], name='modevent_created_idx')],
+            },
+        ),
+    ]
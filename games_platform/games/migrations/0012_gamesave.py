@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:34
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0011_moderationevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameSave',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.SlugField(db_index=False, max_length=32, verbose_name='Слот')),
+                ('version', models.PositiveIntegerField(default=1, verbose_name='Версия')),
+                ('base_version', models.PositiveIntegerField(default=1, verbose_name='Версия снимка')),
+                ('size', models.PositiveIntegerField(default=0, verbose_name='Размер состояния (байт)')),
+                ('stored_size', models.PositiveIntegerField(default=0, verbose_name='Занято в БД (байт)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата обновления')),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saves', to='games.game', verbose_name='Игра')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='game_saves', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Облачное сохранение',
+                'verbose_name_plural': 'Облачные сохранения',
+                'ordering': ['slot'],
+            },
+        ),
+        migrations.CreateModel(
+            name='GameSaveRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(verbose_name='Версия')),
+                ('is_snapshot', models.BooleanField(default=False, verbose_name='Снимок')),
+                ('blob', models.BinaryField(verbose_name='Данные (zlib)')),
+                ('save_slot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='records', to='games.gamesave', verbose_name='Слот')),
+            ],
+            options={
+                'verbose_name': 'Запись сохранения',
+                'verbose_name_plural': 'Записи сохранений',
+                'ordering': ['version'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='gamesave',
+            constraint=models.UniqueConstraint(fields=('user', 'game', 'slot'), name='unique_game_save_slot'),
+        ),
+        migrations.AddConstraint(
+            model_name='gamesaverecord',
+            constraint=models.UniqueConstraint(fields=('save_slot', 'version'), name='unique_game_save_record_version'),
+        ),
+    ]
@@ -1,16 +1,86 @@
+import random
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import Avg, Count, F, FloatField, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
+from . import hll
+from .live import publish_stats
+from .page_cache import bump_version, get_version
+
 User = get_user_model()
 
 
+def related_aggregate(model, aggregate, output_field, link='game'):
+    """Агрегат по связанной таблице как скалярный подзапрос (без размножения строк JOIN-ами)"""
+    return Subquery(
+        model.objects.filter(**{link: OuterRef('pk')})
+        .order_by()
+        .values(link)
+        .annotate(value=aggregate)
+        .values('value'),
+        output_field=output_field,
+    )
+
+
+class GameQuerySet(models.QuerySet):
+    def with_stats(self, *names):
+        """Просмотры, запуски, лайки, рейтинг и комментарии одним запросом.
+
+        names ограничивает набор аннотаций (по умолчанию - все).
+        """
+        stats = dict(
+            view_count=Coalesce(F('stats__views'), 0)
+            + Coalesce(related_aggregate(GameStatShard, Sum('views'), IntegerField()), 0),
+            play_count=Coalesce(F('stats__play_count'), 0)
+            + Coalesce(related_aggregate(GameStatShard, Sum('play_count'), IntegerField()), 0),
+            like_count=Coalesce(F('stats__likes'), 0),
+            dislike_count=Coalesce(F('stats__dislikes'), 0),
+            average_rating=Coalesce(related_aggregate(GameRating, Avg('rating'), FloatField()), 0.0),
+            rating_count=Coalesce(related_aggregate(GameRating, Count('pk'), IntegerField()), 0),
+            comment_count=Coalesce(related_aggregate(Comment, Count('pk'), IntegerField()), 0),
+        )
+        if names:
+            stats = {name: stats[name] for name in names}
+        return self.annotate(**stats)
+
+
+def bayesian_rating(rating_sum, rating_votes):
+    """Средняя оценка, сглаженная к глобальному априорному среднему.
+
+    Пока голосов мало, score близок к RATING_PRIOR_MEAN; вес априорного
+    среднего - RATING_PRIOR_WEIGHT "виртуальных" голосов.
+    """
+    weight = settings.RATING_PRIOR_WEIGHT
+    return (settings.RATING_PRIOR_MEAN * weight + rating_sum) / (weight + rating_votes)
+
+
+class Tag(models.Model):
+    """Жанр или тег для фасетного фильтра каталога"""
+    name = models.CharField(max_length=50, unique=True, verbose_name='Название')
+    slug = models.SlugField(max_length=50, unique=True, verbose_name='Слаг')
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Тег'
+        verbose_name_plural = 'Теги'
+
+    def __str__(self):
+        return self.name
+
+
 class Game(models.Model):
     STATUS_CHOICES = (
         ('pending', 'На проверке'),
         ('approved', 'Одобрено'),
         ('rejected', 'Отклонено'),
+        ('deleting', 'Удаляется'),
     )
 
     title = models.CharField(max_length=200, verbose_name='Название игры')
@@ -44,11 +114,26 @@ class Game(models.Model):
         blank=True,
         verbose_name='Дата публикации'
     )
+    tags = models.ManyToManyField(Tag, blank=True, related_name='games', verbose_name='Жанры и теги')
+    # Агрегаты оценок для рейтинга; пересчитываются сигналами GameRating
+    rating_votes = models.PositiveIntegerField(default=0, verbose_name='Количество оценок')
+    rating_sum = models.PositiveIntegerField(default=0, verbose_name='Сумма оценок')
+    rating_score = models.FloatField(default=0, verbose_name='Байесовский рейтинг')
+
+    objects = GameQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Игра'
         verbose_name_plural = 'Игры'
+        indexes = [
+            # Каталог: status=... ORDER BY -created_at без сортировки в БД
+            models.Index(fields=['status', '-created_at'], name='game_status_created_idx'),
+            # Игры разработчика в профиле, тоже по -created_at
+            models.Index(fields=['developer', '-created_at'], name='game_developer_created_idx'),
+            # Лучшие по рейтингу: status=... ORDER BY -rating_score LIMIT N
+            models.Index(fields=['status', '-rating_score'], name='game_status_score_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.get_status_display()})"
@@ -67,6 +152,23 @@ class Game(models.Model):
         else:
             return user == self.developer
 
+    @classmethod
+    def update_rating_scores(cls, game_ids=None):
+        """Пересчитать агрегаты оценок и рейтинг (все игры или game_ids)"""
+        games = cls.objects.all() if game_ids is None else cls.objects.filter(pk__in=game_ids)
+        aggregates = {
+            row['game']: row
+            for row in GameRating.objects.filter(game__in=games.values('pk'))
+            .values('game').annotate(votes=Count('pk'), total=Sum('rating'))
+        }
+        for game in games.only('pk'):
+            row = aggregates.get(game.pk, {'votes': 0, 'total': 0})
+            cls.objects.filter(pk=game.pk).update(
+                rating_votes=row['votes'],
+                rating_sum=row['total'],
+                rating_score=bayesian_rating(row['total'], row['votes']),
+            )
+
     def get_average_rating(self):
         """Средний рейтинг игры"""
         if hasattr(self, 'stats'):
@@ -81,15 +183,11 @@ class Game(models.Model):
 
     def get_view_count(self):
         """Количество просмотров"""
-        if hasattr(self, 'stats'):
-            return self.stats.views
-        return 0
+        return GameStatShard.get_totals(self.pk)['views']
 
     def get_play_count(self):
         """Количество запусков"""
-        if hasattr(self, 'stats'):
-            return self.stats.play_count
-        return 0
+        return GameStatShard.get_totals(self.pk)['play_count']
 
     def get_comment_count(self):
         """Количество комментариев"""
@@ -97,15 +195,11 @@ class Game(models.Model):
 
     def increment_views(self):
         """Увеличить счетчик просмотров"""
-        if not hasattr(self, 'stats'):
-            GameStat.objects.create(game=self)
-        self.stats.increment_views()
+        GameStatShard.increment(self.pk, 'views')
 
     def increment_play_count(self):
         """Увеличить счетчик запусков"""
-        if not hasattr(self, 'stats'):
-            GameStat.objects.create(game=self)
-        self.stats.increment_play_count()
+        GameStatShard.increment(self.pk, 'play_count')
 
     def user_rating(self, user):
         """Получить оценку пользователя для этой игры"""
@@ -142,6 +236,10 @@ class GameRating(models.Model):
         unique_together = ['user', 'game']
         verbose_name = 'Оценка игры'
         verbose_name_plural = 'Оценки игр'
+        indexes = [
+            # Покрывающий индекс для среднего и количества оценок игры
+            models.Index(fields=['game', 'rating'], name='rating_game_rating_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username}: {self.rating} звезд для {self.game.title}"
@@ -170,6 +268,9 @@ class Comment(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=['game', '-created_at'], name='comment_game_created_idx'),
+        ]
 
     def __str__(self):
         return f"Комментарий от {self.user.username} к игре {self.game.title}"
@@ -197,13 +298,10 @@ class GameStat(models.Model):
         return f"Статистика для {self.game.title}"
 
     def increment_views(self):
-        self.views += 1
-        self.save()
+        GameStatShard.increment(self.game_id, 'views')
 
     def increment_play_count(self):
-        self.play_count += 1
-        self.last_played = timezone.now()
-        self.save()
+        GameStatShard.increment(self.game_id, 'play_count')
 
     def get_average_rating(self):
         ratings = self.game.ratings.all()
@@ -213,3 +311,511 @@ class GameStat(models.Model):
 
     def get_rating_count(self):
         return self.game.ratings.count()
+
+
+def dashboard_cache_key(developer_id):
+    """Ключ аналитики в кеше процесса; версия лежит в общем кеше, и ее сдвиг видят все воркеры"""
+    return f'dashboard:{developer_id}:{get_version(dashboard_version_key(developer_id))!r}'
+
+
+def dashboard_version_key(developer_id):
+    return f'dashboard:version:{developer_id}'
+
+
+def invalidate_developer_dashboard(game_id):
+    """Сбросить кеш аналитики разработчика, которому принадлежит игра"""
+    key = f'game_developer:{game_id}'
+    developer_id = cache.get(key)
+    if developer_id is None:
+        developer_id = Game.objects.filter(pk=game_id).values_list('developer_id', flat=True).first()
+        if developer_id is None:
+            return
+        cache.set(key, developer_id, settings.DASHBOARD_CACHE_TIMEOUT)
+    bump_version(dashboard_version_key(developer_id))
+
+
+class GameStatShard(models.Model):
+    """Шард счетчиков игры.
+
+    Просмотры и запуски пишутся в одну из GAME_STAT_SHARDS случайных строк,
+    чтобы популярная игра не блокировала единственную строку GameStat.
+    Итог = GameStat + сумма шардов; команда collapse_stat_shards
+    периодически переносит шарды в GameStat.
+    """
+    COUNTER_FIELDS = ('views', 'play_count')
+
+    game = models.ForeignKey(
+        Game,
+        on_delete=models.CASCADE,
+        related_name='stat_shards',
+        verbose_name='Игра'
+    )
+    shard = models.PositiveSmallIntegerField(verbose_name='Номер шарда')
+    views = models.IntegerField(default=0, verbose_name='Просмотры')
+    play_count = models.IntegerField(default=0, verbose_name='Количество запусков')
+    last_played = models.DateTimeField(null=True, blank=True, verbose_name='Последний запуск')
+
+    class Meta:
+        unique_together = ['game', 'shard']
+        verbose_name = 'Шард статистики игры'
+        verbose_name_plural = 'Шарды статистики игр'
+
+    def __str__(self):
+        return f"Шард {self.shard} статистики для игры #{self.game_id}"
+
+    @staticmethod
+    def cache_key(game_id, field):
+        return f'game_stat:{game_id}:{field}'
+
+    @classmethod
+    def increment(cls, game_id, field, shards=None):
+        """Увеличить счетчик в случайном шарде"""
+        if field not in cls.COUNTER_FIELDS:
+            raise ValueError(f'Неизвестный счетчик: {field}')
+
+        shard = random.randrange(shards or settings.GAME_STAT_SHARDS)
+        changes = {field: F(field) + 1}
+        if field == 'play_count':
+            changes['last_played'] = timezone.now()
+
+        updated = cls.objects.filter(game_id=game_id, shard=shard).update(**changes)
+        if not updated:
+            try:
+                with transaction.atomic():
+                    cls.objects.create(
+                        game_id=game_id,
+                        shard=shard,
+                        **{field: 1},
+                        last_played=changes.get('last_played'),
+                    )
+            except IntegrityError:
+                # Шард успел создать параллельный запрос
+                cls.objects.filter(game_id=game_id, shard=shard).update(**changes)
+
+        # Обновляем закешированную сумму без чтения из БД
+        try:
+            cache.incr(cls.cache_key(game_id, field))
+        except ValueError:
+            pass
+        invalidate_developer_dashboard(game_id)
+        publish_stats(game_id, **{'plays' if field == 'play_count' else field: 1})
+
+    @classmethod
+    def get_totals(cls, game_id):
+        """Суммы счетчиков игры: GameStat + шарды, с кешированием"""
+        keys = {field: cls.cache_key(game_id, field) for field in cls.COUNTER_FIELDS}
+        cached = cache.get_many(keys.values())
+        if len(cached) == len(keys):
+            return {field: cached[key] for field, key in keys.items()}
+
+        base = GameStat.objects.filter(game_id=game_id).values(*cls.COUNTER_FIELDS).first() or {}
+        shard_sums = cls.objects.filter(game_id=game_id).aggregate(
+            **{field: Sum(field) for field in cls.COUNTER_FIELDS}
+        )
+        totals = {
+            field: (base.get(field) or 0) + (shard_sums[field] or 0)
+            for field in cls.COUNTER_FIELDS
+        }
+        cache.set_many(
+            {keys[field]: value for field, value in totals.items()},
+            settings.GAME_STAT_CACHE_TIMEOUT,
+        )
+        return totals
+
+    @classmethod
+    def collapse(cls, game_id):
+        """Перенести накопленные шарды игры в GameStat"""
+        with transaction.atomic():
+            shards = list(cls.objects.select_for_update().filter(game_id=game_id))
+            collected = {field: sum(getattr(s, field) for s in shards) for field in cls.COUNTER_FIELDS}
+            if not any(collected.values()):
+                return collected
+
+            # Вычитаем ровно перенесенное, чтобы не потерять параллельные инкременты
+            for s in shards:
+                cls.objects.filter(pk=s.pk).update(
+                    **{field: F(field) - getattr(s, field) for field in cls.COUNTER_FIELDS}
+                )
+
+            stat, _ = GameStat.objects.get_or_create(game_id=game_id)
+            changes = {field: F(field) + value for field, value in collected.items()}
+            last_played = max((s.last_played for s in shards if s.last_played), default=None)
+            if last_played and (stat.last_played is None or last_played > stat.last_played):
+                changes['last_played'] = last_played
+            GameStat.objects.filter(pk=stat.pk).update(**changes)
+
+        return collected
+
+    @classmethod
+    def games_with_pending_shards(cls):
+        """Игры, у которых есть неперенесенные значения в шардах"""
+        return (
+            cls.objects.exclude(views=0, play_count=0)
+            .values_list('game_id', flat=True)
+            .distinct()
+        )
+
+
+class GameViewerSketch(models.Model):
+    """HyperLogLog-скетч уникальных зрителей игры за день.
+
+    Регистры хранятся блобом фиксированного размера (hll.REGISTER_COUNT байт),
+    скетчи разных дней объединяются поэлементным максимумом.
+    """
+    game = models.ForeignKey(
+        Game,
+        on_delete=models.CASCADE,
+        related_name='viewer_sketches',
+        verbose_name='Игра'
+    )
+    day = models.DateField(verbose_name='День')
+    registers = models.BinaryField(max_length=hll.REGISTER_COUNT, verbose_name='Регистры')
+
+    class Meta:
+        unique_together = ['game', 'day']
+        verbose_name = 'Скетч уникальных зрителей'
+        verbose_name_plural = 'Скетчи уникальных зрителей'
+
+    def __str__(self):
+        return f"Зрители игры #{self.game_id} за {self.day}"
+
+    @staticmethod
+    def cache_key(game_id, day):
+        return f'viewer_sketch:{game_id}:{day.isoformat()}'
+
+    @classmethod
+    def record(cls, game_id, viewer, day=None):
+        """Учесть зрителя (ID пользователя или анонимной сессии).
+
+        Регистры только растут, поэтому если закешированный регистр не меньше
+        ранга зрителя, скетч не изменится и в БД идти не нужно.
+        """
+        day = day or timezone.localdate()
+        index, rank = hll.position(viewer)
+        key = cls.cache_key(game_id, day)
+        cached = cache.get(key)
+        if cached is not None and cached[index] >= rank:
+            return
+
+        with transaction.atomic():
+            sketch, _ = cls.objects.select_for_update().get_or_create(
+                game_id=game_id, day=day, defaults={'registers': hll.empty()}
+            )
+            registers = bytearray(sketch.registers)
+            if registers[index] < rank:
+                registers[index] = rank
+                cls.objects.filter(pk=sketch.pk).update(registers=bytes(registers))
+        cache.set(key, bytes(registers), 2 * 24 * 3600)
+
+    @classmethod
+    def unique_viewer_counts(cls, game_ids=None, days=7):
+        """Оценка уникальных зрителей за последние days дней: {game_id: число}"""
+        sketches = cls.objects.filter(day__gt=timezone.localdate() - timedelta(days=days))
+        if game_ids is not None:
+            sketches = sketches.filter(game_id__in=game_ids)
+
+        merged = {}
+        for game_id, registers in sketches.values_list('game_id', 'registers').iterator():
+            previous = merged.get(game_id)
+            merged[game_id] = bytes(registers) if previous is None else hll.merge(previous, registers)
+        return {game_id: hll.count(registers) for game_id, registers in merged.items()}
+
+
+class RecentlyPlayed(models.Model):
+    """Недавно запущенные игры пользователя одной строкой.
+
+    entries - [[id игры, unix-время запуска], ...], новые первыми, не длиннее
+    RECENTLY_PLAYED_LIMIT; игра встречается один раз. Профиль и главная читают
+    одну строку по первичному ключу - без копии в кеше процесса, которую
+    другие воркеры не увидели бы обновленной.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='recently_played',
+        verbose_name='Пользователь'
+    )
+    entries = models.JSONField(default=list, verbose_name='Игры')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлено')
+
+    class Meta:
+        verbose_name = 'Недавние игры пользователя'
+        verbose_name_plural = 'Недавние игры пользователей'
+
+    def __str__(self):
+        return f"Недавние игры пользователя #{self.user_id}"
+
+    @classmethod
+    def record(cls, user_id, game_id, played_at=None):
+        """Поставить игру в начало списка (старые записи за пределами лимита отбрасываются)"""
+        played_at = int((played_at or timezone.now()).timestamp())
+        current = cls.entries_for(user_id)
+        # Повторный запуск той же игры в пределах минуты список не меняет
+        if current and current[0][0] == game_id and played_at - current[0][1] < 60:
+            return current
+
+        with transaction.atomic():
+            row, _ = cls.objects.select_for_update().get_or_create(user_id=user_id)
+            entries = [[game_id, played_at]] + [entry for entry in row.entries if entry[0] != game_id]
+            row.entries = entries[:settings.RECENTLY_PLAYED_LIMIT]
+            row.save(update_fields=['entries', 'updated_at'])
+        return row.entries
+
+    @classmethod
+    def entries_for(cls, user_id):
+        return cls.objects.filter(pk=user_id).values_list('entries', flat=True).first() or []
+
+    @classmethod
+    def games_for(cls, user_id, limit=None):
+        """[(игра, время запуска)] одобренных игр из списка - одним запросом к играм"""
+        entries = cls.entries_for(user_id)[:limit]
+        games = Game.objects.filter(status='approved').in_bulk([game_id for game_id, _ in entries])
+        return [
+            (games[game_id], datetime.fromtimestamp(played_at, tz=dt_timezone.utc))
+            for game_id, played_at in entries if game_id in games
+        ]
+
+
+class GameSave(models.Model):
+    """Слот облачного сохранения пользователя в игре (см. games/saves.py).
+
+    Строка хранит только метаданные: само состояние лежит в GameSaveRecord -
+    снимок на base_version и JSON merge patch на каждую следующую версию.
+    version растет с каждой записью и служит для оптимистичной блокировки.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='game_saves',
+        verbose_name='Пользователь'
+    )
+    game = models.ForeignKey(
+        Game,
+        on_delete=models.CASCADE,
+        related_name='saves',
+        verbose_name='Игра'
+    )
+    slot = models.SlugField(max_length=32, db_index=False, verbose_name='Слот')
+    version = models.PositiveIntegerField(default=1, verbose_name='Версия')
+    base_version = models.PositiveIntegerField(default=1, verbose_name='Версия снимка')
+    size = models.PositiveIntegerField(default=0, verbose_name='Размер состояния (байт)')
+    stored_size = models.PositiveIntegerField(default=0, verbose_name='Занято в БД (байт)')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    updated_at = models.DateTimeField(default=timezone.now, verbose_name='Дата обновления')
+
+    class Meta:
+        ordering = ['slot']
+        verbose_name = 'Облачное сохранение'
+        verbose_name_plural = 'Облачные сохранения'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'game', 'slot'], name='unique_game_save_slot'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}/{self.game_id}/{self.slot} v{self.version}"
+
+
+class GameSaveRecord(models.Model):
+    """Сжатый zlib снимок состояния слота или патч к предыдущей версии"""
+    save_slot = models.ForeignKey(
+        GameSave,
+        on_delete=models.CASCADE,
+        related_name='records',
+        verbose_name='Слот'
+    )
+    version = models.PositiveIntegerField(verbose_name='Версия')
+    is_snapshot = models.BooleanField(default=False, verbose_name='Снимок')
+    blob = models.BinaryField(verbose_name='Данные (zlib)')
+
+    class Meta:
+        ordering = ['version']
+        verbose_name = 'Запись сохранения'
+        verbose_name_plural = 'Записи сохранений'
+        constraints = [
+            # Загрузка слота: save_slot_id = ? AND version >= base_version ORDER BY version
+            models.UniqueConstraint(fields=['save_slot', 'version'], name='unique_game_save_record_version'),
+        ]
+
+    def __str__(self):
+        kind = 'снимок' if self.is_snapshot else 'патч'
+        return f"{self.save_slot_id} v{self.version} ({kind})"
+
+
+class ModerationEventQuerySet(models.QuerySet):
+    """Журнал только дополняется: массовые update() и delete() запрещены"""
+
+    def update(self, **kwargs):
+        raise TypeError('Журнал модерации нельзя изменять')
+
+    def delete(self):
+        raise TypeError('Журнал модерации нельзя изменять')
+
+    def for_game(self, game_id):
+        return self.filter(game_id=game_id).order_by('-created_at')
+
+    def by_moderator(self, moderator_id):
+        return self.filter(moderator_id=moderator_id).order_by('-created_at')
+
+    def between(self, start, end=None):
+        events = self.filter(created_at__gte=start)
+        if end is not None:
+            events = events.filter(created_at__lt=end)
+        return events
+
+
+class ModerationEvent(models.Model):
+    """Запись журнала модерации: кто, когда и как сменил статус игры.
+
+    Пишется bulk_create в одной транзакции со сменой статуса (games/moderation.py).
+    Ссылки на игру и модератора без ограничений FK и каскадов, а название
+    и имя сохраняются копией - история переживает удаление игры и пользователя.
+    """
+    ACTION_CHOICES = (
+        ('approve', 'Одобрение'),
+        ('reject', 'Отклонение'),
+    )
+    SOURCE_CHOICES = (
+        ('site', 'Сайт'),
+        ('admin', 'Админка'),
+    )
+
+    game = models.ForeignKey(
+        Game,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='moderation_events',
+        verbose_name='Игра'
+    )
+    game_title = models.CharField(max_length=200, verbose_name='Название игры')
+    moderator = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        related_name='moderation_events',
+        verbose_name='Модератор'
+    )
+    moderator_name = models.CharField(max_length=150, verbose_name='Имя модератора')
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES, verbose_name='Действие')
+    from_status = models.CharField(max_length=10, verbose_name='Прежний статус')
+    to_status = models.CharField(max_length=10, verbose_name='Новый статус')
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, verbose_name='Источник')
+    created_at = models.DateTimeField(default=timezone.now, verbose_name='Время')
+
+    objects = ModerationEventQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Событие модерации'
+        verbose_name_plural = 'Журнал модерации'
+        indexes = [
+            # История игры и модератора: ... ORDER BY -created_at без сортировки
+            models.Index(fields=['game', '-created_at'], name='modevent_game_created_idx'),
+            models.Index(fields=['moderator', '-created_at'], name='modevent_moderator_created_idx'),
+            # Сводка и выборки за период
+            models.Index(fields=['created_at'], name='modevent_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.moderator_name}: {self.get_action_display()} «{self.game_title}»"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise TypeError('Журнал модерации нельзя изменять')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise TypeError('Журнал модерации нельзя изменять')
+
+
+class DeletionTask(models.Model):
+    """Фоновое удаление игры или пользователя порциями (см. games/deletion.py)"""
+    TARGET_CHOICES = (
+        ('game', 'Игра'),
+        ('user', 'Пользователь'),
+    )
+    STATUS_CHOICES = (
+        ('pending', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('done', 'Завершено'),
+        ('failed', 'Ошибка'),
+    )
+
+    target_type = models.CharField(max_length=10, choices=TARGET_CHOICES, verbose_name='Что удаляется')
+    target_id = models.PositiveBigIntegerField(verbose_name='ID объекта')
+    target_repr = models.CharField(max_length=255, verbose_name='Объект')
+    requested_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Инициатор'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='pending',
+        verbose_name='Статус'
+    )
+    total_rows = models.PositiveIntegerField(default=0, verbose_name='Всего строк (оценка)')
+    deleted_rows = models.PositiveIntegerField(default=0, verbose_name='Удалено строк')
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Дата завершения')
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name = 'Задача удаления'
+        verbose_name_plural = 'Задачи удаления'
+
+    def __str__(self):
+        return f"Удаление {self.get_target_type_display().lower()} {self.target_repr}"
+
+    def get_progress(self):
+        """Процент выполнения"""
+        if self.status == 'done':
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, int(self.deleted_rows * 100 / self.total_rows))
+
+
+class Job(models.Model):
+    """Задача фоновой очереди (см. games/jobs.py и команду run_jobs)"""
+    STATUS_CHOICES = (
+        ('queued', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('done', 'Завершено'),
+        ('failed', 'Ошибка'),
+    )
+
+    name = models.CharField(max_length=100, verbose_name='Задача')
+    payload = models.JSONField(default=dict, blank=True, verbose_name='Аргументы')
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='queued',
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')
+    max_attempts = models.PositiveSmallIntegerField(default=5, verbose_name='Максимум попыток')
+    run_at = models.DateTimeField(default=timezone.now, verbose_name='Запустить не раньше')
+    locked_by = models.CharField(max_length=100, blank=True, verbose_name='Обработчик')
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name='Захвачена')
+    last_error = models.TextField(blank=True, verbose_name='Последняя ошибка')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Дата завершения')
+
+    class Meta:
+        ordering = ['run_at']
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = [
+            # Выборка готовых задач: status='queued' AND run_at <= now ORDER BY run_at
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.get_status_display()})"
@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
+
+from .models import Game, ModerationEvent
+from .page_cache import bump_catalog_version
+
+# Действие модерации -> новый статус игры
+ACTION_STATUSES = {
+    'approve': 'approved',
+    'reject': 'rejected',
+}
+STATUS_ACTIONS = {status: action for action, status in ACTION_STATUSES.items()}
+
+
+def _event(game, from_status, action, moderator, source, now):
+    return ModerationEvent(
+        game_id=game.pk,
+        game_title=game.title,
+        moderator_id=moderator.pk,
+        moderator_name=moderator.get_username(),
+        action=action,
+        from_status=from_status,
+        to_status=ACTION_STATUSES[action],
+        source=source,
+        created_at=now,
+    )
+
+
+def moderate(game, action, moderator, source='site'):
+    """Одобрить или отклонить игру с записью в журнал; False, если статус не изменился.
+
+    Статус перечитывается под блокировкой строки: из двух одновременных решений
+    второе видит уже новый статус. Удаляемые игры не модерируются.
+    save() вызывается, чтобы сработали сигналы (кеш страниц, индексы каталога).
+    """
+    status = ACTION_STATUSES[action]
+    now = timezone.now()
+    with transaction.atomic():
+        current = (
+            Game.objects.select_for_update()
+            .filter(pk=game.pk)
+            .exclude(status='deleting')
+            .values_list('status', flat=True)
+            .first()
+        )
+        if current is None or current == status:
+            return False
+
+        event = _event(game, current, action, moderator, source, now)
+        game.status = status
+        if action == 'approve':
+            game.published_at = now
+        game.save()
+        ModerationEvent.objects.bulk_create([event])
+    return True
+
+
+def moderate_queryset(queryset, action, moderator, source='admin'):
+    """Массовая модерация: один UPDATE и одна пачка событий в общей транзакции"""
+    status = ACTION_STATUSES[action]
+    now = timezone.now()
+    with transaction.atomic():
+        # queryset админки несет аннотации со статистикой - блокируем только сами строки игр
+        games = list(
+            Game.objects.select_for_update()
+            .filter(pk__in=list(queryset.values_list('pk', flat=True)))
+            .exclude(status__in=[status, 'deleting'])
+            .only('pk', 'title', 'status')
+        )
+        if not games:
+            return 0
+        Game.objects.filter(pk__in=[game.pk for game in games]).update(status=status, updated_at=now)
+        ModerationEvent.objects.bulk_create(
+            [_event(game, game.status, action, moderator, source, now) for game in games]
+        )
+    bump_catalog_version()
+    return len(games)
+
+
+def moderator_summary(days):
+    """Производительность модераторов за days дней одним агрегирующим запросом"""
+    since = timezone.now() - timedelta(days=days)
+    rows = (
+        ModerationEvent.objects.between(since)
+        .order_by()
+        .values('moderator_id')
+        .annotate(
+            name=Max('moderator_name'),
+            total=Count('pk'),
+            approved=Count('pk', filter=Q(action='approve')),
+            rejected=Count('pk', filter=Q(action='reject')),
+            first_at=Min('created_at'),
+            last_at=Max('created_at'),
+        )
+        .order_by('-total')
+    )
+    summary = list(rows)
+    for row in summary:
+        row['per_day'] = round(row['total'] / days, 1)
+    return summary
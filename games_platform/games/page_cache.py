@@ -0,0 +1,132 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache, caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+CATALOG_VERSION_KEY = 'page_cache:catalog'
+# Страницы, которые показывают рейтинг нескольких игр (лучшие, популярные)
+RATINGS_VERSION_KEY = 'page_cache:ratings'
+
+
+def game_version_key(game_id):
+    return f'page_cache:game:{game_id}'
+
+
+def version_cache():
+    """Кеш версий (VERSION_CACHE): общий для воркеров, чтобы сброс в одном процессе видели все"""
+    return caches[settings.VERSION_CACHE]
+
+
+def get_version(key):
+    """Версия (время последнего изменения) набора закешированных данных"""
+    versions = version_cache()
+    version = versions.get(key)
+    if version is None:
+        versions.add(key, time.time(), None)
+        version = versions.get(key)
+    return version
+
+
+def bump_version(key):
+    version_cache().set(key, time.time(), None)
+
+
+def catalog_version():
+    """Текущая версия каталога или None, если каталог еще не менялся"""
+    return version_cache().get(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    """Сбросить кеш всех страниц каталога (изменение или модерация игры)"""
+    bump_version(CATALOG_VERSION_KEY)
+
+
+def bump_game_version(game_id):
+    """Сбросить кеш страницы одной игры (комментарии, оценки)"""
+    bump_version(game_version_key(game_id))
+
+
+def bump_ratings_version():
+    """Сбросить кеш страниц с рейтингами игр (новая или удаленная оценка)"""
+    bump_version(RATINGS_VERSION_KEY)
+
+
+def ratings_scope(request, *args, **kwargs):
+    """scope для anonymous_page_cache страниц с рейтингами"""
+    return RATINGS_VERSION_KEY
+
+
+def _is_cacheable_request(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    # Страница с непоказанными сообщениями должна быть отрисована заново
+    if CookieStorage.cookie_name in request.COOKIES:
+        return False
+    return not request.user.is_authenticated
+
+
+def _response_from_entry(request, entry):
+    last_modified = int(entry['last_modified'])
+    response = get_conditional_response(request, etag=entry['etag'], last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(entry['content'], content_type=entry['content_type'])
+
+    response.headers['ETag'] = entry['etag']
+    response.headers['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ('Cookie',))
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def anonymous_page_cache(scope=None, on_hit=None):
+    """Кеш целых страниц для анонимных пользователей.
+
+    Ключ - полный URL с query string и версии каталога и scope (если задан,
+    scope возвращает ключ версии по аргументам представления).
+    Ответы получают ETag/Last-Modified, совпавший If-None-Match отдает 304
+    без отрисовки. on_hit вызывается при отдаче из кеша - например, чтобы
+    посчитать просмотр.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not _is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+
+            versions = [get_version(CATALOG_VERSION_KEY)]
+            if scope is not None:
+                versions.append(get_version(scope(request, *args, **kwargs)))
+
+            path_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()
+            key = 'page_cache:page:{}:{}:{}'.format(
+                view_func.__name__, ':'.join(repr(v) for v in versions), path_hash
+            )
+
+            entry = cache.get(key)
+            if entry is not None:
+                if on_hit is not None:
+                    on_hit(request, *args, **kwargs)
+                return _response_from_entry(request, entry)
+
+            response = view_func(request, *args, **kwargs)
+            if response.status_code != 200 or response.streaming or response.cookies:
+                return response
+
+            entry = {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'etag': quote_etag(hashlib.md5(response.content).hexdigest()),
+                'last_modified': max(versions),
+            }
+            cache.set(key, entry, settings.PAGE_CACHE_TIMEOUT)
+            return _response_from_entry(request, entry)
+
+        return wrapper
+
+    return decorator
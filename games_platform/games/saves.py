@@ -0,0 +1,199 @@
+import json
+import zlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import GameSave, GameSaveRecord
+
+COMPRESSION_LEVEL = 6
+MAX_SLOT_LENGTH = 32
+
+
+class SaveError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class SaveConflict(SaveError):
+    """Версия клиента устарела: version - текущая версия слота (0 - слота нет)"""
+
+    def __init__(self, version):
+        super().__init__('Сохранение уже изменено в другом месте', status=409)
+        self.version = version
+
+
+def dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def pack(raw):
+    return zlib.compress(raw, COMPRESSION_LEVEL)
+
+
+def unpack(blob):
+    return json.loads(zlib.decompress(blob))
+
+
+def merge_patch(target, patch):
+    """JSON merge patch (RFC 7386): объекты сливаются рекурсивно, null удаляет ключ"""
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+def _check_slot(slot):
+    if not slot or len(slot) > MAX_SLOT_LENGTH:
+        raise SaveError(f'Имя слота - от 1 до {MAX_SLOT_LENGTH} символов')
+
+
+def _check_size(raw):
+    if len(raw) > settings.SAVE_MAX_BYTES:
+        raise SaveError(f'Сохранение больше {settings.SAVE_MAX_BYTES} байт', status=413)
+
+
+def _slot(user, game, slot):
+    return GameSave.objects.filter(user=user, game=game, slot=slot)
+
+
+def _current_version(user, game, slot):
+    return _slot(user, game, slot).values_list('version', flat=True).first() or 0
+
+
+def _advance(save, expected, **fields):
+    """Условный UPDATE версии слота - проигравший гонку писатель получает конфликт"""
+    updated = GameSave.objects.filter(pk=save.pk, version=expected).update(
+        version=expected + 1, updated_at=timezone.now(), **fields
+    )
+    if not updated:
+        raise SaveConflict(_current_version(save.user_id, save.game_id, save.slot))
+    return expected + 1
+
+
+def _replay(records):
+    """(состояние, версия, цепочка) из записей слота: последний снимок и патчи после него.
+
+    Записи читаются без блокировки, поэтому между чтением слота и записей могло
+    пройти сворачивание - тогда начинаем с более нового снимка.
+    """
+    start = max((i for i, (_, is_snapshot, _) in enumerate(records) if is_snapshot), default=None)
+    if start is None:
+        raise SaveError('Сохранение повреждено', status=500)
+    state = unpack(records[start][2])
+    for _, _, blob in records[start + 1:]:
+        state = merge_patch(state, unpack(blob))
+    return state, records[-1][0], records[start:]
+
+
+def _records(save):
+    return list(
+        save.records.filter(version__gte=save.base_version)
+        .order_by('version')
+        .values_list('version', 'is_snapshot', 'blob')
+    )
+
+
+def list_slots(user, game):
+    return list(GameSave.objects.filter(user=user, game=game).values('slot', 'version', 'size', 'updated_at'))
+
+
+def load(user, game, slot):
+    """Состояние слота {'slot', 'version', 'size', 'updated_at', 'data'} или None"""
+    save = _slot(user, game, slot).first()
+    if save is None:
+        return None
+    state, version, _ = _replay(_records(save))
+    return {
+        'slot': slot,
+        'version': version,
+        'size': save.size,
+        'updated_at': save.updated_at,
+        'data': state,
+    }
+
+
+def write(user, game, slot, data, version):
+    """Заменить состояние слота целиком новым снимком.
+
+    version - версия, которую видел клиент; 0 - создать новый слот.
+    """
+    _check_slot(slot)
+    raw = dumps(data)
+    _check_size(raw)
+    blob = pack(raw)
+
+    with transaction.atomic():
+        if version == 0:
+            # Строка игрока блокируется, чтобы параллельные создания слотов
+            # не проскочили лимит по одному и тому же count()
+            get_user_model().objects.select_for_update().filter(pk=user.pk).values_list('pk', flat=True).first()
+            if GameSave.objects.filter(user=user, game=game).count() >= settings.SAVE_MAX_SLOTS:
+                raise SaveError(f'Не больше {settings.SAVE_MAX_SLOTS} слотов на игру')
+            try:
+                with transaction.atomic():
+                    save = GameSave.objects.create(
+                        user=user, game=game, slot=slot, size=len(raw), stored_size=len(blob)
+                    )
+            except IntegrityError:
+                raise SaveConflict(_current_version(user, game, slot))
+            new_version = save.version
+        else:
+            save = _slot(user, game, slot).only('pk', 'user', 'game', 'slot').first()
+            if save is None:
+                raise SaveConflict(0)
+            new_version = _advance(save, version, base_version=version + 1, size=len(raw), stored_size=len(blob))
+            save.records.filter(version__lt=new_version).delete()
+        GameSaveRecord.objects.create(save_slot=save, version=new_version, is_snapshot=True, blob=blob)
+    return {'slot': slot, 'version': new_version, 'size': len(raw)}
+
+
+def patch(user, game, slot, changes, version):
+    """Применить JSON merge patch к слоту, записав только сам патч.
+
+    Снимок не перезаписывается, пока патчей не больше SAVE_MAX_PATCHES и они
+    в сумме меньше снимка - иначе состояние сворачивается в новый снимок.
+    """
+    save = _slot(user, game, slot).first()
+    if save is None:
+        raise SaveConflict(0)
+    if save.version != version:
+        raise SaveConflict(save.version)
+
+    state, current, chain = _replay(_records(save))
+    if current != version:
+        raise SaveConflict(current)
+    raw = dumps(merge_patch(state, changes))
+    _check_size(raw)
+    patch_blob = pack(dumps(changes))
+
+    snapshot_bytes = len(chain[0][2])
+    patch_bytes = sum(len(blob) for _, _, blob in chain[1:]) + len(patch_blob)
+    compact = len(chain) > settings.SAVE_MAX_PATCHES or patch_bytes > snapshot_bytes
+
+    with transaction.atomic():
+        if compact:
+            blob = pack(raw)
+            new_version = _advance(save, version, base_version=version + 1, size=len(raw), stored_size=len(blob))
+            GameSaveRecord.objects.create(save_slot=save, version=new_version, is_snapshot=True, blob=blob)
+            save.records.filter(version__lt=new_version).delete()
+        else:
+            new_version = _advance(save, version, size=len(raw), stored_size=F('stored_size') + len(patch_blob))
+            GameSaveRecord.objects.create(save_slot=save, version=new_version, blob=patch_blob)
+    return {'slot': slot, 'version': new_version, 'size': len(raw)}
+
+
+def delete(user, game, slot, version):
+    """Удалить слот, если клиент видел его последнюю версию"""
+    deleted, _ = _slot(user, game, slot).filter(version=version).delete()
+    if not deleted:
+        raise SaveConflict(_current_version(user, game, slot))
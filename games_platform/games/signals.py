@@ -1,6 +1,10 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_save, post_delete
 from django.dispatch import receiver
-from .models import Game, GameStat
+from .models import Game, GameStat, Tag, Comment, GameRating, dashboard_version_key, invalidate_developer_dashboard
+from .autocomplete import title_index
+from .live import publish_comment, publish_stats
+from .page_cache import bump_catalog_version, bump_game_version, bump_ratings_version, bump_version
+from .tags import tag_index
 
 
 @receiver(post_save, sender=Game)
@@ -11,7 +15,70 @@ def create_game_stat(sender, instance, created, **kwargs):
 
 
 @receiver(post_save, sender=Game)
-def save_game_stat(sender, instance, **kwargs):
-    """Сохраняем статистику при сохранении игры"""
-    if hasattr(instance, 'stats'):
-        instance.stats.save()
+@receiver(post_delete, sender=Game)
+def invalidate_catalog_pages(sender, instance, **kwargs):
+    """Изменение или модерация игры сбрасывает кеш страниц каталога и аналитики"""
+    bump_catalog_version()
+    bump_version(dashboard_version_key(instance.developer_id))
+
+
+@receiver(post_save, sender=Game)
+def update_catalog_indexes(sender, instance, **kwargs):
+    """Название и модерация игры сразу попадают в индексы автодополнения и тегов"""
+    title_index.update(instance)
+    tag_index.update(instance)
+
+
+@receiver(post_delete, sender=Game)
+def remove_from_catalog_indexes(sender, instance, **kwargs):
+    title_index.remove(instance.pk)
+    tag_index.remove(instance.pk)
+
+
+@receiver(m2m_changed, sender=Game.tags.through)
+def update_game_tags(sender, instance, action, reverse, **kwargs):
+    """Смена тегов игры обновляет ее биты; изменения со стороны тега - перестройка индекса"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    bump_catalog_version()
+    if reverse:
+        tag_index.invalidate()
+    else:
+        tag_index.update(instance)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_index(sender, instance, **kwargs):
+    bump_catalog_version()
+    tag_index.invalidate()
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=GameRating)
+@receiver(post_delete, sender=GameRating)
+def invalidate_game_page(sender, instance, **kwargs):
+    """Комментарии и оценки сбрасывают кеш страницы игры и аналитики"""
+    bump_game_version(instance.game_id)
+    invalidate_developer_dashboard(instance.game_id)
+
+
+@receiver(post_save, sender=Comment)
+def publish_new_comment(sender, instance, created, **kwargs):
+    """Новый комментарий уходит подписчикам страницы игры"""
+    if created:
+        publish_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def publish_deleted_comment(sender, instance, **kwargs):
+    publish_stats(instance.game_id, comments=-1)
+
+
+@receiver(post_save, sender=GameRating)
+@receiver(post_delete, sender=GameRating)
+def update_rating_score(sender, instance, **kwargs):
+    """Оценка пересчитывает байесовский рейтинг игры и сбрасывает кеш страниц с рейтингами"""
+    Game.update_rating_scores([instance.game_id])
+    bump_ratings_version()
@@ -0,0 +1,132 @@
+import threading
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+
+from .page_cache import catalog_version
+
+
+class TagIndex:
+    """Битовые карты одобренных игр по тегам в памяти процесса.
+
+    Бит с номером pk игры выставлен в карте тега, если игра одобрена и имеет
+    этот тег; approved - карта всех одобренных игр. Пересечение выбранных
+    тегов - побитовое И, число игр в фасете - bit_count(), без GROUP BY по
+    каталогу на каждый запрос.
+
+    Модерация и смена тегов своей игры применяются сигналами точечно, прочие
+    изменения (другие процессы, массовые update() в админке) видны по версии
+    каталога в общем кеше VERSION_CACHE - тогда индекс перестраивается. Без
+    сдвига версии индекс перестраивается раз в TAG_INDEX_REFRESH.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.built = False
+        self.tags = []  # (id, slug, название) в порядке названий
+        self.bitmaps = {}  # id тега -> карта игр
+        self.approved = 0
+        self.game_tags = {}  # id одобренной игры -> frozenset id тегов
+        self.version = None
+        self.refresh_at = 0
+
+    def rebuild(self):
+        from .models import Game, Tag
+
+        version = catalog_version()
+        tags = list(Tag.objects.values_list('pk', 'slug', 'name'))
+        game_tags = {pk: set() for pk in Game.objects.filter(status='approved').values_list('pk', flat=True)}
+        links = Game.tags.through.objects.filter(game__status='approved').values_list('game_id', 'tag_id')
+        for game_id, tag_id in links:
+            game_tags[game_id].add(tag_id)
+
+        bitmaps = {pk: 0 for pk, _, _ in tags}
+        approved = 0
+        for game_id, tag_ids in game_tags.items():
+            bit = 1 << game_id
+            approved |= bit
+            for tag_id in tag_ids:
+                bitmaps[tag_id] |= bit
+
+        with self._lock:
+            self.tags, self.bitmaps, self.approved = tags, bitmaps, approved
+            self.game_tags = {pk: frozenset(tag_ids) for pk, tag_ids in game_tags.items()}
+            self.version = version
+            self.refresh_at = time.monotonic() + settings.TAG_INDEX_REFRESH
+            self.built = True
+
+    def invalidate(self):
+        """Перестроить при следующем запросе (изменились сами теги)"""
+        self.built = False
+
+    def _ensure_fresh(self):
+        if not self.built or time.monotonic() >= self.refresh_at or catalog_version() != self.version:
+            self.rebuild()
+
+    def update(self, game):
+        """Игра одобрена, снята с публикации или сменила теги (сигналы Game)"""
+        if not self.built:
+            return
+        tag_ids = frozenset(game.tags.values_list('pk', flat=True)) if game.status == 'approved' else None
+        with self._lock:
+            self._set_game(game.pk, tag_ids)
+            # Версию каталога уже сдвинул сигнал invalidate_catalog_pages - это наше же изменение
+            self.version = catalog_version()
+
+    def remove(self, game_id):
+        if not self.built:
+            return
+        with self._lock:
+            self._set_game(game_id, None)
+            self.version = catalog_version()
+
+    def _set_game(self, game_id, tag_ids):
+        bit = 1 << game_id
+        for tag_id in self.game_tags.pop(game_id, ()):
+            self.bitmaps[tag_id] &= ~bit
+        self.approved &= ~bit
+        if tag_ids is None:
+            return
+        self.game_tags[game_id] = tag_ids
+        self.approved |= bit
+        for tag_id in tag_ids:
+            if tag_id in self.bitmaps:
+                self.bitmaps[tag_id] |= bit
+
+    def facets(self, selected_slugs):
+        """Выбранные теги [(id, slug)] и фасеты для каталога.
+
+        Фасет - тег с числом одобренных игр, подходящих под выбор вместе с ним,
+        и query string, которая включает или выключает тег.
+        """
+        self._ensure_fresh()
+        selected_slugs = set(selected_slugs)
+        with self._lock:
+            selected = [(pk, slug) for pk, slug, _ in self.tags if slug in selected_slugs]
+            matching = self.approved
+            for pk, _ in selected:
+                matching &= self.bitmaps[pk]
+
+            facets = []
+            chosen = [slug for _, slug in selected]
+            for pk, slug, name in self.tags:
+                is_selected = slug in selected_slugs
+                count = (matching & self.bitmaps[pk]).bit_count()
+                if not count and not is_selected:
+                    continue
+                toggled = [other for other in chosen if other != slug] if is_selected else chosen + [slug]
+                facets.append({
+                    'slug': slug,
+                    'name': name,
+                    'count': count,
+                    'selected': is_selected,
+                    'query': urlencode({'tag': toggled}, doseq=True),
+                })
+        return selected, facets
+
+
+tag_index = TagIndex()
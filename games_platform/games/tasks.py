@@ -0,0 +1,48 @@
+from django.core.files.storage import default_storage
+from django.db.models import F
+
+from .deletion import run_deletion_task
+from .jobs import job
+from .media_gc import is_referenced
+from .live import publish_stats
+from .models import DeletionTask, Game, GameStat, GameStatShard, RecentlyPlayed, invalidate_developer_dashboard
+
+
+@job('games.run_deletion')
+def run_deletion(task_id):
+    """Фоновое удаление игры или пользователя (задача могла уже выполниться командой process_deletions).
+
+    Ошибка помечает задачу удаления failed и пробрасывается - очередь повторит
+    job, и повтор продолжает ту же задачу с оставшихся строк.
+    """
+    task = DeletionTask.objects.filter(pk=task_id, status__in=['pending', 'running', 'failed']).first()
+    if task is not None:
+        run_deletion_task(task)
+
+
+@job('games.delete_replaced_media')
+def delete_replaced_media(names):
+    """Удалить файлы, замененные при редактировании игры, если на них больше нет ссылок"""
+    for name in names:
+        if not is_referenced(name):
+            default_storage.delete(name)
+
+
+@job('games.deferred_play_count')
+def deferred_play_count(pk, user_id, data):
+    """Запуск игры, отложенный LoadSheddingMiddleware при перегрузке"""
+    if Game.objects.filter(pk=pk).exists():
+        GameStatShard.increment(pk, 'play_count')
+        RecentlyPlayed.record(user_id, pk)
+
+
+@job('games.deferred_like')
+def deferred_like(pk, user_id, data):
+    """Лайк/дизлайк, отложенный LoadSheddingMiddleware при перегрузке"""
+    action = data.get('action')
+    if action not in ('like', 'dislike'):
+        return
+    field = f'{action}s'
+    if GameStat.objects.filter(game_id=pk).update(**{field: F(field) + 1}):
+        invalidate_developer_dashboard(pk)
+        publish_stats(pk, **{field: 1})
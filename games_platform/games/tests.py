@@ -1,3 +1,1917 @@
-from django.test import TestCase
+import asyncio
+import base64
+import gzip
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db.models import Sum
+from django.db import connections
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from games_platform.cache import SharedMemoryCache, _Table
+from games_platform.overload import monitor
+from games_platform.pagination import EstimatedCountPaginator
+from games_platform.ratelimit import client_ip, local_buckets
+from games_platform.routers import PIN_COOKIE_NAME, PrimaryReplicaRouter
+from games_platform.views import accepted_encodings
+from . import hll, saves
+from .autocomplete import title_index
+from .deletion import schedule_game_deletion
+from .live import hub, publish_stats
+from .jobs import Worker, claim_jobs, enqueue, heartbeat, job, queue_stats, release_stale_jobs, run_job
+from .media_gc import delete_orphans, find_orphans, scan_media
+from .moderation import moderate, moderator_summary
+from .models import (
+    Game, GameStat, GameStatShard, GameViewerSketch, Comment, GameRating, DeletionTask, Job, Tag, RecentlyPlayed,
+    ModerationEvent, GameSave, GameSaveRecord, invalidate_developer_dashboard,
+)
+from .page_cache import bump_catalog_version
+from .tags import tag_index
+
+User = get_user_model()
+
+
+def game_queries(context):
+    """SQL-запросы к таблице игр из захваченного контекста"""
+    return [q['sql'] for q in context.captured_queries if 'games_game' in q['sql']]
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    # Реплика в тестах - зеркало default, поэтому данные должны быть закоммичены
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.developer = User.objects.create_user(
+            username='dev', password='pass12345', user_type='developer'
+        )
+        self.game = Game.objects.create(
+            title='Test game',
+            description='Описание',
+            developer=self.developer,
+            html_file='games/html/index.html',
+            status='approved',
+        )
+
+    def get_with_capture(self, url):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(url)
+        return response, primary, replica
+
+    def test_catalog_reads_go_to_replica(self):
+        for name in ['game_list', 'popular_games', 'best_rated_games', 'api_game_list']:
+            response, primary, replica = self.get_with_capture(reverse(name))
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(game_queries(replica), name)
+            self.assertFalse(game_queries(primary), name)
+
+    def test_home_reads_go_to_replica(self):
+        self.client.force_login(self.developer)
+        response, primary, replica = self.get_with_capture(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(game_queries(replica))
+        self.assertFalse(game_queries(primary))
+
+    def test_other_views_read_from_primary(self):
+        response, primary, replica = self.get_with_capture(
+            reverse('game_detail', args=[self.game.pk])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(game_queries(primary))
+        self.assertFalse(replica.captured_queries)
+
+    def test_write_pins_user_to_primary(self):
+        self.client.force_login(self.developer)
+        response = self.client.post(
+            reverse('add_comment', args=[self.game.pk]), {'text': 'Комментарий'}
+        )
+        self.assertIn(PIN_COOKIE_NAME, response.cookies)
+
+        response, primary, replica = self.get_with_capture(reverse('game_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(game_queries(primary))
+        self.assertFalse(replica.captured_queries)
+
+    def test_router_sends_writes_to_primary(self):
+        router = PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_write(Game), 'default')
+        self.assertEqual(router.db_for_read(Game), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'games'))
+
+
+class ReplicaInTransactionTests(TestCase):
+    databases = {'default', 'replica'}
+
+    def test_catalog_reads_primary_inside_transaction(self):
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(reverse('game_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(replica.captured_queries)
+
+
+class ShardedCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        developer = User.objects.create_user(username='dev', password='pass12345', user_type='developer')
+        self.game = Game.objects.create(
+            title='Test game', description='Описание', developer=developer,
+            html_file='games/html/index.html', status='approved',
+        )
+
+    def test_increments_spread_over_shards_and_sum(self):
+        for _ in range(50):
+            self.game.increment_views()
+        for _ in range(5):
+            self.game.increment_play_count()
+
+        self.assertGreater(GameStatShard.objects.filter(game=self.game).count(), 1)
+        cache.clear()
+        self.assertEqual(self.game.get_view_count(), 50)
+        self.assertEqual(self.game.get_play_count(), 5)
+
+    def test_totals_are_cached_and_kept_fresh(self):
+        self.game.increment_views()
+        self.assertEqual(self.game.get_view_count(), 1)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.game.get_view_count(), 1)
+
+        self.game.increment_views()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.game.get_view_count(), 2)
+
+    def test_collapse_moves_shards_into_gamestat(self):
+        for _ in range(20):
+            self.game.increment_views()
+        self.game.increment_play_count()
+
+        call_command('collapse_stat_shards', stdout=StringIO())
+
+        stat = GameStat.objects.get(game=self.game)
+        self.assertEqual(stat.views, 20)
+        self.assertEqual(stat.play_count, 1)
+        self.assertIsNotNone(stat.last_played)
+        self.assertFalse(GameStatShard.games_with_pending_shards().exists())
+
+        cache.clear()
+        self.assertEqual(self.game.get_view_count(), 20)
+        self.game.increment_views()
+        cache.clear()
+        self.assertEqual(self.game.get_view_count(), 21)
+
+    def test_stale_stat_objects_do_not_undo_collapse(self):
+        player = User.objects.create_user(username='player', password='pass12345')
+        self.client.force_login(player)
+        game = Game.objects.select_related('stats').get(pk=self.game.pk)
+        for _ in range(5):
+            game.increment_views()
+        call_command('collapse_stat_shards', stdout=StringIO())
+
+        # Объекты со старым GameStat в памяти не перезаписывают строку целиком
+        game.save()
+        response = self.client.post(reverse('toggle_like', args=[game.pk]), {'action': 'like'},
+                                    HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.json()['likes'], 1)
+
+        stat = GameStat.objects.get(game=game)
+        self.assertEqual((stat.views, stat.likes), (5, 1))
+
+
+class AnonymousPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.developer = User.objects.create_user(username='dev', password='pass12345', user_type='developer')
+        self.game = Game.objects.create(
+            title='Test game', description='Описание', developer=self.developer,
+            html_file='games/html/index.html', status='approved',
+        )
+
+    def shard_views(self):
+        return GameStatShard.objects.filter(game=self.game).aggregate(total=Sum('views'))['total']
+
+    def test_catalog_pages_are_cached_for_anonymous(self):
+        for name in ['home', 'game_list', 'popular_games', 'best_rated_games']:
+            first = self.client.get(reverse(name))
+            self.assertIn('ETag', first)
+            self.assertIn('Last-Modified', first)
+
+            with self.assertNumQueries(0):
+                second = self.client.get(reverse(name))
+            self.assertEqual(first.content, second.content)
+
+    def test_query_string_is_part_of_key(self):
+        self.client.get(reverse('game_list'))
+        with CaptureQueriesContext(connections['default']) as queries:
+            self.client.get(reverse('game_list') + '?page=2')
+        self.assertTrue(game_queries(queries))
+
+    def test_matching_etag_returns_304(self):
+        etag = self.client.get(reverse('game_list'))['ETag']
+        response = self.client.get(reverse('game_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_game_changes_invalidate_pages(self):
+        self.client.get(reverse('game_list'))
+        self.game.title = 'Renamed game'
+        self.game.save()
+        self.assertContains(self.client.get(reverse('game_list')), 'Renamed game')
+
+        self.game.status = 'rejected'
+        self.game.save()
+        self.assertNotContains(self.client.get(reverse('game_list')), 'Renamed game')
+
+    def test_comment_invalidates_detail_page(self):
+        url = reverse('game_detail', args=[self.game.pk])
+        self.client.get(url)
+        Comment.objects.create(user=self.developer, game=self.game, text='Новый комментарий')
+        self.assertContains(self.client.get(url), 'Новый комментарий')
+
+    def test_cached_detail_hits_count_views(self):
+        url = reverse('game_detail', args=[self.game.pk])
+        etag = self.client.get(url)['ETag']
+        self.client.get(url)
+        self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(self.shard_views(), 3)
+
+    def test_authenticated_pages_are_not_cached(self):
+        self.client.force_login(self.developer)
+        response = self.client.get(reverse('game_list'))
+        self.assertNotIn('ETag', response)
+
+
+class StaticAssetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        static_root = tempfile.TemporaryDirectory()
+        self.addCleanup(static_root.cleanup)
+        settings_override = override_settings(STATIC_ROOT=static_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_collectstatic_builds_hashed_compressed_files(self):
+        hashed = staticfiles_storage.hashed_files['css/style.css']
+        self.assertNotEqual(hashed, 'css/style.css')
+        self.assertTrue(staticfiles_storage.exists(hashed + '.gz'))
+        self.assertEqual(staticfiles_storage.url('css/style.css'), '/static/' + hashed)
+
+    def test_hashed_files_are_immutable_and_precompressed(self):
+        hashed = staticfiles_storage.hashed_files['css/style.css']
+        response = self.client.get('/static/' + hashed, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Content-Type'], 'text/css')
+
+        body = gzip.decompress(b''.join(response.streaming_content))
+        with staticfiles_storage.open(hashed) as f:
+            self.assertEqual(body, f.read())
+
+    def test_refused_encodings_are_not_served(self):
+        hashed = staticfiles_storage.hashed_files['css/style.css']
+        for header in ['gzip;q=0', 'br;q=0, gzip;q=0', '*;q=0', 'identity', 'x-gzip-like']:
+            with self.subTest(header=header):
+                response = self.client.get('/static/' + hashed, HTTP_ACCEPT_ENCODING=header)
+                self.assertNotIn('Content-Encoding', response)
+        for header in ['br;q=0, gzip;q=0.5', 'GZIP', '*, br;q=0']:
+            with self.subTest(header=header):
+                response = self.client.get('/static/' + hashed, HTTP_ACCEPT_ENCODING=header)
+                self.assertEqual(response.get('Content-Encoding'), 'gzip')
+
+    def test_accept_encoding_weights(self):
+        self.assertEqual(accepted_encodings('br;q=0, gzip; q=0.8, deflate'), {'br': 0.0, 'gzip': 0.8, 'deflate': 1.0})
+        self.assertEqual(accepted_encodings('gzip;q=bad, ,'), {'gzip': 0.0})
+
+    def test_unhashed_files_are_revalidated(self):
+        response = self.client.get('/static/css/style.css')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_pages_link_hashed_assets(self):
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, staticfiles_storage.hashed_files['js/games.js'])
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='pass12345', user_type='owner')
+        self.player = User.objects.create_user(username='player', password='pass12345')
+        for i in range(5):
+            game = Game.objects.create(
+                title=f'Game {i}', description='Описание', developer=self.owner,
+                html_file='games/html/index.html', status='approved',
+            )
+            game.increment_views()
+            GameRating.objects.create(user=self.player, game=game, rating=4)
+            Comment.objects.create(user=self.player, game=game, text='Комментарий')
+        self.client.force_login(self.owner)
+
+    def export(self, dataset, fmt):
+        response = self.client.get(reverse('export_stats', args=[dataset, fmt]))
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_games_csv(self):
+        lines = self.export('games', 'csv').splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'title', 'developer'])
+        self.assertEqual(len(lines), 6)
+        row = dict(zip(lines[0].split(','), lines[1].split(',')))
+        self.assertEqual(row['views'], '1')
+        self.assertEqual(row['rating_count'], '1')
+        self.assertEqual(row['comment_count'], '1')
+
+    def test_users_json(self):
+        users = {row['username']: row for row in json.loads(self.export('users', 'json'))}
+        self.assertEqual(users['owner']['game_count'], 5)
+        self.assertEqual(users['player']['comment_count'], 5)
+        self.assertEqual(users['player']['rating_count'], 5)
+
+    def test_export_is_single_query(self):
+        response = self.client.get(reverse('export_stats', args=['games', 'json']))
+        with self.assertNumQueries(1):
+            b''.join(response.streaming_content)
+
+    def test_export_requires_admin(self):
+        self.client.force_login(self.player)
+        response = self.client.get(reverse('export_stats', args=['games', 'csv']))
+        self.assertEqual(response.status_code, 302)
+
+    def test_management_command(self):
+        out = StringIO()
+        call_command('export_stats', 'games', '--format', 'json', stdout=out)
+        self.assertEqual(len(json.loads(out.getvalue())), 5)
+
+
+class BackgroundDeletionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='owner', password='pass12345', user_type='owner')
+        self.developer = User.objects.create_user(username='dev', password='pass12345', user_type='developer')
+        self.game = Game.objects.create(
+            title='Doomed game', description='Описание', developer=self.developer,
+            html_file='games/html/index.html', status='approved',
+        )
+        for i in range(5):
+            GameRating.objects.create(user=self.owner if i == 0 else User.objects.create_user(f'p{i}'),
+                                      game=self.game, rating=5)
+            Comment.objects.create(user=self.owner, game=self.game, text=f'Комментарий {i}')
+        self.client.force_login(self.developer)
+
+    def test_game_delete_hides_game_immediately(self):
+        response = self.client.post(reverse('game_delete', args=[self.game.pk]))
+        self.assertRedirects(response, reverse('game_list'))
+
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.status, 'deleting')
+        self.assertEqual(Comment.objects.filter(game=self.game).count(), 5)
+        self.assertEqual(self.client.get(reverse('game_detail', args=[self.game.pk])).status_code, 404)
+        self.assertNotContains(self.client.get(reverse('game_list')), 'Doomed game')
+
+        task = DeletionTask.objects.get(target_type='game', target_id=self.game.pk)
+        self.assertEqual(task.status, 'pending')
+        self.assertEqual(task.total_rows, 12)
+
+    def test_worker_deletes_in_batches(self):
+        self.client.post(reverse('game_delete', args=[self.game.pk]))
+        call_command('process_deletions', '--batch-size', '2', stdout=StringIO())
+
+        task = DeletionTask.objects.get(target_id=self.game.pk)
+        self.assertEqual(task.status, 'done')
+        self.assertEqual(task.deleted_rows, task.total_rows)
+        self.assertEqual(task.get_progress(), 100)
+        self.assertFalse(Game.objects.filter(pk=self.game.pk).exists())
+        self.assertFalse(Comment.objects.filter(game_id=self.game.pk).exists())
+        self.assertFalse(GameRating.objects.filter(game_id=self.game.pk).exists())
+
+
+class OrphanedMediaTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.media_root = media_root.name
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        developer = User.objects.create_user(username='dev', password='pass12345', user_type='developer')
+        Game.objects.create(
+            title='Test game', description='Описание', developer=developer,
+            html_file='games/html/live.html',
+        )
+        self.old = time.time() - 3 * 24 * 3600
+        self.make_file('games/html/live.html', old=True)
+        self.make_file('games/html/replaced.html', old=True)
+        self.make_file('avatars/old_avatar.png', old=True)
+        self.make_file('games/html/uploading.html', old=False)
+
+    def make_file(self, name, old):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'x' * 100)
+        if old:
+            os.utime(path, (self.old, self.old))
+
+    def test_report_does_not_delete(self):
+        out = StringIO()
+        call_command('collect_orphaned_media', '--list', stdout=out)
+        self.assertIn('games/html/replaced.html', out.getvalue())
+        self.assertIn('avatars/old_avatar.png', out.getvalue())
+        self.assertNotIn('live.html', out.getvalue())
+        self.assertNotIn('uploading.html', out.getvalue())
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, 'games/html/replaced.html')))
+
+    def test_delete_removes_only_old_orphans(self):
+        call_command('collect_orphaned_media', '--delete', stdout=StringIO())
+        remaining = sorted(name for name, _, _ in scan_media(self.media_root))
+        self.assertEqual(remaining, ['games/html/live.html', 'games/html/uploading.html'])
+
+    def test_file_referenced_after_scan_is_kept(self):
+        orphans = list(find_orphans(3600, self.media_root))
+        Game.objects.update(html_file='games/html/replaced.html')
+        delete_orphans(orphans, 3600, self.media_root)
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, 'games/html/replaced.html')))
+
+
+# Таблицы, где любой SCAN (и по индексу целиком) - проблема, если он не ожидается явно
+STRICT_SCAN_TABLES = {'games_game', 'games_gamestat', 'games_comment'}
+
+
+def query_plan_problems(captured_queries, allowed_scans=()):
+    """Полные сканы таблиц и временные B-tree сортировки в планах запросов (SQLite).
+
+    На STRICT_SCAN_TABLES проблема - любой SCAN, кроме строк плана из
+    allowed_scans (ожидаемый обход индекса по порядку с LIMIT).
+    """
+    problems = []
+    with connections['default'].cursor() as cursor:
+        for query in captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            for row in cursor.fetchall():
+                detail = row[-1]
+                if detail.startswith('SCAN ') and detail not in allowed_scans:
+                    table = detail.split()[1]
+                    if table in STRICT_SCAN_TABLES or 'INDEX' not in detail:
+                        problems.append(f'{detail}: {sql}')
+                elif 'TEMP B-TREE' in detail:
+                    problems.append(f'{detail}: {sql}')
+    return problems
+
+
+class QueryPlanTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username='admin', password='pass12345', user_type='owner')
+        self.developer = User.objects.create_user(username='dev', password='pass12345', user_type='developer')
+        self.player = User.objects.create_user(username='player', password='pass12345')
+        for i in range(3):
+            game = Game.objects.create(
+                title=f'Game {i}', description='Описание', developer=self.developer,
+                html_file='games/html/index.html', status='approved',
+            )
+            GameRating.objects.create(user=self.player, game=game, rating=4)
+            Comment.objects.create(user=self.player, game=game, text='Комментарий')
+            game.increment_views()
+        self.game = game
+
+    def assertIndexedPlans(self, url, allowed_scans=()):
+        cache.clear()
+        with CaptureQueriesContext(connections['default']) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(queries.captured_queries)
+        self.assertEqual(query_plan_problems(queries.captured_queries, allowed_scans), [])
+
+    def test_anonymous_catalog_views(self):
+        for name in ['game_list', 'popular_games', 'best_rated_games', 'api_game_list']:
+            with self.subTest(view=name):
+                self.assertIndexedPlans(reverse(name))
+
+    def test_api_cursor_pages(self):
+        first = self.client.get(reverse('api_game_list'), {'limit': 1}).json()
+        self.assertIndexedPlans(reverse('api_game_list') + '?limit=1&cursor=' + first['next'])
+        self.assertIndexedPlans(reverse('api_leaderboard', args=['best-rated']) + '?fields=id,score')
+        self.assertIndexedPlans(reverse('api_game_comments', args=[self.game.pk]))
+
+    def test_game_detail(self):
+        self.client.force_login(self.player)
+        self.assertIndexedPlans(reverse('game_detail', args=[self.game.pk]))
+
+    def test_home_and_moderation_counter(self):
+        self.client.force_login(self.admin)
+        self.assertIndexedPlans(reverse('home'))
+
+    def test_developer_games(self):
+        with CaptureQueriesContext(connections['default']) as queries:
+            list(Game.objects.filter(developer=self.developer))
+        self.assertEqual(query_plan_problems(queries.captured_queries), [])
+
+    def test_full_index_scan_is_reported_unless_expected(self):
+        with CaptureQueriesContext(connections['default']) as queries:
+            list(Game.objects.order_by('developer_id').values_list('pk', flat=True)[:2])
+        # Обход индекса по порядку прошел бы старую проверку ("USING INDEX")
+        scan = 'SCAN games_game USING COVERING INDEX games_game_developer_id_96377516'
+        [problem] = query_plan_problems(queries.captured_queries)
+        self.assertTrue(problem.startswith(scan))
+        self.assertEqual(query_plan_problems(queries.captured_queries, allowed_scans=[scan]), [])
+
+    def test_user_type_filters(self):
+        with CaptureQueriesContext(connections['default']) as queries:
+            User.objects.filter(user_type='developer', is_active=True).count()
+            list(User.objects.filter(user_type__in=['admin', 'owner']))
+        self.assertEqual(query_plan_problems(queries.captured_queries), [])
+
+
+class DeveloperDashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.developer = User.objects.create_user(username='dev', password='pass12345', user_type='developer')
+        self.player = User.objects.create_user(username='player', password='pass12345')
+        self.games = []
+        for i, rating in enumerate([5, 3]):
+            game = Game.objects.create(
+                title=f'Game {i}', description='Описание', developer=self.developer,
+                html_file='games/html/index.html', status='approved',
+            )
+            GameRating.objects.create(user=self.player, game=game, rating=rating)
+            Comment.objects.create(user=self.player, game=game, text='Комментарий')
+            game.increment_views()
+            game.increment_play_count()
+            self.games.append(game)
+        self.client.force_login(self.developer)
+
+    def test_dashboard_totals(self):
+        response = self.client.get(reverse('developer_dashboard'))
+        totals = response.context['totals']
+        self.assertEqual(totals['games'], 2)
+        self.assertEqual(totals['views'], 2)
+        self.assertEqual(totals['plays'], 2)
+        self.assertEqual(totals['ratings'], 2)
+        self.assertEqual(totals['average_rating'], 4.0)
+        self.assertEqual(totals['comments'], 2)
+        self.assertEqual({row['title']: row['average_rating'] for row in response.context['games']},
+                         {'Game 0': 5.0, 'Game 1': 3.0})
+
+    def test_dashboard_is_cached_until_stats_change(self):
+        self.client.get(reverse('developer_dashboard'))
+        with self.assertNumQueries(0):
+            self.client.get(reverse('developer_dashboard'))
+
+        self.games[0].increment_views()
+        response = self.client.get(reverse('developer_dashboard'))
+        self.assertEqual(response.context['totals']['views'], 3)
+
+        Comment.objects.create(user=self.player, game=self.games[1], text='Еще')
+        response = self.client.get(reverse('developer_dashboard'))
+        self.assertEqual(response.context['totals']['comments'], 3)
+
+    def test_invalidation_in_other_worker_resets_cache(self):
+        self.client.get(reverse('developer_dashboard'))
+        # Изменение без сигналов в этом процессе: оценку обработал другой воркер
+        Game.objects.filter(pk=self.games[0].pk).update(title='Renamed')
+        in_other_process(invalidate_developer_dashboard, self.games[0].pk)
+
+        response = self.client.get(reverse('developer_dashboard'))
+        self.assertIn('Renamed', [row['title'] for row in response.context['games']])
+
+    def test_players_are_redirected(self):
+        self.client.force_login(self.player)
+        self.assertRedirects(self.client.get(reverse('developer_dashboard')), reverse('profile'))
+
+
+@override_settings(RATE_LIMITS={'add_comment': '2/m', 'increment_play_count': '3/m'})
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        local_buckets.clear()
+        self.player = User.objects.create_user(username='player', password='pass12345')
+        developer = User.objects.create_user(username='dev', password='pass12345', user_type='developer')
+        self.game = Game.objects.create(
+            title='Test game', description='Описание', developer=developer,
+            html_file='games/html/index.html', status='approved',
+        )
+        self.client.force_login(self.player)
+
+    def play(self, client=None, ip='10.0.0.1'):
+        return (client or self.client).post(
+            reverse('increment_play_count', args=[self.game.pk]),
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest', REMOTE_ADDR=ip,
+        )
+
+    def test_over_limit_gets_429_without_queries(self):
+        for _ in range(3):
+            self.assertEqual(self.play().status_code, 200)
+
+        with self.assertNumQueries(0):
+            response = self.play()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertFalse(json.loads(response.content)['success'])
+
+    def test_limit_is_per_user_and_per_ip(self):
+        for _ in range(3):
+            self.play()
+        # Тот же пользователь с другого IP все равно упирается в свой лимит
+        self.assertEqual(self.play(ip='10.0.0.2').status_code, 429)
+
+        other = User.objects.create_user(username='other', password='pass12345')
+        other_client = self.client_class()
+        other_client.force_login(other)
+        self.assertEqual(self.play(other_client, ip='10.0.0.3').status_code, 200)
+        # Другой пользователь с исчерпанного IP - отказ
+        self.assertEqual(self.play(other_client, ip='10.0.0.1').status_code, 429)
+
+    def test_limits_are_configured_per_view(self):
+        url = reverse('add_comment', args=[self.game.pk])
+        for _ in range(2):
+            self.client.post(url, {'text': 'Комментарий'})
+        self.assertEqual(self.client.post(url, {'text': 'Комментарий'}).status_code, 429)
+        self.assertEqual(Comment.objects.count(), 2)
+        # Счетчик запусков считается отдельно
+        self.assertEqual(self.play().status_code, 200)
+
+    def test_forwarded_for_is_ignored_without_trusted_proxies(self):
+        anonymous = self.client_class()
+        url = reverse('add_comment', args=[self.game.pk])
+        statuses = [
+            anonymous.post(url, {'text': 'Комментарий'}, REMOTE_ADDR='10.0.0.9', HTTP_X_FORWARDED_FOR=f'1.1.1.{i}')
+            .status_code
+            for i in range(3)
+        ]
+        # Новый X-Forwarded-For на каждый запрос не обходит лимит по IP
+        self.assertEqual(statuses[-1], 429)
+
+    @override_settings(NUM_PROXIES=1)
+    def test_forwarded_for_uses_hop_added_by_trusted_proxy(self):
+        request = RequestFactory().get('/', REMOTE_ADDR='127.0.0.1', HTTP_X_FORWARDED_FOR='1.1.1.1, 203.0.113.7')
+        self.assertEqual(client_ip(request), '203.0.113.7')
+        request = RequestFactory().get('/', REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(client_ip(request), '127.0.0.1')
+
+    @override_settings(RATE_LIMIT_SHARED_CACHE='default')
+    def test_shared_cache_limit_applies_across_processes(self):
+        for _ in range(3):
+            self.play()
+        # Новый процесс: локальные корзины пусты, но общий счетчик в кеше исчерпан
+        local_buckets.clear()
+        self.assertEqual(self.play().status_code, 429)
+
+
+@override_settings(LIVE_UPDATES=True, LIVE_UPDATE_INTERVAL=0.05)
+class LiveUpdateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.player = User.objects.create_user(username='player', password='pass12345')
+        developer = User.objects.create_user(username='dev', password='pass12345', user_type='developer')
+        self.game = Game.objects.create(
+            title='Test game', description='Описание', developer=developer,
+            html_file='games/html/index.html', status='approved',
+        )
+
+    @override_settings(LIVE_UPDATE_INTERVAL=0.5)
+    async def test_updates_are_coalesced_into_one_batch(self):
+        async with hub.subscribe(self.game.pk) as first, hub.subscribe(self.game.pk) as second:
+            # Первое обновление уходит сразу, следующие копятся до конца интервала
+            publish_stats(self.game.pk, views=1)
+            self.assertEqual(await first.get(timeout=1), (1, {'stats': {'views': 1}}))
+            self.assertEqual(await second.get(timeout=1), (1, {'stats': {'views': 1}}))
+
+            for _ in range(3):
+                await sync_to_async(self.game.increment_play_count)()
+            publish_stats(self.game.pk, likes=1)
+            await sync_to_async(Comment.objects.create)(user=self.player, game=self.game, text='Привет')
+
+            for subscription in (first, second):
+                seq, batch = await subscription.get(timeout=2)
+                self.assertEqual(seq, 2)
+                self.assertEqual(batch['stats'], {'plays': 3, 'likes': 1, 'comments': 1})
+                self.assertEqual([c['text'] for c in batch['comments']], ['Привет'])
+
+            self.assertIsNone(await first.get(timeout=0.1))
+
+    async def test_games_without_subscribers_are_not_buffered(self):
+        publish_stats(self.game.pk, views=1)
+        self.assertEqual(hub._pending, {})
+
+    async def test_reconnect_gets_missed_batches_or_resync(self):
+        async with hub.subscribe(self.game.pk) as listener:
+            for _ in range(2):
+                publish_stats(self.game.pk, views=1)
+                await listener.get(timeout=1)
+
+            async with hub.subscribe(self.game.pk, last_seq=1) as reconnected:
+                self.assertEqual(await reconnected.get(timeout=1), (2, {'stats': {'views': 1}}))
+            async with hub.subscribe(self.game.pk, last_seq=99) as stale:
+                self.assertEqual(await stale.get(timeout=1), (2, None))
+
+    async def test_event_stream_view(self):
+        response = await self.async_client.get(reverse('game_live', args=[self.game.pk]))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+
+        publish_stats(self.game.pk, dislikes=1)
+        event = (await asyncio.wait_for(anext(stream), 1)).decode()
+        self.assertIn('id: 1\nevent: update\n', event)
+        self.assertIn('"dislikes": 1', event)
+        await stream.aclose()
+
+    async def test_unapproved_game_has_no_stream(self):
+        await Game.objects.filter(pk=self.game.pk).aupdate(status='pending')
+        response = await self.async_client.get(reverse('game_live', args=[self.game.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_stream_is_off_by_default_and_under_wsgi(self):
+        url = reverse('game_live', args=[self.game.pk])
+        page = reverse('game_detail', args=[self.game.pk])
+        self.assertContains(self.client.get(page), 'data-live-url')
+        # Синхронный клиент - это WSGI: поток занял бы рабочий поток навсегда
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        with self.settings(LIVE_UPDATES=False):
+            cache.clear()
+            self.assertNotContains(self.client.get(page), 'data-live-url')
+
+
+class UniqueViewerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.developer = User.objects.create_user(username='dev', password='pass12345', user_type='developer')
+        self.games = [
+            Game.objects.create(
+                title=f'Game {i}', description='Описание', developer=self.developer,
+                html_file='games/html/index.html', status='approved',
+            )
+            for i in range(2)
+        ]
+
+    def test_sketch_estimate_and_merge(self):
+        monday, tuesday = bytearray(hll.empty()), bytearray(hll.empty())
+        for i in range(20000):
+            hll.add(monday, f'user:{i}')
+        for i in range(10000, 30000):
+            hll.add(tuesday, f'user:{i}')
+
+        self.assertEqual(len(monday), hll.REGISTER_COUNT)
+        self.assertAlmostEqual(hll.count(monday), 20000, delta=20000 * 0.05)
+        self.assertAlmostEqual(hll.count(hll.merge(monday, tuesday)), 30000, delta=30000 * 0.05)
+        self.assertEqual(hll.count(hll.empty()), 0)
+
+    def test_repeat_viewer_does_not_touch_database(self):
+        game = self.games[0]
+        GameViewerSketch.record(game.pk, 'user:1')
+        with self.assertNumQueries(0):
+            GameViewerSketch.record(game.pk, 'user:1')
+
+        for i in range(2, 50):
+            GameViewerSketch.record(game.pk, f'user:{i}')
+        self.assertEqual(GameViewerSketch.objects.filter(game=game).count(), 1)
+        self.assertAlmostEqual(GameViewerSketch.unique_viewer_counts([game.pk])[game.pk], 49, delta=3)
+
+    def test_days_are_merged(self):
+        game = self.games[0]
+        today = timezone.localdate()
+        for days_ago in range(3):
+            for i in range(10):
+                GameViewerSketch.record(game.pk, f'user:{i + days_ago * 5}', day=today - timedelta(days=days_ago))
+
+        self.assertEqual(GameViewerSketch.unique_viewer_counts(days=1)[game.pk], 10)
+        self.assertEqual(GameViewerSketch.unique_viewer_counts(days=3)[game.pk], 20)
+
+    def test_popular_games_ranked_by_unique_viewers(self):
+        spam, liked = self.games
+        viewer = User.objects.create_user(username='spammer', password='pass12345')
+        self.client.force_login(viewer)
+        for _ in range(5):
+            self.client.get(reverse('game_detail', args=[spam.pk]))
+        for i in range(3):
+            self.client.force_login(User.objects.create_user(username=f'viewer{i}', password='pass12345'))
+            self.client.get(reverse('game_detail', args=[liked.pk]))
+
+        by_views = self.client.get(reverse('popular_games')).context['games']
+        self.assertEqual(by_views[0]['game'], spam)
+
+        by_unique = self.client.get(reverse('popular_games'), {'by': 'unique'}).context['games']
+        self.assertEqual([row['game'] for row in by_unique], [liked, spam])
+        self.assertEqual([row['unique_viewers'] for row in by_unique], [3, 1])
+
+
+@override_settings(RATING_PRIOR_MEAN=3.0, RATING_PRIOR_WEIGHT=10)
+class BayesianRatingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        developer = User.objects.create_user(username='dev', password='pass12345', user_type='developer')
+        self.few, self.many = [
+            Game.objects.create(
+                title=title, description='Описание', developer=developer,
+                html_file='games/html/index.html', status='approved',
+            )
+            for title in ('Three fives', 'Many fours')
+        ]
+        self.voters = [User.objects.create(username=f'voter{i}') for i in range(30)]
+        for voter in self.voters[:3]:
+            GameRating.objects.create(user=voter, game=self.few, rating=5)
+        for i, voter in enumerate(self.voters):
+            GameRating.objects.create(user=voter, game=self.many, rating=4 if i < 3 else 5)
+
+    def test_many_votes_beat_few_perfect_votes(self):
+        self.few.refresh_from_db()
+        self.many.refresh_from_db()
+        self.assertEqual((self.few.rating_votes, self.few.rating_sum), (3, 15))
+        self.assertAlmostEqual(self.few.rating_score, (30 + 15) / 13)
+        self.assertGreater(self.many.rating_score, self.few.rating_score)
+
+        games = self.client.get(reverse('best_rated_games')).context['games']
+        self.assertEqual([row['game'] for row in games], [self.many, self.few])
+        self.assertEqual(games[0]['rating'], 4.9)
+
+    def test_score_follows_rating_changes(self):
+        rating = GameRating.objects.get(user=self.voters[0], game=self.few)
+        rating.rating = 1
+        rating.save()
+        self.few.refresh_from_db()
+        self.assertEqual(self.few.rating_sum, 11)
+
+        rating.delete()
+        self.few.refresh_from_db()
+        self.assertEqual((self.few.rating_votes, self.few.rating_sum), (2, 10))
+
+    def test_cached_best_rated_page_follows_new_ratings(self):
+        url = reverse('best_rated_games')
+        content = self.client.get(url).content.decode()
+        self.assertLess(content.index('Many fours'), content.index('Three fives'))
+
+        for voter in self.voters[3:]:
+            GameRating.objects.create(user=voter, game=self.few, rating=5)
+        content = self.client.get(url).content.decode()
+        self.assertLess(content.index('Three fives'), content.index('Many fours'))
+
+    def test_prior_change_needs_recompute(self):
+        with override_settings(RATING_PRIOR_WEIGHT=0):
+            call_command('update_rating_scores', stdout=StringIO())
+        self.few.refresh_from_db()
+        self.assertEqual(self.few.rating_score, 5.0)
+
+
+class CatalogApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.developer = User.objects.create_user(username='dev', password='pass12345', user_type='developer')
+        self.games = [
+            Game.objects.create(
+                title=f'Game {i}', description='Описание', developer=self.developer,
+                html_file='games/html/index.html', status='approved',
+            )
+            for i in range(5)
+        ]
+        Game.objects.create(
+            title='Pending', description='Описание', developer=self.developer,
+            html_file='games/html/index.html', status='pending',
+        )
+
+    def get_json(self, url, **params):
+        response = self.client.get(url, params)
+        return response, json.loads(response.content)
+
+    def test_cursor_pagination_walks_whole_catalog(self):
+        seen, cursor = [], None
+        while True:
+            params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+            response, data = self.get_json(reverse('api_game_list'), **params)
+            self.assertEqual(response.status_code, 200)
+            seen += [game['id'] for game in data['results']]
+            cursor = data['next']
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, [game.pk for game in reversed(self.games)])
+
+    def test_fields_select_only_requested_columns(self):
+        with CaptureQueriesContext(connections['default']) as queries:
+            _, data = self.get_json(reverse('api_game_list'), fields='id,title')
+
+        self.assertEqual(set(data['results'][0]), {'id', 'title'})
+        sql = ' '.join(q['sql'] for q in queries.captured_queries)
+        self.assertNotIn('"description"', sql)
+        self.assertNotIn('games_gamestatshard', sql)
+
+        _, data = self.get_json(reverse('api_game_detail', args=[self.games[0].pk]), fields='views,comments')
+        self.assertEqual(data['result'], {'views': 0, 'comments': 0})
+
+    def test_conditional_get(self):
+        response = self.client.get(reverse('api_game_list'))
+        etag = response['ETag']
+        self.assertEqual(self.client.get(reverse('api_game_list'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.games[0].increment_play_count()
+        self.assertEqual(self.client.get(reverse('api_game_list'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_errors_are_json(self):
+        response, data = self.get_json(reverse('api_game_list'), fields='title,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', data['error'])
+
+        pending = Game.objects.get(title='Pending')
+        response, _ = self.get_json(reverse('api_game_detail', args=[pending.pk]))
+        self.assertEqual(response.status_code, 404)
+        response, _ = self.get_json(reverse('api_game_list'), cursor='garbage')
+        self.assertEqual(response.status_code, 400)
+
+    def test_tampered_cursor_is_rejected(self):
+        def cursor(value, pk=1):
+            return base64.urlsafe_b64encode(json.dumps([value, pk]).encode()).decode()
+
+        cases = [
+            ('api_game_list', [], [None, 1]),
+            ('api_game_list', [], [{'a': 1}, 1]),
+            ('api_game_list', [], ['x', 1]),
+            ('api_game_list', [], [1.5, 2]),
+            ('api_game_list', [], ['2024-01-01T00:00:00', 1]),
+            ('api_game_list', [], ['2024-01-01T00:00:00+00:00', 'x']),
+            ('api_game_comments', [self.games[0].pk], [7, 1]),
+            ('api_leaderboard', ['most-viewed'], ['x', 1]),
+            ('api_leaderboard', ['best-rated'], [True, 1]),
+            ('api_leaderboard', ['most-played'], [3, None]),
+        ]
+        for name, args, (value, pk) in cases:
+            with self.subTest(name=name, value=value, pk=pk):
+                response, data = self.get_json(reverse(name, args=args), cursor=cursor(value, pk))
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('cursor', data['error'])
+
+        response, _ = self.get_json(reverse('api_leaderboard', args=['most-viewed']), cursor=cursor(2.5))
+        self.assertEqual(response.status_code, 200)
+
+    def test_batch_stats_in_one_query(self):
+        player = User.objects.create(username='player')
+        GameRating.objects.create(user=player, game=self.games[0], rating=4)
+        Comment.objects.create(user=player, game=self.games[0], text='Комментарий')
+        self.games[0].increment_views()
+        self.games[1].increment_play_count()
+        pending = Game.objects.get(title='Pending')
+
+        ids = ','.join(str(pk) for pk in [self.games[0].pk, self.games[1].pk, pending.pk, 999999])
+        with self.assertNumQueries(1):
+            response, data = self.get_json(reverse('api_game_stats'), ids=ids)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(data['results']), {str(self.games[0].pk), str(self.games[1].pk)})
+        self.assertEqual(data['results'][str(self.games[0].pk)], {
+            'views': 1, 'plays': 0, 'likes': 0, 'dislikes': 0,
+            'rating': 4.0, 'rating_count': 1, 'comments': 1,
+        })
+        self.assertEqual(data['results'][str(self.games[1].pk)]['plays'], 1)
+
+    def test_batch_stats_limits(self):
+        too_many = ','.join(str(i) for i in range(1, 302))
+        self.assertEqual(self.client.get(reverse('api_game_stats'), {'ids': too_many}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('api_game_stats'), {'ids': '1,x'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('api_game_stats')).status_code, 400)
+
+    def test_leaderboards_and_comments(self):
+        player = User.objects.create(username='player')
+        GameRating.objects.create(user=player, game=self.games[2], rating=5)
+        GameRating.objects.create(user=player, game=self.games[4], rating=4)
+        for _ in range(3):
+            self.games[1].increment_play_count()
+        for i in range(3):
+            Comment.objects.create(user=player, game=self.games[0], text=f'Комментарий {i}')
+
+        _, data = self.get_json(reverse('api_leaderboard', args=['best-rated']), fields='id,score')
+        self.assertEqual([game['id'] for game in data['results']], [self.games[2].pk, self.games[4].pk])
+        _, data = self.get_json(reverse('api_leaderboard', args=['most-played']), fields='id,plays', limit=1)
+        self.assertEqual(data['results'], [{'id': self.games[1].pk, 'plays': 3}])
+
+        _, data = self.get_json(reverse('api_game_comments', args=[self.games[0].pk]), limit=2)
+        self.assertEqual([c['text'] for c in data['results']], ['Комментарий 2', 'Комментарий 1'])
+        _, data = self.get_json(reverse('api_game_comments', args=[self.games[0].pk]), cursor=data['next'])
+        self.assertEqual([c['text'] for c in data['results']], ['Комментарий 0'])
+
+
+calls = []
+
+
+@job('tests.record')
+def record_call(value):
+    calls.append(value)
+
+
+@job('tests.fail')
+def always_fail():
+    raise RuntimeError('boom')
+
+
+@job('tests.long')
+def long_running():
+    heartbeat()
+    calls.append(release_stale_jobs())
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        calls.clear()
+
+    def test_worker_runs_queued_jobs(self):
+        for i in range(3):
+            enqueue('tests.record', {'value': i})
+        enqueue('tests.record', {'value': 'later'}, delay=3600)
+
+        metrics = Worker().run(once=True)
+
+        self.assertEqual(calls, [0, 1, 2])
+        self.assertEqual(metrics['done'], 3)
+        self.assertEqual(queue_stats()['done'], 3)
+        self.assertEqual(Job.objects.get(status='queued').payload, {'value': 'later'})
+
+    def test_jobs_are_claimed_once(self):
+        enqueue('tests.record', {'value': 1})
+        enqueue('tests.record', {'value': 2})
+
+        first = claim_jobs('worker-a', limit=1)
+        second = claim_jobs('worker-b', limit=5)
+        self.assertEqual(len(first), 1)
+        self.assertEqual([j.pk for j in second], [Job.objects.exclude(pk=first[0].pk).get().pk])
+        self.assertEqual(claim_jobs('worker-c', limit=5), [])
+
+    @override_settings(JOB_RETRY_BASE_SECONDS=10)
+    def test_failed_job_is_retried_with_backoff_then_fails(self):
+        failing = enqueue('tests.fail', max_attempts=2)
+
+        started = timezone.now()
+        Worker().run(once=True)
+        failing.refresh_from_db()
+        self.assertEqual((failing.status, failing.attempts), ('queued', 1))
+        self.assertGreaterEqual(failing.run_at, started + timedelta(seconds=5))
+        self.assertIn('boom', failing.last_error)
+
+        Job.objects.filter(pk=failing.pk).update(run_at=timezone.now())
+        metrics = Worker().run(once=True)
+        failing.refresh_from_db()
+        self.assertEqual((failing.status, failing.attempts), ('failed', 2))
+        self.assertEqual(metrics['failed'], 1)
+
+    def test_stale_running_jobs_are_released(self):
+        stuck = enqueue('tests.record', {'value': 'stuck'})
+        claim_jobs('crashed-worker')
+        Job.objects.filter(pk=stuck.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(release_stale_jobs(), 1)
+        Worker().run(once=True)
+        self.assertEqual(calls, ['stuck'])
+
+    @override_settings(JOB_LOCK_TIMEOUT=0)
+    def test_worker_releases_stale_jobs_while_running(self):
+        enqueue('tests.record', {'value': 1})
+
+        def crash_other_worker(worker):
+            if calls == [1]:
+                stuck = enqueue('tests.record', {'value': 'stuck'})
+                claim_jobs('crashed-worker')
+                Job.objects.filter(pk=stuck.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+
+        Worker().run(once=True, on_batch=crash_other_worker)
+        self.assertEqual(calls, [1, 'stuck'])
+
+    def test_heartbeat_keeps_long_job_from_being_released(self):
+        enqueue('tests.long')
+        [claimed] = claim_jobs('worker-a')
+        claimed.locked_at -= timedelta(hours=1)
+        Job.objects.filter(pk=claimed.pk).update(locked_at=claimed.locked_at)
+
+        self.assertEqual(run_job(claimed), 'done')
+        self.assertEqual(calls, [0])
+
+    def test_run_jobs_command_reports_metrics(self):
+        enqueue('tests.record', {'value': 1})
+        out = StringIO()
+        call_command('run_jobs', '--once', '--threads', '1', stdout=out)
+        self.assertIn('выполнено: 1', out.getvalue())
+
+    def test_login_ip_is_recorded_in_background(self):
+        User.objects.create_user(username='player', password='pass12345')
+        self.client.post(reverse('login'), {'username': 'player', 'password': 'pass12345'},
+                         REMOTE_ADDR='203.0.113.7')
+        self.assertIsNone(User.objects.get(username='player').last_login_ip)
+
+        Worker().run(once=True)
+        self.assertEqual(User.objects.get(username='player').last_login_ip, '203.0.113.7')
+
+    def test_deletion_is_queued_as_job(self):
+        owner = User.objects.create_user(username='owner', password='pass12345', user_type='owner')
+        developer = User.objects.create_user(username='dev', password='pass12345', user_type='developer')
+        game = Game.objects.create(
+            title='Doomed', description='Описание', developer=developer,
+            html_file='games/html/index.html', status='approved',
+        )
+        self.client.force_login(owner)
+        self.client.post(reverse('game_delete', args=[game.pk]))
+
+        self.assertTrue(Game.objects.filter(pk=game.pk).exists())
+        Worker().run(once=True)
+        self.assertFalse(Game.objects.filter(pk=game.pk).exists())
+
+    def test_game_being_deleted_is_scheduled_once_and_not_editable(self):
+        developer = User.objects.create_user(username='dev', password='pass12345', user_type='developer')
+        game = Game.objects.create(
+            title='Doomed', description='Описание', developer=developer,
+            html_file='games/html/index.html', status='approved',
+        )
+        self.client.force_login(developer)
+        self.client.post(reverse('game_delete', args=[game.pk]))
+        self.client.post(reverse('game_delete', args=[game.pk]))
+        self.assertEqual(DeletionTask.objects.filter(target_type='game', target_id=game.pk).count(), 1)
+        self.assertEqual(Job.objects.filter(name='games.run_deletion').count(), 1)
+
+        self.assertEqual(self.client.get(reverse('game_edit', args=[game.pk])).status_code, 404)
+
+    def test_retried_deletion_job_resumes_failed_task(self):
+        developer = User.objects.create_user(username='dev', password='pass12345', user_type='developer')
+        game = Game.objects.create(
+            title='Doomed', description='Описание', developer=developer,
+            html_file='games/html/index.html', status='approved',
+        )
+        task = schedule_game_deletion(game, developer)
+        # Предыдущая попытка упала посреди удаления - job вернулся в очередь на повтор
+        DeletionTask.objects.filter(pk=task.pk).update(status='failed', error='OperationalError()')
+
+        Worker().run(once=True)
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'done')
+        self.assertFalse(Game.objects.filter(pk=game.pk).exists())
+
+
+@override_settings(LOAD_SHED_MAX_INFLIGHT=4)
+class LoadSheddingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        local_buckets.clear()
+        monitor.reset()
+        self.addCleanup(monitor.reset)
+        self.player = User.objects.create_user(username='player', password='pass12345')
+        developer = User.objects.create_user(username='dev', password='pass12345', user_type='developer')
+        self.game = Game.objects.create(
+            title='Test game', description='Описание', developer=developer,
+            html_file='games/html/index.html', status='approved',
+        )
+        self.client.force_login(self.player)
+
+    def busy(self, inflight):
+        """Имитация запросов, уже находящихся в работе"""
+        monitor.inflight = inflight
+
+    def play(self):
+        return self.client.post(reverse('increment_play_count', args=[self.game.pk]),
+                                HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+    def test_requests_pass_under_limit(self):
+        self.assertEqual(self.play().status_code, 200)
+        self.assertEqual(self.game.get_play_count(), 1)
+        self.assertEqual(monitor.inflight, 0)
+
+    def test_low_priority_counters_are_deferred(self):
+        self.busy(2)
+        response = self.play()
+
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(json.loads(response.content)['deferred'])
+        self.assertEqual(self.game.get_play_count(), 0)
+
+        Worker().run(once=True)
+        cache.clear()
+        self.assertEqual(self.game.get_play_count(), 1)
+
+        self.client.post(reverse('toggle_like', args=[self.game.pk]), {'action': 'like'},
+                         HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        Worker().run(once=True)
+        self.assertEqual(GameStat.objects.get(game=self.game).likes, 1)
+
+    def test_tiers_are_shed_in_order(self):
+        self.busy(2)
+        self.assertEqual(self.client.get(reverse('developer_dashboard')).status_code, 503)
+        self.assertEqual(self.client.get(reverse('game_list')).status_code, 200)
+
+        self.busy(4)
+        response = self.client.get(reverse('game_list'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(self.client.get(reverse('moderation_list')).status_code, 302)
+
+    def test_metrics_are_exported(self):
+        self.busy(4)
+        self.client.get(reverse('game_list'))
+        self.play()
+        self.busy(0)
+
+        metrics = self.client.get(reverse('load_metrics')).content.decode()
+        self.assertIn('load_shed_total{tier="normal"} 1', metrics)
+        self.assertIn('load_deferred_total{view="increment_play_count"} 1', metrics)
+        self.assertIn('job_queue_depth{status="queued"} 1', metrics)
+
+        self.client.logout()
+        url = reverse('load_metrics')
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='198.51.100.1').status_code, 404)
+        # Внутренний адрес в X-Forwarded-For от самого клиента доступа не дает
+        spoofed = self.client.get(url, REMOTE_ADDR='198.51.100.1', HTTP_X_FORWARDED_FOR='127.0.0.1')
+        self.assertEqual(spoofed.status_code, 404)
+        with self.settings(NUM_PROXIES=1):
+            behind_proxy = self.client.get(url, REMOTE_ADDR='127.0.0.1', HTTP_X_FORWARDED_FOR='198.51.100.1')
+            self.assertEqual(behind_proxy.status_code, 404)
+
+
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        title_index.reset()
+        self.addCleanup(title_index.reset)
+        self.developer = User.objects.create_user(username='dev', password='pass12345', user_type='developer')
+        self.space = self.make_game('Space Invaders', views=5)
+        self.spelunky = self.make_game('Spelunky', views=50)
+        self.pending = self.make_game('Space Pending', status='pending')
+
+    def make_game(self, title, views=0, status='approved'):
+        game = Game.objects.create(
+            title=title, description='Описание', developer=self.developer,
+            html_file='games/html/index.html', status=status,
+        )
+        if views:
+            GameStatShard.objects.create(game=game, shard=0, views=views)
+        return game
+
+    def suggest(self, query):
+        response = self.client.get(reverse('api_game_suggest'), {'q': query})
+        return [game['title'] for game in json.loads(response.content)['results']]
+
+    def test_prefix_matches_ranked_by_popularity(self):
+        self.assertEqual(self.suggest('sp'), ['Spelunky', 'Space Invaders'])
+        self.assertEqual(self.suggest('  SPACE  '), ['Space Invaders'])
+        self.assertEqual(self.suggest('inv'), ['Space Invaders'])
+        self.assertEqual(self.suggest('x'), [])
+        self.assertEqual(self.suggest(''), [])
+
+    def test_index_is_served_from_memory(self):
+        self.suggest('sp')
+        with self.assertNumQueries(0):
+            self.assertEqual(len(title_index.suggest('s')), 2)
+
+    def test_signals_update_index_incrementally(self):
+        self.suggest('sp')
+
+        self.pending.status = 'approved'
+        self.pending.save()
+        self.space.title = 'Galaxy Invaders'
+        self.space.save()
+        self.spelunky.delete()
+
+        with self.assertNumQueries(0):
+            self.assertEqual([title for _, title in title_index.suggest('sp')], ['Space Pending'])
+            self.assertEqual([title for _, title in title_index.suggest('gal')], ['Galaxy Invaders'])
+
+    def test_changes_from_other_processes_trigger_rebuild(self):
+        self.suggest('sp')
+        # Массовое изменение без сигналов, как при удалении пользователя
+        Game.objects.filter(pk=self.spelunky.pk).update(status='deleting')
+        self.assertEqual(self.suggest('sp'), ['Spelunky', 'Space Invaders'])
+
+        in_other_process(bump_catalog_version)
+        self.assertEqual(self.suggest('sp'), ['Space Invaders'])
+
+
+class TagFacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        tag_index.reset()
+        self.addCleanup(tag_index.reset)
+        self.developer = User.objects.create_user(username='dev', password='pass12345', user_type='developer')
+        self.puzzle = Tag.objects.get(slug='puzzle')
+        self.arcade = Tag.objects.get(slug='arcade')
+        self.both = self.make_game('Both', [self.puzzle, self.arcade])
+        self.puzzle_only = self.make_game('Puzzle only', [self.puzzle])
+        self.arcade_only = self.make_game('Arcade only', [self.arcade])
+        self.pending = self.make_game('Pending puzzle', [self.puzzle], status='pending')
+
+    def make_game(self, title, tags, status='approved'):
+        game = Game.objects.create(
+            title=title, description='Описание', developer=self.developer,
+            html_file='games/html/index.html', status=status,
+        )
+        game.tags.set(tags)
+        return game
+
+    def catalog(self, *tags):
+        response = self.client.get(reverse('game_list'), {'tag': list(tags)})
+        facets = {facet['slug']: (facet['count'], facet['selected']) for facet in response.context['tag_facets']}
+        return {game.title for game in response.context['games']}, facets
+
+    def counts(self, *tags):
+        return {facet['slug']: facet['count'] for facet in tag_index.facets(tags)[1]}
+
+    def test_facets_count_games_matching_selection(self):
+        games, facets = self.catalog()
+        self.assertEqual(len(games), 3)
+        self.assertEqual(facets, {'puzzle': (2, False), 'arcade': (2, False)})
+
+        games, facets = self.catalog('puzzle')
+        self.assertEqual(games, {'Both', 'Puzzle only'})
+        self.assertEqual(facets, {'puzzle': (2, True), 'arcade': (1, False)})
+
+        games, facets = self.catalog('puzzle', 'arcade')
+        self.assertEqual(games, {'Both'})
+        self.assertEqual(facets, {'puzzle': (1, True), 'arcade': (1, True)})
+
+    def test_moderation_and_tag_changes_update_index_in_place(self):
+        self.counts()
+        self.pending.status = 'approved'
+        self.pending.save()
+        self.puzzle_only.tags.add(self.arcade)
+        self.arcade_only.status = 'rejected'
+        self.arcade_only.save()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.counts(), {'puzzle': 3, 'arcade': 2})
+            self.assertEqual(self.counts('arcade'), {'puzzle': 2, 'arcade': 2})
+
+    def test_bulk_moderation_rebuilds_index(self):
+        self.counts()
+        # Действие админки: update() без сигналов, но со сдвигом версии каталога
+        Game.objects.filter(pk=self.pending.pk).update(status='approved')
+        in_other_process(bump_catalog_version)
+        self.assertEqual(self.counts(), {'puzzle': 3, 'arcade': 2})
+
+    @override_settings(TAG_INDEX_REFRESH=0)
+    def test_index_is_rebuilt_after_refresh_period(self):
+        self.counts()
+        # Изменение без сдвига версии каталога
+        Game.objects.filter(pk=self.pending.pk).update(status='approved')
+        self.assertEqual(self.counts(), {'puzzle': 3, 'arcade': 2})
+
+
+@override_settings(RECENTLY_PLAYED_LIMIT=3)
+class RecentlyPlayedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        local_buckets.clear()
+        self.player = User.objects.create_user(username='player', password='pass12345')
+        developer = User.objects.create_user(username='dev', password='pass12345', user_type='developer')
+        self.games = [
+            Game.objects.create(
+                title=f'Game {i}', description='Описание', developer=developer,
+                html_file='games/html/index.html', status='approved',
+            )
+            for i in range(4)
+        ]
+        self.client.force_login(self.player)
+
+    def play(self, game):
+        response = self.client.post(reverse('increment_play_count', args=[game.pk]),
+                                    HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, 200)
+
+    def played_titles(self):
+        return [game.title for game, _ in RecentlyPlayed.games_for(self.player.pk)]
+
+    def test_list_is_bounded_and_most_recent_first(self):
+        for game in self.games:
+            self.play(game)
+        self.play(self.games[2])
+
+        self.assertEqual(self.played_titles(), ['Game 2', 'Game 3', 'Game 1'])
+        self.assertEqual(len(RecentlyPlayed.objects.get(user=self.player).entries), 3)
+
+    def test_list_is_shared_between_processes(self):
+        self.play(self.games[0])
+        self.assertEqual(self.played_titles(), ['Game 0'])
+        # Запуск в другом воркере: кеш этого процесса о нем не знает
+        RecentlyPlayed.objects.filter(pk=self.player.pk).update(entries=[[self.games[1].pk, 0]])
+        self.assertEqual(self.played_titles(), ['Game 1'])
+
+    def test_hidden_games_are_skipped(self):
+        self.play(self.games[0])
+        self.play(self.games[1])
+        self.games[1].status = 'rejected'
+        self.games[1].save()
+        self.assertEqual(self.played_titles(), ['Game 0'])
+
+    def test_profile_and_home_read_list_row_and_games(self):
+        self.play(self.games[0])
+        self.play(self.games[1])
+
+        with CaptureQueriesContext(connections['default']) as queries:
+            response = self.client.get(reverse('profile'))
+        self.assertEqual(response.context['recently_played'][0][0], self.games[1])
+        self.assertEqual(len([q for q in queries.captured_queries if 'recentlyplayed' in q['sql']]), 1)
+        self.assertEqual(len(game_queries(queries)), 1)
+
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, 'Продолжить игру')
+        self.assertEqual([game for game, _ in response.context['continue_playing']], [self.games[1], self.games[0]])
+
+
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(username='root', password='pass12345', email='root@example.com')
+        self.developer = User.objects.create_user(username='dev', password='pass12345', user_type='developer')
+        self.make_games(3)
+        self.client.force_login(self.admin)
+
+    def make_games(self, count):
+        for i in range(count):
+            game = Game.objects.create(
+                title=f'Game {i}', description='Описание', developer=self.developer,
+                html_file='games/html/index.html', status='approved',
+            )
+            GameStatShard.objects.create(game=game, shard=0, views=10 + i, play_count=i)
+
+    def changelist(self):
+        with CaptureQueriesContext(connections['default']) as queries:
+            response = self.client.get(reverse('admin:games_game_changelist'))
+        self.assertEqual(response.status_code, 200)
+        return response, queries
+
+    def test_stats_columns_do_not_add_queries_per_row(self):
+        self.changelist()
+        response, queries = self.changelist()
+        self.assertContains(response, '<td class="field-views">12</td>', html=True)
+        self.make_games(5)
+        _, more_queries = self.changelist()
+        self.assertEqual(len(more_queries), len(queries))
+
+    def test_sorting_by_stats_uses_stored_columns(self):
+        game = Game.objects.get(title='Game 1')
+        GameRating.objects.create(user=self.admin, game=game, rating=4)
+        for order in ('4', '5', '6', '-4', '-5', '-6'):
+            with CaptureQueriesContext(connections['default']) as queries:
+                response = self.client.get(reverse('admin:games_game_changelist'), {'o': order})
+            self.assertEqual(response.status_code, 200)
+            select = next(q['sql'] for q in queries.captured_queries if 'ORDER BY' in q['sql'] and 'games_game' in q['sql'])
+            order_by = select.rsplit('ORDER BY', 1)[1]
+            self.assertNotIn('SUM(', order_by)
+            self.assertNotIn('AVG(', select)
+        self.assertContains(response, '<td class="field-rating">4,0</td>', html=True)
+
+    def test_large_unfiltered_list_uses_estimate(self):
+        Game.objects.filter(title='Game 1').delete()
+        paginator = EstimatedCountPaginator(Game.objects.all(), 100)
+        paginator.exact_count_limit = 0
+        with CaptureQueriesContext(connections['default']) as queries:
+            # SQLite без ANALYZE: оценка по MAX(pk), удаленная строка не вычитается
+            self.assertEqual(paginator.count, Game.objects.order_by('-pk').first().pk)
+        self.assertFalse([q for q in queries.captured_queries if 'COUNT(' in q['sql']])
+
+        filtered = EstimatedCountPaginator(Game.objects.filter(status='approved'), 100)
+        filtered.exact_count_limit = 0
+        self.assertEqual(filtered.count, 2)
+
+    def test_actions_work_on_annotated_queryset(self):
+        game = Game.objects.get(title='Game 0')
+        self.client.post(reverse('admin:games_game_changelist'), {
+            'action': 'reject_games', '_selected_action': [game.pk],
+        })
+        game.refresh_from_db()
+        self.assertEqual(game.status, 'rejected')
+        self.assertEqual(self.client.get(reverse('admin:accounts_customuser_changelist')).status_code, 200)
+
+
+class ModerationLogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.moderator = User.objects.create_user(username='moder', password='pass12345', user_type='admin')
+        self.superuser = User.objects.create_superuser(username='root', password='pass12345', email='root@example.com')
+        developer = User.objects.create_user(username='dev', password='pass12345', user_type='developer')
+        self.games = [
+            Game.objects.create(
+                title=f'Game {i}', description='Описание', developer=developer,
+                html_file='games/html/index.html', status='pending',
+            )
+            for i in range(3)
+        ]
+
+    def test_site_moderation_is_logged(self):
+        self.client.force_login(self.moderator)
+        game = self.games[0]
+        self.client.get(reverse('moderate_game', args=[game.pk, 'approve']))
+        self.client.get(reverse('moderate_game', args=[game.pk, 'approve']))
+
+        game.refresh_from_db()
+        self.assertEqual(game.status, 'approved')
+        self.assertIsNotNone(game.published_at)
+        event = ModerationEvent.objects.for_game(game.pk).get()
+        self.assertEqual(
+            (event.moderator, event.action, event.from_status, event.to_status, event.source),
+            (self.moderator, 'approve', 'pending', 'approved', 'site'),
+        )
+
+    def test_concurrent_decisions_log_actual_previous_status(self):
+        # Оба модератора открыли игру, пока она была на проверке
+        first, second = Game.objects.get(pk=self.games[0].pk), Game.objects.get(pk=self.games[0].pk)
+        self.assertTrue(moderate(first, 'reject', self.moderator))
+        self.assertFalse(moderate(Game.objects.get(pk=first.pk), 'reject', self.superuser))
+        self.assertTrue(moderate(second, 'approve', self.superuser))
+
+        events = ModerationEvent.objects.for_game(first.pk).order_by('pk')
+        self.assertEqual(
+            [(e.from_status, e.to_status) for e in events],
+            [('pending', 'rejected'), ('rejected', 'approved')],
+        )
+
+    def test_games_being_deleted_are_not_moderated(self):
+        Game.objects.filter(pk__in=[self.games[0].pk, self.games[1].pk]).update(status='deleting')
+        self.assertFalse(moderate(self.games[0], 'approve', self.moderator))
+
+        self.client.force_login(self.superuser)
+        self.client.post(reverse('admin:games_game_changelist'), {
+            'action': 'approve_games', '_selected_action': [game.pk for game in self.games],
+        })
+        self.assertEqual(
+            list(Game.objects.order_by('title').values_list('status', flat=True)),
+            ['deleting', 'deleting', 'approved'],
+        )
+        self.assertEqual(ModerationEvent.objects.count(), 1)
+
+    def test_admin_bulk_action_inserts_events_in_one_statement(self):
+        self.client.force_login(self.superuser)
+        with CaptureQueriesContext(connections['default']) as queries:
+            self.client.post(reverse('admin:games_game_changelist'), {
+                'action': 'reject_games', '_selected_action': [game.pk for game in self.games[:2]],
+            })
+
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "games_moderationevent"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(ModerationEvent.objects.by_moderator(self.superuser.pk).count(), 2)
+        self.assertEqual(Game.objects.filter(status='rejected').count(), 2)
+
+    def test_log_is_append_only_and_survives_deletion(self):
+        self.client.force_login(self.moderator)
+        game = self.games[0]
+        self.client.get(reverse('moderate_game', args=[game.pk, 'reject']))
+        event = ModerationEvent.objects.get()
+
+        with self.assertRaises(TypeError):
+            event.save()
+        with self.assertRaises(TypeError):
+            ModerationEvent.objects.update(action='approve')
+        with self.assertRaises(TypeError):
+            ModerationEvent.objects.all().delete()
+
+        game.delete()
+        self.assertEqual(ModerationEvent.objects.get().game_title, 'Game 0')
+
+    def test_summary_is_one_aggregate_query(self):
+        self.client.force_login(self.moderator)
+        self.client.get(reverse('moderate_game', args=[self.games[0].pk, 'approve']))
+        self.client.get(reverse('moderate_game', args=[self.games[1].pk, 'reject']))
+
+        with self.assertNumQueries(1):
+            summary = moderator_summary(days=7)
+        self.assertEqual(len(summary), 1)
+        self.assertEqual((summary[0]['name'], summary[0]['approved'], summary[0]['rejected']), ('moder', 1, 1))
+
+        response = self.client.get(reverse('moderation_summary'), {'moderator': self.moderator.pk})
+        self.assertContains(response, 'Game 1')
+
+    def test_history_queries_use_indexes(self):
+        with CaptureQueriesContext(connections['default']) as queries:
+            list(ModerationEvent.objects.for_game(self.games[0].pk))
+            list(ModerationEvent.objects.by_moderator(self.moderator.pk))
+            list(ModerationEvent.objects.between(timezone.now() - timedelta(days=1)))
+        self.assertEqual(query_plan_problems(queries.captured_queries), [])
+
+
+def in_other_process(func, *args):
+    """Выполнить func в дочернем процессе - как в другом воркере со своим кешем default"""
+    process = multiprocessing.get_context('fork').Process(target=func, args=args)
+    process.start()
+    process.join()
+    assert process.exitcode == 0
+
+
+def _shared_incr(location, count):
+    cache = SharedMemoryCache(location, {})
+    for _ in range(count):
+        cache.incr('counter')
+
+
+class GameSaveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        local_buckets.clear()
+        self.player = User.objects.create_user(username='player', password='pass12345')
+        developer = User.objects.create_user(username='dev', password='pass12345', user_type='developer')
+        self.game = Game.objects.create(
+            title='Saved game', description='Описание', developer=developer,
+            html_file='games/html/index.html', status='approved',
+        )
+        self.client.force_login(self.player)
+
+    def url(self, slot='main'):
+        return reverse('api_game_save', args=[self.game.pk, slot])
+
+    def send(self, method, body, slot='main'):
+        return getattr(self.client, method)(self.url(slot), json.dumps(body), content_type='application/json')
+
+    def test_versions_and_conflicts(self):
+        response = self.send('put', {'version': 0, 'data': {'level': 1, 'inventory': ['sword']}})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['result']['version'], 1)
+
+        # Второй клиент тоже думает, что слота нет
+        response = self.send('put', {'version': 0, 'data': {'level': 5}})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['version'], 1)
+
+        self.assertEqual(self.send('patch', {'version': 1, 'patch': {'level': 2}}).json()['result']['version'], 2)
+        stale = self.send('patch', {'version': 1, 'patch': {'level': 3}})
+        self.assertEqual(stale.status_code, 409)
+        self.assertEqual(stale.json()['version'], 2)
+
+        result = self.client.get(self.url()).json()['result']
+        self.assertEqual((result['version'], result['data']), (2, {'level': 2, 'inventory': ['sword']}))
+
+        self.assertEqual(self.client.delete(self.url() + '?version=1').status_code, 409)
+        self.assertEqual(self.client.delete(self.url() + '?version=2').status_code, 200)
+        self.assertEqual(self.client.get(self.url()).status_code, 404)
+        self.assertFalse(GameSaveRecord.objects.exists())
+
+    def test_patch_writes_delta_without_rewriting_snapshot(self):
+        state = {'world': [{'x': i, 'y': i * 2, 'seen': True} for i in range(2000)], 'gold': 0}
+        saves.write(self.player, self.game, 'main', state, 0)
+        snapshot = GameSaveRecord.objects.get()
+        self.assertLess(len(snapshot.blob), len(saves.dumps(state)) / 5)
+
+        for gold in range(1, 11):
+            result = saves.patch(self.player, self.game, 'main', {'gold': gold}, gold)
+        state['gold'] = 10
+        self.assertEqual(result['version'], 11)
+
+        records = list(GameSaveRecord.objects.order_by('version'))
+        self.assertEqual(records[0].pk, snapshot.pk)
+        self.assertEqual(records[0].blob, snapshot.blob)
+        self.assertEqual([record.is_snapshot for record in records], [True] + [False] * 10)
+        self.assertTrue(all(len(record.blob) < 64 for record in records[1:]))
+        self.assertEqual(saves.load(self.player, self.game, 'main')['data'], state)
+
+        save = GameSave.objects.get()
+        self.assertEqual(save.size, len(saves.dumps(state)))
+        self.assertEqual(save.stored_size, sum(len(record.blob) for record in records))
+
+    @override_settings(SAVE_MAX_PATCHES=3)
+    def test_patches_are_compacted_into_snapshot(self):
+        notes = [f'note {i}' for i in range(500)]
+        saves.write(self.player, self.game, 'main', {'scores': {}, 'notes': notes}, 0)
+        for version in range(1, 6):
+            saves.patch(self.player, self.game, 'main', {'scores': {f'level{version}': version}, 'old': None}, version)
+
+        save = GameSave.objects.get()
+        # Три патча поверх первого снимка, четвертый сворачивается в снимок v5
+        self.assertEqual((save.version, save.base_version), (6, 5))
+        self.assertEqual(list(save.records.values_list('version', 'is_snapshot')), [(5, True), (6, False)])
+        self.assertEqual(
+            saves.load(self.player, self.game, 'main')['data'],
+            {'scores': {f'level{i}': i for i in range(1, 6)}, 'notes': notes},
+        )
+
+    @override_settings(SAVE_MAX_BYTES=1000, SAVE_MAX_SLOTS=2)
+    def test_size_and_slot_limits(self):
+        self.assertEqual(self.send('put', {'version': 0, 'data': 'x' * 2000}).status_code, 413)
+        self.assertEqual(self.send('put', {'version': 0, 'data': {'text': 'x' * 500}}).status_code, 200)
+        self.assertEqual(self.send('patch', {'version': 1, 'patch': {'more': 'y' * 600}}).status_code, 413)
+        self.assertEqual(GameSave.objects.get().version, 1)
+
+        self.assertEqual(self.send('put', {'version': 0, 'data': {}}, slot='second').status_code, 200)
+        response = self.send('put', {'version': 0, 'data': {}}, slot='third')
+        self.assertEqual(response.status_code, 400)
+
+        slots = self.client.get(reverse('api_game_saves', args=[self.game.pk])).json()
+        self.assertEqual([row['slot'] for row in slots['results']], ['main', 'second'])
+        self.assertEqual(self.send('put', {'version': 0, 'data': {}}, slot='x' * 40).status_code, 400)
+
+    def test_saves_are_per_user_and_need_login(self):
+        saves.write(self.player, self.game, 'main', {'level': 7}, 0)
+        other = User.objects.create_user(username='other', password='pass12345')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(self.url()).status_code, 404)
+
+        self.client.logout()
+        response = self.client.get(self.url())
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_game_page_includes_bridge_for_players(self):
+        response = self.client.get(reverse('game_detail', args=[self.game.pk]))
+        self.assertContains(response, 'js/cloud-save.js')
+        self.assertContains(response, f'CloudSave.host(document.getElementById(\'game-frame\'), {self.game.pk})')
+
+
+class GameSaveConcurrencyTests(TransactionTestCase):
+    """Параллельная запись в один слот: оптимистичная блокировка без потерянных обновлений.
+
+    Тестовая SQLite в памяти с общим кешем не ждет блокировку, а сразу отвечает
+    "table is locked", поэтому отдельные вызовы к БД сериализуются db_lock.
+    Потоки по-прежнему вклиниваются между чтением слота и записью патча.
+    """
+    WRITERS = 4
+    WRITES = 15
+
+    def setUp(self):
+        self.db_lock = threading.Lock()
+        self.developer = User.objects.create_user(username='dev', password='pass12345', user_type='developer')
+        self.game = Game.objects.create(
+            title='Saved game', description='Описание', developer=self.developer,
+            html_file='games/html/index.html', status='approved',
+        )
+        self.players = [
+            User.objects.create_user(username=f'player{i}', password='pass12345') for i in range(self.WRITERS)
+        ]
+
+    def call(self, func, *args):
+        with self.db_lock:
+            return func(*args)
+
+    def run_writers(self, target):
+        errors = []
+
+        def run(index):
+            try:
+                target(index)
+            except Exception as exc:  # noqa: BLE001 - ошибки потоков проверяются ниже
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(self.WRITERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_contended_slot_keeps_every_update(self):
+        owner = self.players[0]
+        saves.write(owner, self.game, 'shared', {'counter': 0}, 0)
+
+        def writer(index):
+            done = 0
+            while done < self.WRITES:
+                current = self.call(saves.load, owner, self.game, 'shared')
+                changes = {'counter': current['data']['counter'] + 1, f'writer{index}': done + 1}
+                try:
+                    self.call(saves.patch, owner, self.game, 'shared', changes, current['version'])
+                except saves.SaveConflict:
+                    continue
+                done += 1
+
+        self.run_writers(writer)
+        total = self.WRITERS * self.WRITES
+        result = saves.load(owner, self.game, 'shared')
+        self.assertEqual(result['data']['counter'], total)
+        self.assertEqual(result['version'], total + 1)
+        self.assertTrue(all(result['data'][f'writer{i}'] == self.WRITES for i in range(self.WRITERS)))
+
+    @override_settings(SAVE_MAX_SLOTS=2)
+    def test_concurrent_slot_creation_respects_limit(self):
+        owner = self.players[0]
+        rejected = []
+
+        def writer(index):
+            try:
+                self.call(saves.write, owner, self.game, f'slot{index}', {'index': index}, 0)
+            except saves.SaveError:
+                rejected.append(index)
+
+        self.run_writers(writer)
+        self.assertEqual(GameSave.objects.filter(user=owner, game=self.game).count(), 2)
+        self.assertEqual(len(rejected), self.WRITERS - 2)
+
+    def test_parallel_players_keep_their_own_slots(self):
+        state = {'map': [[x * y % 7 for x in range(64)] for y in range(64)], 'turn': 0}
+
+        def writer(index):
+            player = self.players[index]
+            version = self.call(saves.write, player, self.game, 'main', state, 0)['version']
+            for turn in range(1, self.WRITES + 1):
+                version = self.call(saves.patch, player, self.game, 'main', {'turn': turn}, version)['version']
+
+        self.run_writers(writer)
+        for player in self.players:
+            self.assertEqual(saves.load(player, self.game, 'main')['data']['turn'], self.WRITES)
+        # Большой снимок записан по разу на игрока, остальное - патчи
+        self.assertEqual(GameSaveRecord.objects.filter(is_snapshot=True).count(), self.WRITERS)
+
+
+class SharedMemoryCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.location = os.path.join(directory.name, 'cache')
+        self.cache = self.make_cache()
+
+    def make_cache(self, **options):
+        return SharedMemoryCache(self.location, {'OPTIONS': options})
+
+    def test_basic_operations(self):
+        self.cache.set('game', {'views': 10})
+        self.assertEqual(self.cache.get('game'), {'views': 10})
+        self.assertFalse(self.cache.add('game', 'other'))
+        self.assertTrue(self.cache.add('new', 1))
+        self.assertEqual(self.cache.incr('new', 5), 6)
+        self.assertTrue(self.cache.delete('new'))
+        self.assertIsNone(self.cache.get('new'))
+        with self.assertRaises(ValueError):
+            self.cache.incr('new')
+
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('game'))
+
+    def test_expiry(self):
+        self.cache.set('short', 1, 0.05)
+        self.cache.set('forever', 1, None)
+        time.sleep(0.1)
+        self.assertFalse(self.cache.has_key('short'))
+        self.assertTrue(self.cache.has_key('forever'))
+        self.assertTrue(self.cache.touch('forever', 0.05))
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('forever'))
+
+    def test_values_visible_to_other_instances(self):
+        # Экземпляр на каждый поток и процесс: данные общие через файл
+        self.cache.set('game', 42)
+        self.assertEqual(self.make_cache().get('game'), 42)
+
+    def test_values_go_to_smallest_fitting_size_class(self):
+        self.cache.set('page', 'x' * 5000)
+        self.cache.set('sketch', bytes(2048))
+        self.assertEqual(len(self.cache.get('page')), 5000)
+        self.assertEqual(len(self.cache.get('sketch')), 2048)
+
+        # Значение сменило класс размеров - старая копия не отдается
+        self.cache.set('page', 'small')
+        self.assertEqual(self.cache.get('page'), 'small')
+        self.cache.set('page', 'x' * 5000)
+        self.assertTrue(self.cache.delete('page'))
+        self.assertIsNone(self.cache.get('page'))
+
+    def test_value_larger_than_largest_slot_is_logged(self):
+        self.cache.set('big', 'small')
+        with self.assertLogs('games_platform.cache', 'WARNING') as logs:
+            self.cache.set('big', 'x' * 20000)
+        self.assertIn('не кешируется', logs.output[0])
+        self.assertIsNone(self.cache.get('big'))
+
+    def test_file_with_other_geometry_is_not_reinitialized(self):
+        self.cache.set('game', 42)
+        path = self.location + '.256'
+        with open(path, 'rb') as f:
+            before = f.read()
+        # Другой процесс с иным SLOTS: файл, отображенный текущими процессами, не трогается
+        with self.assertRaises(ImproperlyConfigured):
+            _Table(path, slots=64, slot_size=256, bucket_size=8, stripes=64)
+        with self.assertRaises(ImproperlyConfigured):
+            self.make_cache(SIZE_CLASSES=[(256, 64)])
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), before)
+        self.assertEqual(self.cache.get('game'), 42)
+
+    def test_clock_keeps_recently_read_keys(self):
+        # Одна корзина из четырех слотов: при вытеснении выживают прочитанные ключи
+        cache = SharedMemoryCache(self.location + '.small', {'OPTIONS': {'SLOTS': 4, 'BUCKET_SIZE': 4}})
+        for i in range(4):
+            cache.set(f'key{i}', i)
+        cache.set('key4', 4)
+        cache.get('key4')
+        cache.get('key2')
+        cache.set('key5', 5)
+
+        self.assertEqual(cache.get('key2'), 2)
+        self.assertEqual(cache.get('key4'), 4)
+        self.assertEqual(cache.get('key5'), 5)
+        self.assertEqual(sum(cache.has_key(f'key{i}') for i in range(6)), 4)
+
+    def test_incr_is_atomic_across_processes(self):
+        self.cache.set('counter', 0, None)
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=_shared_incr, args=(self.location, 300)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 1200)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('games/', views.game_list, name='game_list'),
@@ -15,12 +15,31 @@ urlpatterns = [
     path('games/<int:pk>/rate/', views.rate_game, name='rate_game'),
     path('games/<int:pk>/toggle-like/', views.toggle_like, name='toggle_like'),
     path('games/<int:pk>/increment-play/', views.increment_play_count, name='increment_play_count'),
+    path('games/<int:pk>/live/', views.game_live, name='game_live'),
 
     # Модерация
     path('moderation/', views.moderation_list, name='moderation_list'),
+    path('moderation/summary/', views.moderation_summary, name='moderation_summary'),
     path('moderation/<int:pk>/<str:action>/', views.moderate_game, name='moderate_game'),
 
     # Популярные игры
     path('games/popular/', views.popular_games, name='popular_games'),
     path('games/best-rated/', views.best_rated_games, name='best_rated_games'),
+
+    # Аналитика разработчика
+    path('dashboard/', views.developer_dashboard, name='developer_dashboard'),
+    path('dashboard/<int:pk>/', views.developer_dashboard, name='developer_dashboard_for'),
+
+    # JSON API (только чтение)
+    path('api/v1/games/', api.game_list, name='api_game_list'),
+    path('api/v1/games/stats/', api.game_stats, name='api_game_stats'),
+    path('api/v1/games/suggest/', api.game_suggest, name='api_game_suggest'),
+    path('api/v1/games/<int:pk>/', api.game_detail, name='api_game_detail'),
+    path('api/v1/games/<int:pk>/comments/', api.game_comments, name='api_game_comments'),
+    path('api/v1/games/<int:pk>/saves/', api.game_saves, name='api_game_saves'),
+    path('api/v1/games/<int:pk>/saves/<slug:slot>/', api.game_save, name='api_game_save'),
+    path('api/v1/leaderboards/<slug:board>/', api.leaderboard, name='api_leaderboard'),
+
+    # Выгрузки для администраторов
+    path('export/<slug:dataset>.<slug:fmt>', views.export_stats, name='export_stats'),
 ]
@@ -1,21 +1,51 @@
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.utils import timezone
-
-from django.http import JsonResponse
-from .models import Game, Comment, GameRating, GameStat
+from django.contrib.auth import get_user_model
+from django.db.models import F, Prefetch
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse, Http404
+from games_platform.ratelimit import client_ip, rate_limit
+from games_platform.routers import read_from_replica
+from .models import (
+    Game, Tag, Comment, GameRating, GameStat, GameStatShard, GameViewerSketch, ModerationEvent, RecentlyPlayed,
+    invalidate_developer_dashboard,
+)
+from .page_cache import anonymous_page_cache, game_version_key, ratings_scope
 from .forms import GameForm, CommentForm, RatingForm
+from .exports import DATASETS, FORMATS, stream_export
+from .deletion import schedule_game_deletion
+from .jobs import enqueue
+from .dashboard import developer_dashboard_data
+from .live import event_stream, publish_stats
+from .moderation import moderate, moderator_summary
+from .tags import tag_index
+
+User = get_user_model()
 
 
+@anonymous_page_cache()
+@read_from_replica
 def game_list(request):
     # Для обычных пользователей показываем только одобренные игры
     if request.user.is_authenticated and request.user.is_admin():
-        games = Game.objects.all()
+        games = Game.objects.exclude(status='deleting')
     else:
         games = Game.objects.filter(status='approved')
 
-    return render(request, 'games/game_list.html', {'games': games})
+    # Фильтр по тегам: каждый выбранный тег - отдельный JOIN по индексу связей, счетчики фасетов - из tag_index
+    selected_tags, tag_facets = tag_index.facets(request.GET.getlist('tag'))
+    for tag_id, _ in selected_tags:
+        games = games.filter(tags=tag_id)
+
+    return render(request, 'games/game_list.html', {
+        # Теги карточек без ORDER BY в БД (временное B-дерево), сортируются в шаблоне
+        'games': games.prefetch_related(Prefetch('tags', queryset=Tag.objects.order_by())),
+        'tag_facets': tag_facets,
+        'selected_tags': [slug for _, slug in selected_tags],
+    })
 
 
 @login_required
@@ -30,6 +60,7 @@ def game_create(request):
             game = form.save(commit=False)
             game.developer = request.user
             game.save()
+            form.save_m2m()
             messages.success(request, 'Игра успешно загружена и отправлена на модерацию')
             return redirect('game_detail', pk=game.pk)
     else:
@@ -43,13 +74,14 @@ def game_create(request):
 
 @login_required
 def game_edit(request, pk):
-    game = get_object_or_404(Game, pk=pk)
+    game = get_object_or_404(Game.objects.exclude(status='deleting'), pk=pk)
 
     if not game.can_edit(request.user):
         messages.error(request, 'У вас нет прав для редактирования этой игры')
         return redirect('game_detail', pk=game.pk)
 
     if request.method == 'POST':
+        old_files = [game.html_file.name, game.thumbnail.name]
         form = GameForm(request.POST, request.FILES, instance=game)
         if form.is_valid():
             # Если игра редактируется, снова отправляем на модерацию
@@ -58,6 +90,10 @@ def game_edit(request, pk):
                 messages.info(request, 'Игра отправлена на повторную модерацию')
 
             form.save()
+            # Старые файлы удаляются в фоне, когда их перестанут отдавать закешированные страницы
+            replaced = [name for name in old_files if name and name not in (game.html_file.name, game.thumbnail.name)]
+            if replaced:
+                enqueue('games.delete_replaced_media', {'names': replaced}, delay=settings.PAGE_CACHE_TIMEOUT)
             messages.success(request, 'Игра успешно обновлена')
             return redirect('game_detail', pk=game.pk)
     else:
@@ -79,7 +115,8 @@ def game_delete(request, pk):
         return redirect('game_detail', pk=game.pk)
 
     if request.method == 'POST':
-        game.delete()
+        # Игра сразу скрывается, а данные удаляются порциями в фоне
+        schedule_game_deletion(game, request.user)
         messages.success(request, 'Игра успешно удалена')
         return redirect('game_list')
 
@@ -104,24 +141,68 @@ def moderate_game(request, pk, action):
         messages.error(request, 'Доступ только для администраторов')
         return redirect('game_list')
 
-    game = get_object_or_404(Game, pk=pk)
+    game = get_object_or_404(Game.objects.exclude(status='deleting'), pk=pk)
 
     if action == 'approve':
-        game.status = 'approved'
-        game.published_at = timezone.now()
-        game.save()
+        moderate(game, 'approve', request.user)
         messages.success(request, f'Игра "{game.title}" одобрена')
     elif action == 'reject':
-        game.status = 'rejected'
-        game.save()
+        moderate(game, 'reject', request.user)
         messages.warning(request, f'Игра "{game.title}" отклонена')
 
     return redirect('moderation_list')
 
 
+@login_required
+def moderation_summary(request):
+    """Сводка работы модераторов за период и последние события журнала"""
+    if not request.user.is_admin():
+        messages.error(request, 'Доступ только для администраторов')
+        return redirect('game_list')
+
+    try:
+        days = max(1, int(request.GET.get('days', settings.MODERATION_SUMMARY_DAYS)))
+    except ValueError:
+        days = settings.MODERATION_SUMMARY_DAYS
+
+    events = ModerationEvent.objects.all()
+    moderator_id = request.GET.get('moderator')
+    if moderator_id and moderator_id.isdigit():
+        events = ModerationEvent.objects.by_moderator(int(moderator_id))
+
+    return render(request, 'games/moderation_summary.html', {
+        'days': days,
+        'periods': [7, 30, 90],
+        'summary': moderator_summary(days),
+        'events': events[:50],
+        'moderator_id': moderator_id,
+    })
+
+
+def game_page_scope(request, pk):
+    """Версия кеша страницы игры"""
+    return game_version_key(pk)
+
+
+def viewer_key(request):
+    """Идентификатор зрителя: пользователь, сессия или IP с User-Agent"""
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    if request.session.session_key:
+        return f'session:{request.session.session_key}'
+    return 'anon:{}:{}'.format(client_ip(request), request.headers.get('User-Agent', ''))
+
+
+def count_view(request, pk):
+    """Просмотр страницы игры (в том числе отданной из кеша)"""
+    GameStatShard.increment(pk, 'views')
+    GameViewerSketch.record(pk, viewer_key(request))
+
+
+@anonymous_page_cache(scope=game_page_scope, on_hit=count_view)
 def game_detail(request, pk):
     """Детальная информация об игре с просмотрами"""
-    game = get_object_or_404(Game, pk=pk)
+    game = get_object_or_404(Game.objects.exclude(status='deleting'), pk=pk)
 
     # Проверяем доступ
     if game.status != 'approved' and not request.user.is_authenticated:
@@ -133,8 +214,8 @@ def game_detail(request, pk):
             messages.error(request, 'Эта игра еще не прошла модерацию')
             return redirect('game_list')
 
-    # Увеличиваем счетчик просмотров
-    game.increment_views()
+    # Увеличиваем счетчик просмотров и учитываем зрителя
+    count_view(request, game.pk)
 
     # Получаем комментарии
     comments = game.comments.all()
@@ -166,11 +247,34 @@ def game_detail(request, pk):
         'rating_count': game.get_rating_count(),
         'can_edit': game.can_edit(request.user) if request.user.is_authenticated else False,
         'can_delete': game.can_delete(request.user) if request.user.is_authenticated else False,
+        'live_updates': settings.LIVE_UPDATES,
     }
 
     return render(request, 'games/game_detail.html', context)
 
 
+async def game_live(request, pk):
+    """Живые обновления счетчиков и комментариев игры (server-sent events).
+
+    Под WSGI бесконечный поток занимал бы рабочий поток на все время просмотра,
+    поэтому без LIVE_UPDATES и вне ASGI-сервера адреса нет.
+    """
+    if not settings.LIVE_UPDATES or not isinstance(request, ASGIRequest):
+        raise Http404
+    if not await Game.objects.filter(pk=pk, status='approved').aexists():
+        raise Http404
+
+    response = StreamingHttpResponse(
+        event_stream(pk, request.headers.get('Last-Event-ID')),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # nginx не должен буферизовать поток
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@rate_limit('add_comment')
 @login_required
 def add_comment(request, pk):
     """Добавление комментария к игре"""
@@ -233,6 +337,7 @@ def delete_comment(request, comment_pk):
     return redirect('game_detail', pk=game_pk)
 
 
+@rate_limit('rate_game')
 @login_required
 def rate_game(request, pk):
     """Оценка игры"""
@@ -256,6 +361,7 @@ def rate_game(request, pk):
     return redirect('game_detail', pk=game.pk)
 
 
+@rate_limit('toggle_like')
 @login_required
 def toggle_like(request, pk):
     """Лайк/дизлайк игры (AJAX)"""
@@ -264,28 +370,32 @@ def toggle_like(request, pk):
         action = request.POST.get('action')
 
         # Создаем статистику, если ее нет
-        if not hasattr(game, 'stats'):
-            GameStat.objects.create(game=game)
+        GameStat.objects.get_or_create(game=game)
 
-        if action == 'like':
-            game.stats.likes += 1
-        elif action == 'dislike':
-            game.stats.dislikes += 1
-
-        game.stats.save()
+        # Атомарный UPDATE: save() устаревшего объекта затер бы свернутые шарды просмотров и запусков
+        if action in ('like', 'dislike'):
+            field = f'{action}s'
+            GameStat.objects.filter(game=game).update(**{field: F(field) + 1})
+            invalidate_developer_dashboard(game.pk)
+            publish_stats(game.pk, **{field: 1})
 
+        likes, dislikes = GameStat.objects.filter(game=game).values_list('likes', 'dislikes').get()
         return JsonResponse({
             'success': True,
-            'likes': game.stats.likes,
-            'dislikes': game.stats.dislikes,
+            'likes': likes,
+            'dislikes': dislikes,
         })
 
     return JsonResponse({'success': False}, status=400)
 
 
+@anonymous_page_cache(scope=ratings_scope)
+@read_from_replica
 def popular_games(request):
-    """Самые популярные игры"""
+    """Самые популярные игры: по просмотрам или по уникальным зрителям (?by=unique)"""
     games = Game.objects.filter(status='approved')
+    by_unique = request.GET.get('by') == 'unique'
+    unique_viewers = GameViewerSketch.unique_viewer_counts(days=settings.POPULAR_UNIQUE_DAYS) if by_unique else {}
 
     # Сортируем по просмотрам (можно добавить другие критерии)
     games_with_stats = []
@@ -295,53 +405,59 @@ def popular_games(request):
             'views': game.get_view_count(),
             'rating': game.get_average_rating(),
             'plays': game.get_play_count(),
+            'unique_viewers': unique_viewers.get(game.pk, 0),
         })
 
-    # Сортируем по просмотрам
-    games_with_stats.sort(key=lambda x: x['views'], reverse=True)
+    # Сортируем по просмотрам или по уникальным зрителям
+    sort_key = 'unique_viewers' if by_unique else 'views'
+    games_with_stats.sort(key=lambda x: x[sort_key], reverse=True)
 
     context = {
         'games': games_with_stats[:10],  # Топ-10
         'title': 'Популярные игры',
+        'by_unique': by_unique,
+        'unique_days': settings.POPULAR_UNIQUE_DAYS,
     }
 
     return render(request, 'games/popular_games.html', context)
 
 
+@anonymous_page_cache(scope=ratings_scope)
+@read_from_replica
 def best_rated_games(request):
-    """Лучшие игры по рейтингу"""
-    games = Game.objects.filter(status='approved')
+    """Лучшие игры по байесовскому рейтингу: индексный проход с LIMIT"""
+    games = (
+        Game.objects.filter(status='approved', rating_votes__gt=0)
+        .select_related('developer')
+        .order_by('-rating_score')[:10]
+    )
 
-    # Фильтруем игры с достаточным количеством оценок
     rated_games = []
     for game in games:
-        rating = game.get_average_rating()
-        rating_count = game.get_rating_count()
-        if rating_count >= 3:  # Минимум 3 оценки
-            rated_games.append({
-                'game': game,
-                'rating': rating,
-                'rating_count': rating_count,
-                'views': game.get_view_count(),
-            })
-
-    # Сортируем по рейтингу
-    rated_games.sort(key=lambda x: x['rating'], reverse=True)
+        rated_games.append({
+            'game': game,
+            'rating': round(game.rating_sum / game.rating_votes, 1),
+            'rating_count': game.rating_votes,
+            'score': round(game.rating_score, 2),
+            'views': game.get_view_count(),
+        })
 
     context = {
-        'games': rated_games[:10],  # Топ-10
+        'games': rated_games,
         'title': 'Лучшие игры по рейтингу',
     }
 
     return render(request, 'games/best_rated_games.html', context)
 
 
+@rate_limit('increment_play_count')
 @login_required
 def increment_play_count(request, pk):
     """Увеличить счетчик запусков игры (AJAX)"""
     if request.method == 'POST' and request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         game = get_object_or_404(Game, pk=pk)
         game.increment_play_count()
+        RecentlyPlayed.record(request.user.pk, game.pk)
 
         return JsonResponse({
             'success': True,
@@ -349,3 +465,38 @@ def increment_play_count(request, pk):
         })
 
     return JsonResponse({'success': False}, status=400)
+
+
+@login_required
+def export_stats(request, dataset, fmt):
+    """Потоковая выгрузка статистики игр или пользователей (CSV/JSON)"""
+    if not request.user.is_admin():
+        messages.error(request, 'Доступ только для администраторов')
+        return redirect('game_list')
+
+    if dataset not in DATASETS or fmt not in FORMATS:
+        raise Http404('Неизвестная выгрузка')
+
+    response = StreamingHttpResponse(stream_export(dataset, fmt), content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{fmt}"'
+    return response
+
+
+@login_required
+def developer_dashboard(request, pk=None):
+    """Аналитика по играм разработчика"""
+    if pk is None:
+        developer = request.user
+    elif request.user.is_admin():
+        developer = get_object_or_404(User, pk=pk)
+    else:
+        messages.error(request, 'Доступ только для администраторов')
+        return redirect('home')
+
+    if not developer.is_developer():
+        messages.error(request, 'Аналитика доступна только разработчикам')
+        return redirect('profile')
+
+    context = developer_dashboard_data(developer)
+    context['developer'] = developer
+    return render(request, 'games/developer_dashboard.html', context)
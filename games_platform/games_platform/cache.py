@@ -0,0 +1,354 @@
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+
+logger = logging.getLogger(__name__)
+
+# Заголовок файла: сигнатура, число слотов, размер слота, слотов в корзине, полос блокировок
+FILE_HEADER = struct.Struct('<8sIIHH')
+MAGIC = b'GPSHMC02'
+# Заголовок слота: хеш ключа, срок (0 - бессрочно), флаги, длина ключа, длина значения
+SLOT_HEADER = struct.Struct('<QdBxHI')
+USED = 1
+REFERENCED = 2
+
+# Классы размеров по умолчанию: (байт на слот, число слотов). Страница каталога в кеше - около 4 КБ,
+# HLL-скетч - 2 КБ регистров
+DEFAULT_SIZE_CLASSES = ((256, 8192), (2048, 4096), (16384, 1024))
+
+# Процессные объекты таблиц по пути файла: экземпляры бэкенда создаются на каждый поток
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def _get_table(path, slots, slot_size, bucket_size, stripes):
+    with _tables_lock:
+        table = _tables.get(path)
+        if table is None:
+            table = _tables[path] = _Table(path, slots, slot_size, bucket_size, stripes)
+        elif table.params != (slots, slot_size, bucket_size, stripes):
+            raise ImproperlyConfigured(f'Кеш {path} уже открыт в этом процессе с другими OPTIONS')
+    return table
+
+
+class _Table:
+    """Хеш-таблица фиксированного размера в общем файле, отображенном в память.
+
+    Слоты сгруппированы в корзины по bucket_size; ключ ищется только в своей
+    корзине, вытеснение внутри корзины - по алгоритму CLOCK (второй шанс по
+    флагу REFERENCED). Корзины защищены полосами блокировок: threading.Lock
+    внутри процесса + fcntl.lockf на байт полосы между процессами.
+    """
+
+    def __init__(self, path, slots, slot_size, bucket_size, stripes):
+        self.path = path
+        self.params = (slots, slot_size, bucket_size, stripes)
+        self.slot_size = slot_size
+        self.bucket_size = bucket_size
+        self.buckets = max(1, slots // bucket_size)
+        self.slots = self.buckets * bucket_size
+        self.stripes = stripes
+        self.size = FILE_HEADER.size + self.slots * slot_size
+        self.thread_locks = [threading.Lock() for _ in range(stripes)]
+        self.pid = os.getpid()
+        self._open()
+
+    def _open(self):
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            self._init_file()
+        except BaseException:
+            os.close(self.fd)
+            raise
+        self.map = mmap.mmap(self.fd, self.size)
+
+    def _init_file(self):
+        # Инициализация файла - под блокировкой всего файла
+        fcntl.lockf(self.fd, fcntl.LOCK_EX)
+        try:
+            header = os.pread(self.fd, FILE_HEADER.size, 0)
+            expected = FILE_HEADER.pack(MAGIC, self.slots, self.slot_size, self.bucket_size, self.stripes)
+            if not header.startswith(MAGIC):
+                # Новый файл или прерванная инициализация: сигнатура пишется последней,
+                # поэтому такой файл еще никто не отобразил в память
+                os.ftruncate(self.fd, 0)
+                os.ftruncate(self.fd, self.size)
+                os.pwrite(self.fd, expected, 0)
+            elif header != expected or os.fstat(self.fd).st_size != self.size:
+                # Файл отображен другими процессами: ftruncate под ними закончился бы SIGBUS
+                raise ImproperlyConfigured(
+                    f'Файл кеша {self.path} создан с другими SLOTS/SLOT_SIZE/BUCKET_SIZE/STRIPES; '
+                    'остановите процессы, которые его используют, и удалите файл или смените LOCATION'
+                )
+        finally:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN)
+
+    def reopen_after_fork(self):
+        # Блокировки fcntl не наследуются, а threading.Lock мог быть захвачен в момент fork
+        if os.getpid() != self.pid:
+            self.pid = os.getpid()
+            self.thread_locks = [threading.Lock() for _ in range(self.stripes)]
+            self.map.close()
+            os.close(self.fd)
+            self._open()
+
+    @contextmanager
+    def locked(self, stripe):
+        with self.thread_locks[stripe]:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, 1, stripe)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, 1, stripe)
+
+    @contextmanager
+    def locked_all(self):
+        for stripe in range(self.stripes):
+            self.thread_locks[stripe].acquire()
+        try:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, self.stripes, 0)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, self.stripes, 0)
+        finally:
+            for stripe in range(self.stripes):
+                self.thread_locks[stripe].release()
+
+    def locate(self, key):
+        """(хеш ключа, номер корзины, полоса блокировки)"""
+        key_hash = int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little')
+        bucket = key_hash % self.buckets
+        return key_hash, bucket, bucket % self.stripes
+
+    def _offset(self, bucket, index):
+        return FILE_HEADER.size + (bucket * self.bucket_size + index) * self.slot_size
+
+    def _header(self, offset):
+        return SLOT_HEADER.unpack_from(self.map, offset)
+
+    def find(self, key, key_hash, bucket, now):
+        """Смещение живого слота с ключом или None (просроченный слот освобождается)"""
+        for index in range(self.bucket_size):
+            offset = self._offset(bucket, index)
+            slot_hash, expires, flags, key_len, _ = self._header(offset)
+            if not flags & USED or slot_hash != key_hash:
+                continue
+            start = offset + SLOT_HEADER.size
+            if self.map[start:start + key_len] != key:
+                continue
+            if expires and expires <= now:
+                self.map[offset + 16] = 0
+                return None
+            return offset
+        return None
+
+    def read(self, offset):
+        _, _, flags, key_len, value_len = self._header(offset)
+        self.map[offset + 16] = flags | REFERENCED
+        start = offset + SLOT_HEADER.size + key_len
+        return self.map[start:start + value_len]
+
+    def expires(self, offset):
+        return self._header(offset)[1]
+
+    def write(self, offset, key, key_hash, value, expires):
+        hand = self.map[offset + 17]
+        SLOT_HEADER.pack_into(self.map, offset, key_hash, expires, USED | REFERENCED, len(key), len(value))
+        self.map[offset + 17] = hand
+        start = offset + SLOT_HEADER.size
+        self.map[start:start + len(key)] = key
+        self.map[start + len(key):start + len(key) + len(value)] = value
+
+    def victim(self, bucket, now):
+        """Слот под новую запись: свободный, просроченный или выбранный CLOCK"""
+        for index in range(self.bucket_size):
+            offset = self._offset(bucket, index)
+            _, expires, flags, _, _ = self._header(offset)
+            if not flags & USED or (expires and expires <= now):
+                return offset
+        # Стрелка CLOCK хранится в первом байте-заполнителе заголовка нулевого слота корзины
+        hand_offset = self._offset(bucket, 0) + 17
+        hand = self.map[hand_offset] % self.bucket_size
+        while True:
+            offset = self._offset(bucket, hand)
+            flags = self.map[offset + 16]
+            hand = (hand + 1) % self.bucket_size
+            if flags & REFERENCED:
+                self.map[offset + 16] = flags & ~REFERENCED
+                continue
+            self.map[hand_offset] = hand
+            return offset
+
+    def delete(self, offset):
+        self.map[offset + 16] = 0
+
+    def clear(self):
+        self.map[FILE_HEADER.size:] = bytes(self.size - FILE_HEADER.size)
+
+
+class SharedMemoryCache(BaseCache):
+    """Кеш в файлах, отображенных в память, общий для всех процессов хоста.
+
+    LOCATION - путь-префикс файлов (лучше в tmpfs, например /dev/shm). Значения
+    лежат в классах размеров: на каждый класс - своя таблица в файле
+    LOCATION.<размер слота>, значение пишется в наименьший класс, куда
+    помещаются ключ и pickle. Что не помещается и в самый крупный, не
+    кешируется (предупреждение в логе).
+
+    OPTIONS: SIZE_CLASSES - [(байт на слот, число слотов), ...] или, для одного
+    класса, SLOTS и SLOT_SIZE; BUCKET_SIZE - слотов в корзине, STRIPES - полос
+    блокировок. Только POSIX (fcntl).
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        if 'SLOTS' in options or 'SLOT_SIZE' in options:
+            size_classes = [(options.get('SLOT_SIZE', 1024), options.get('SLOTS', 16384))]
+        else:
+            size_classes = options.get('SIZE_CLASSES', DEFAULT_SIZE_CLASSES)
+        bucket_size = options.get('BUCKET_SIZE', 8)
+        stripes = options.get('STRIPES', 64)
+        self._tables = [
+            _get_table(f'{location}.{slot_size}', slots, slot_size, bucket_size, stripes)
+            for slot_size, slots in sorted(size_classes)
+        ]
+
+    def _tables_for_use(self):
+        for table in self._tables:
+            table.reopen_after_fork()
+        return self._tables
+
+    def _encode_key(self, key, version):
+        return self.make_and_validate_key(key, version=version).encode()
+
+    def _expires(self, timeout):
+        expires = self.get_backend_timeout(timeout)
+        return 0.0 if expires is None else expires
+
+    def _lookup(self, key_bytes):
+        """(таблица, хеш, корзина, полоса) для поиска ключа по всем классам"""
+        for table in self._tables_for_use():
+            key_hash, bucket, stripe = table.locate(key_bytes)
+            yield table, key_hash, bucket, stripe
+
+    def _store(self, key_bytes, value, timeout, only_new):
+        payload = pickle.dumps(value, self.pickle_protocol)
+        size = SLOT_HEADER.size + len(key_bytes) + len(payload)
+        target = next((table for table in self._tables_for_use() if size <= table.slot_size), None)
+        if target is None:
+            logger.warning(
+                'Значение %s (%d байт) больше слота самого крупного класса (%d байт) и не кешируется',
+                key_bytes.decode(), size, self._tables[-1].slot_size,
+            )
+            # Старое значение удаляем, чтобы не отдавать устаревшее
+            self._delete(key_bytes)
+            return False
+
+        if only_new and self._has(key_bytes, exclude=target):
+            return False
+        expires = self._expires(timeout)
+        key_hash, bucket, stripe = target.locate(key_bytes)
+        with target.locked(stripe):
+            now = time.time()
+            offset = target.find(key_bytes, key_hash, bucket, now)
+            if offset is not None and only_new:
+                return False
+            if expires and expires <= now:
+                if offset is not None:
+                    target.delete(offset)
+                offset = None
+            else:
+                if offset is None:
+                    offset = target.victim(bucket, now)
+                target.write(offset, key_bytes, key_hash, payload, expires)
+        # Прежняя копия могла лежать в другом классе размеров
+        self._delete(key_bytes, exclude=target)
+        return True
+
+    def _has(self, key_bytes, exclude=None):
+        for table, key_hash, bucket, stripe in self._lookup(key_bytes):
+            if table is exclude:
+                continue
+            with table.locked(stripe):
+                if table.find(key_bytes, key_hash, bucket, time.time()) is not None:
+                    return True
+        return False
+
+    def _delete(self, key_bytes, exclude=None):
+        deleted = False
+        for table, key_hash, bucket, stripe in self._lookup(key_bytes):
+            if table is exclude:
+                continue
+            with table.locked(stripe):
+                offset = table.find(key_bytes, key_hash, bucket, time.time())
+                if offset is not None:
+                    table.delete(offset)
+                    deleted = True
+        return deleted
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._store(self._encode_key(key, version), value, timeout, only_new=True)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._store(self._encode_key(key, version), value, timeout, only_new=False)
+
+    def get(self, key, default=None, version=None):
+        key_bytes = self._encode_key(key, version)
+        for table, key_hash, bucket, stripe in self._lookup(key_bytes):
+            with table.locked(stripe):
+                offset = table.find(key_bytes, key_hash, bucket, time.time())
+                if offset is None:
+                    continue
+                payload = table.read(offset)
+            return pickle.loads(payload)
+        return default
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key_bytes = self._encode_key(key, version)
+        for table, key_hash, bucket, stripe in self._lookup(key_bytes):
+            with table.locked(stripe):
+                offset = table.find(key_bytes, key_hash, bucket, time.time())
+                if offset is not None:
+                    struct.pack_into('<d', table.map, offset + 8, self._expires(timeout))
+                    return True
+        return False
+
+    def delete(self, key, version=None):
+        return self._delete(self._encode_key(key, version))
+
+    def has_key(self, key, version=None):
+        return self._has(self._encode_key(key, version))
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарное увеличение: чтение и запись под одной блокировкой корзины"""
+        key_bytes = self._encode_key(key, version)
+        for table, key_hash, bucket, stripe in self._lookup(key_bytes):
+            with table.locked(stripe):
+                offset = table.find(key_bytes, key_hash, bucket, time.time())
+                if offset is None:
+                    continue
+                value = pickle.loads(table.read(offset)) + delta
+                payload = pickle.dumps(value, self.pickle_protocol)
+                if SLOT_HEADER.size + len(key_bytes) + len(payload) > table.slot_size:
+                    raise ValueError('Значение не помещается в слот кеша')
+                table.write(offset, key_bytes, key_hash, payload, table.expires(offset))
+            return value
+        raise ValueError("Key '%s' not found" % key)
+
+    def clear(self):
+        for table in self._tables_for_use():
+            with table.locked_all():
+                table.clear()
@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+
+from games.jobs import enqueue
+from .overload import monitor, tier_for
+from .ratelimit import check_rate_limit, too_many_requests
+from .routers import pin_to_primary
+
+
+class PrimaryPinMiddleware:
+    """После записи закрепляет пользователя за основной БД (read-your-writes)"""
+
+    UNSAFE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if request.method in self.UNSAFE_METHODS and response.status_code < 500:
+            pin_to_primary(response)
+
+        return response
+
+
+class LoadSheddingMiddleware:
+    """Защита процесса от перегрузки.
+
+    Считает запросы в работе и, когда их больше порога приоритета
+    (LOAD_SHED_TIERS/LOAD_SHED_THRESHOLDS), отвечает 503 вместо выполнения
+    представления. AJAX-счетчики из LOAD_SHED_DEFERRED не теряются: запись
+    уходит в фоновую очередь, клиент получает 202.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        monitor.enter()
+        try:
+            return self.get_response(request)
+        finally:
+            monitor.leave()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        url_name = request.resolver_match.url_name
+        tier = tier_for(url_name)
+        if not monitor.should_shed(tier):
+            return None
+
+        job_name = settings.LOAD_SHED_DEFERRED.get(url_name)
+        if job_name and self.is_deferrable(request):
+            return self.defer(request, url_name, job_name, view_kwargs)
+
+        monitor.record_shed(tier)
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            response = JsonResponse({'success': False, 'error': 'Сервер перегружен'}, status=503)
+        else:
+            response = HttpResponse('Сервер перегружен, попробуйте позже', status=503)
+        response['Retry-After'] = '1'
+        return response
+
+    @staticmethod
+    def is_deferrable(request):
+        return (
+            request.method == 'POST'
+            and request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+            and request.user.is_authenticated
+        )
+
+    def defer(self, request, url_name, job_name, view_kwargs):
+        # Отложенная запись минует декораторы представления - лимит проверяем здесь
+        retry_after = check_rate_limit(request, url_name)
+        if retry_after:
+            return too_many_requests(request, retry_after)
+
+        enqueue(job_name, {**view_kwargs, 'user_id': request.user.pk, 'data': request.POST.dict()})
+        monitor.record_deferred(url_name)
+        return JsonResponse({'success': True, 'deferred': True}, status=202)
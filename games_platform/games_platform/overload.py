@@ -0,0 +1,74 @@
+import threading
+from collections import Counter
+
+from django.conf import settings
+
+TIERS = ('critical', 'normal', 'low')
+
+
+def tier_for(url_name):
+    """Приоритет запроса по имени URL (LOAD_SHED_TIERS), по умолчанию 'normal'"""
+    for tier, names in settings.LOAD_SHED_TIERS.items():
+        if url_name in names:
+            return tier
+    return 'normal'
+
+
+class LoadMonitor:
+    """Счетчики нагрузки одного процесса: запросы в работе и отказы по приоритетам"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.inflight = 0
+            self.peak = 0
+            self.requests = 0
+            self.shed = Counter()
+            self.deferred = Counter()
+
+    def enter(self):
+        with self._lock:
+            self.inflight += 1
+            self.requests += 1
+            self.peak = max(self.peak, self.inflight)
+
+    def leave(self):
+        with self._lock:
+            self.inflight -= 1
+
+    def should_shed(self, tier):
+        """Приоритет отбрасывается, когда запросов в работе больше его доли LOAD_SHED_MAX_INFLIGHT.
+
+        Текущий запрос уже учтен в inflight, поэтому сравнение строгое.
+        """
+        threshold = settings.LOAD_SHED_THRESHOLDS.get(tier)
+        if threshold is None:
+            return False
+        return self.inflight > settings.LOAD_SHED_MAX_INFLIGHT * threshold
+
+    def record_shed(self, tier):
+        with self._lock:
+            self.shed[tier] += 1
+
+    def record_deferred(self, url_name):
+        with self._lock:
+            self.deferred[url_name] += 1
+
+    def metrics(self):
+        """Метрики в текстовом формате Prometheus"""
+        with self._lock:
+            lines = [
+                f'load_inflight_requests {self.inflight}',
+                f'load_inflight_peak {self.peak}',
+                f'load_inflight_limit {settings.LOAD_SHED_MAX_INFLIGHT}',
+                f'load_requests_total {self.requests}',
+            ]
+            lines += [f'load_shed_total{{tier="{tier}"}} {self.shed[tier]}' for tier in TIERS]
+            lines += [f'load_deferred_total{{view="{name}"}} {count}' for name, count in sorted(self.deferred.items())]
+        return '\n'.join(lines) + '\n'
+
+
+monitor = LoadMonitor()
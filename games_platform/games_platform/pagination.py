@@ -0,0 +1,62 @@
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Max, QuerySet
+from django.utils.functional import cached_property
+
+
+def estimated_row_count(model, using='default'):
+    """Примерное число строк таблицы без COUNT(*) или None, если оценки нет.
+
+    PostgreSQL и MySQL хранят оценку в статистике планировщика, SQLite - в
+    sqlite_stat1 после ANALYZE. Иначе берется MAX(pk): это поиск по индексу,
+    а удаленные строки дают только завышение.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    queries = {
+        'postgresql': ('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table]),
+        'mysql': (
+            'SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+            [table],
+        ),
+        'sqlite': ('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table]),
+    }
+    if connection.vendor in queries:
+        sql, params = queries[connection.vendor]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                row = cursor.fetchone()
+        except DatabaseError:
+            # sqlite_stat1 появляется только после ANALYZE
+            row = None
+        if row and row[0] is not None:
+            estimate = int(str(row[0]).split()[0])
+            # reltuples = -1: таблицу еще не анализировали
+            if estimate >= 0:
+                return estimate
+
+    if model._meta.pk.get_internal_type() in ('AutoField', 'BigAutoField', 'SmallAutoField'):
+        return model._default_manager.using(using).aggregate(max_pk=Max('pk'))['max_pk'] or 0
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator для списков админки на больших таблицах.
+
+    Для списка без фильтров точный COUNT(*) заменяется estimated_row_count;
+    пока таблица меньше exact_count_limit строк, число считается точно.
+    С поиском и фильтрами - обычный COUNT по индексам фильтра. Номер
+    последней страницы при оценке приблизителен.
+    """
+    exact_count_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet) or queryset.query.where:
+            return super().count
+        estimate = estimated_row_count(queryset.model, queryset.db)
+        if estimate is None or estimate < self.exact_count_limit:
+            return super().count
+        return estimate
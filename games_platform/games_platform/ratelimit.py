@@ -0,0 +1,154 @@
+import math
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'10/m' -> (10, 60)"""
+    limit, period = rate.split('/')
+    return int(limit), PERIODS[period]
+
+
+def client_ip(request):
+    """IP клиента: REMOTE_ADDR или, за NUM_PROXIES доверенными прокси, адрес из X-Forwarded-For.
+
+    Левые записи X-Forwarded-For присылает сам клиент - берется запись,
+    которую добавил ближайший к клиенту доверенный прокси.
+    """
+    num_proxies = settings.NUM_PROXIES
+    if num_proxies:
+        hops = [hop.strip() for hop in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if hop.strip()]
+        if len(hops) >= num_proxies:
+            return hops[-num_proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+class LocalTokenBuckets:
+    """Token bucket в памяти процесса: быстрый путь без сети и БД"""
+    max_keys = 100000
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, period):
+        """Списать токен; вернуть 0 или через сколько секунд повторить"""
+        refill_rate = limit / period
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (limit, now))
+            tokens = min(limit, tokens + (now - updated) * refill_rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                retry_after = 0
+            else:
+                self._buckets[key] = (tokens, now)
+                retry_after = (1 - tokens) / refill_rate
+
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        return retry_after
+
+    def _prune(self, now):
+        # Корзины старше суток наверняка полны - их можно забыть
+        stale = [k for k, (_, updated) in self._buckets.items() if now - updated > PERIODS['d']]
+        for k in stale:
+            del self._buckets[k]
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheSlidingWindow:
+    """Скользящее окно на общем кеше (один счетчик на окно + вес предыдущего окна)"""
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def hit(self, key, limit, period):
+        cache = caches[self.alias]
+        now = time.time()
+        window = int(now // period)
+        current_key = f'ratelimit:{key}:{window}'
+        cache.add(current_key, 0, period * 2)
+        try:
+            current = cache.incr(current_key)
+        except ValueError:
+            cache.set(current_key, 1, period * 2)
+            current = 1
+        previous = cache.get(f'ratelimit:{key}:{window - 1}', 0)
+
+        elapsed = now - window * period
+        estimated = previous * (1 - elapsed / period) + current
+        if estimated <= limit:
+            return 0
+        return period - elapsed
+
+
+local_buckets = LocalTokenBuckets()
+
+
+def _check(key, limit, period):
+    retry_after = local_buckets.hit(key, limit, period)
+    if retry_after:
+        return retry_after
+
+    shared_alias = getattr(settings, 'RATE_LIMIT_SHARED_CACHE', None)
+    if shared_alias:
+        return CacheSlidingWindow(shared_alias).hit(key, limit, period)
+    return 0
+
+
+def too_many_requests(request, retry_after):
+    retry_after = max(1, math.ceil(retry_after))
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        response = JsonResponse({'success': False, 'error': 'Слишком много запросов'}, status=429)
+    else:
+        response = HttpResponse('Слишком много запросов, попробуйте позже', status=429)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def check_rate_limit(request, scope):
+    """Списать запрос из лимита scope; вернуть 0 или через сколько секунд повторить"""
+    rate = getattr(settings, 'RATE_LIMITS', {}).get(scope)
+    if rate is None:
+        return 0
+
+    limit, period = parse_rate(rate)
+    keys = [f'{scope}:ip:{client_ip(request)}']
+    user_id = request.session.get(SESSION_KEY)
+    if user_id is not None:
+        keys.append(f'{scope}:user:{user_id}')
+    return max(_check(key, limit, period) for key in keys)
+
+
+def rate_limit(scope, methods=('POST',)):
+    """Ограничение частоты запросов к представлению по пользователю и IP.
+
+    Лимит берется из settings.RATE_LIMITS[scope] (например, '10/m').
+    Пользователь определяется по ID в сессии, поэтому отказ с 429
+    не обращается к ORM.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method in methods:
+                retry_after = check_rate_limit(request, scope)
+                if retry_after:
+                    return too_many_requests(request, retry_after)
+
+            return view_func(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
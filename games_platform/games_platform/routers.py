@@ -0,0 +1,83 @@
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Флаг "читать из реплики" для текущего запроса
+_use_replica = ContextVar('use_replica', default=False)
+
+PIN_COOKIE_NAME = 'primary_pin'
+
+
+def get_replica_alias():
+    """Алиас реплики, если она настроена"""
+    alias = getattr(settings, 'REPLICA_DATABASE', None)
+    if alias and alias in settings.DATABASES:
+        return alias
+    return None
+
+
+def is_pinned_to_primary(request):
+    """Пользователь недавно писал в базу и должен читать с основной БД"""
+    pinned_until = request.COOKIES.get(PIN_COOKIE_NAME)
+    if not pinned_until:
+        return False
+    try:
+        return float(pinned_until) > time.time()
+    except ValueError:
+        return False
+
+
+def pin_to_primary(response):
+    """Закрепляем пользователя за основной БД на REPLICA_PIN_SECONDS"""
+    pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+    response.set_cookie(
+        PIN_COOKIE_NAME,
+        str(time.time() + pin_seconds),
+        max_age=pin_seconds,
+        httponly=True,
+        samesite='Lax',
+    )
+    return response
+
+
+def read_from_replica(view_func):
+    """Декоратор для read-only представлений: чтения уходят на реплику"""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        # Внутри открытой транзакции реплика не увидит наши же изменения
+        if (get_replica_alias() is None or is_pinned_to_primary(request)
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return view_func(request, *args, **kwargs)
+
+        token = _use_replica.set(True)
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+
+    return wrapper
+
+
+class PrimaryReplicaRouter:
+    """Чтения каталога идут на реплику, все записи - на основную БД"""
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get():
+            return get_replica_alias()
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика содержит те же данные, что и основная БД
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схему реплики переносит репликация, а не migrate
+        if db == get_replica_alias():
+            return False
+        return None
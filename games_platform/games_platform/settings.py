@@ -1,3 +1,4 @@
+import tempfile
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -26,9 +27,11 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'games_platform.middleware.LoadSheddingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'accounts.middleware.LastIPMiddleware',
+    'games_platform.middleware.PrimaryPinMiddleware',
 ]
 
 ROOT_URLCONF = 'games_platform.urls'
@@ -56,9 +59,24 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # Реплика для чтения каталога. Локально - второе подключение к тому же файлу,
+    # в тестах - зеркало тестовой базы default
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
 }
 
+DATABASE_ROUTERS = ['games_platform.routers.PrimaryReplicaRouter']
+
+# Алиас реплики и время (сек), на которое пользователь после записи читает с основной БД
+REPLICA_DATABASE = 'replica'
+REPLICA_PIN_SECONDS = 5
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -81,9 +99,20 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# collectstatic кладет файлы с хешем в имени, их .gz/.br копии и staticfiles.json
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'games_platform.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Указываем кастомную модель пользователя
@@ -93,3 +122,122 @@ AUTH_USER_MODEL = 'accounts.CustomUser'
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
+
+# Кеши: default - в памяти процесса; shared - общий для всех воркеров хоста кеш в файлах в памяти
+# (games_platform.cache.SharedMemoryCache), например для общего лимита частоты: RATE_LIMIT_SHARED_CACHE = 'shared'.
+# Значения раскладываются по классам размеров слотов; что больше самого крупного слота, не кешируется
+# (предупреждение в логе games_platform.cache). Прежде чем переносить на него default, проверьте, что
+# страницы кеша (PAGE_CACHE_TIMEOUT) помещаются в крупный класс. Смена SIZE_CLASSES - только с новым LOCATION
+# или после остановки всех процессов и удаления файлов
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'games_platform.cache.SharedMemoryCache',
+        'LOCATION': str(Path(tempfile.gettempdir()) / 'games_platform.cache'),
+        'OPTIONS': {'SIZE_CLASSES': [(256, 8192), (2048, 4096), (16384, 1024)]},
+    },
+}
+# Алиас кеша для версий закешированных данных (страницы, аналитика, индексы каталога): сами данные
+# лежат в default, а версия должна быть общей, иначе сброс в одном воркере не увидят остальные.
+# shared общий для процессов одного хоста; на нескольких хостах - алиас сетевого кеша
+VERSION_CACHE = 'shared'
+
+# Шардированные счетчики статистики игр: число шардов на игру и время жизни закешированных сумм (сек)
+GAME_STAT_SHARDS = 8
+GAME_STAT_CACHE_TIMEOUT = 30
+
+# Сессии в подписанных cookie и пользователь из кеша: запросы с авторизацией не ходят в БД за сессией и request.user
+SESSION_ENGINE = 'django.contrib.sessions.backends.signed_cookies'
+AUTHENTICATION_BACKENDS = ['accounts.backends.CachedModelBackend']
+USER_CACHE_TIMEOUT = 60
+
+# Время жизни кеша страниц для анонимных пользователей (сек)
+PAGE_CACHE_TIMEOUT = 60
+
+# Размер порции фонового удаления игр и пользователей (строк за транзакцию)
+DELETION_BATCH_SIZE = 500
+
+# Сборщик осиротевших медиафайлов не трогает файлы моложе этого возраста (часы)
+MEDIA_GC_GRACE_HOURS = 24
+
+# Время жизни кеша аналитики разработчика (сек); сбрасывается при изменении статистики его игр
+DASHBOARD_CACHE_TIMEOUT = 300
+
+# Недавно запущенные игры пользователя: длина списка
+RECENTLY_PLAYED_LIMIT = 10
+
+# Период сводки работы модераторов по умолчанию (дни)
+MODERATION_SUMMARY_DAYS = 30
+
+# Автодополнение названий в поиске каталога: число подсказок и период обновления популярности в индексе (сек)
+AUTOCOMPLETE_LIMIT = 8
+AUTOCOMPLETE_REFRESH = 300
+# Период перестройки индекса тегов каталога, если версия каталога не менялась (сек)
+TAG_INDEX_REFRESH = 300
+
+# Облачные сохранения игр: предел размера состояния слота (байт JSON) и число слотов на игру;
+# после SAVE_MAX_PATCHES патчей подряд состояние сворачивается в новый снимок
+SAVE_MAX_BYTES = 256 * 1024
+SAVE_MAX_SLOTS = 10
+SAVE_MAX_PATCHES = 32
+
+# Ограничение частоты записи: не больше N запросов за период (s/m/h/d) на пользователя и на IP.
+# Счет ведется в памяти процесса; RATE_LIMIT_SHARED_CACHE - алиас кеша для общего лимита между процессами
+RATE_LIMITS = {
+    'add_comment': '10/m',
+    'rate_game': '20/m',
+    'toggle_like': '30/m',
+    'increment_play_count': '60/m',
+    'game_save': '120/m',
+}
+RATE_LIMIT_SHARED_CACHE = None
+# Число доверенных обратных прокси перед приложением: только тогда IP клиента берется из X-Forwarded-For
+NUM_PROXIES = 0
+
+# Живые обновления страницы игры (server-sent events). Включать только под ASGI-сервером:
+# под WSGI каждый открытый поток занимает рабочий поток. Хаб событий живет в памяти процесса,
+# поэтому изменения, обработанные другими процессами, в поток не попадают
+LIVE_UPDATES = False
+# Не чаще одной пачки за интервал (сек), история пачек для переподключившихся, пинг (сек)
+LIVE_UPDATE_INTERVAL = 1.0
+LIVE_HISTORY = 32
+LIVE_MAX_COMMENTS = 20
+LIVE_HEARTBEAT = 15
+LIVE_RETRY_MS = 3000
+
+# Рейтинг популярных игр по уникальным зрителям считается за последние N дней
+POPULAR_UNIQUE_DAYS = 7
+
+# Байесовский рейтинг игр: (MEAN * WEIGHT + сумма оценок) / (WEIGHT + число оценок).
+# После изменения пересчитать: python manage.py update_rating_scores
+RATING_PRIOR_MEAN = 3.0
+RATING_PRIOR_WEIGHT = 10
+
+# Фоновая очередь задач в БД (python manage.py run_jobs): попытки, экспоненциальная задержка повторов (сек),
+# через сколько секунд задача упавшего воркера возвращается в очередь, пауза опроса пустой очереди
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BASE_SECONDS = 10
+JOB_RETRY_MAX_SECONDS = 3600
+JOB_LOCK_TIMEOUT = 600
+JOB_POLL_INTERVAL = 1.0
+
+# Защита от перегрузки (LoadSheddingMiddleware): предел запросов в работе на процесс;
+# приоритет отбрасывается, когда их больше доли предела из THRESHOLDS (critical - никогда)
+LOAD_SHED_MAX_INFLIGHT = 32
+LOAD_SHED_THRESHOLDS = {'low': 0.5, 'normal': 1.0}
+LOAD_SHED_TIERS = {
+    'critical': ['login', 'logout', 'load_metrics', 'moderation_list', 'moderate_game'],
+    'low': [
+        'increment_play_count', 'toggle_like', 'export_stats', 'developer_dashboard',
+        'developer_dashboard_for', 'api_game_stats', 'moderation_summary',
+    ],
+}
+# Счетчики, запись которых при перегрузке откладывается в очередь задач (ответ 202)
+LOAD_SHED_DEFERRED = {
+    'increment_play_count': 'games.deferred_play_count',
+    'toggle_like': 'games.deferred_like',
+}
+# Адреса, с которых доступны метрики /metrics/load/
+INTERNAL_IPS = ['127.0.0.1']
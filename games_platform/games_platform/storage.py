@@ -0,0 +1,57 @@
+import gzip
+from urllib.parse import unquote, urlsplit
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Хеширование имен (manifest) + заранее сжатые .gz/.br копии.
+
+    Все делается в collectstatic; brotli - необязательная зависимость.
+    """
+    compress_extensions = ('.css', '.js', '.svg', '.html', '.json', '.txt')
+    # Файл вне manifest хешируется на лету, а не дает ValueError
+    manifest_strict = False
+    compress_min_size = 256
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+
+        if dry_run:
+            return
+
+        for hashed_name in set(self.hashed_files.values()):
+            if hashed_name.endswith(self.compress_extensions):
+                self.compress_file(hashed_name)
+
+    def compress_file(self, name):
+        with self.open(name) as f:
+            content = f.read()
+
+        if len(content) < self.compress_min_size:
+            return
+
+        variants = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['.br'] = brotli.compress(content)
+
+        for suffix, compressed in variants.items():
+            # Сжатая копия нужна, только если она действительно меньше
+            if len(compressed) >= len(content):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
+
+    def stored_name(self, name):
+        clean_name = urlsplit(unquote(name)).path.strip()
+        if self.hash_key(clean_name) not in self.hashed_files and not self.exists(clean_name):
+            # collectstatic еще не запускался (разработка, тесты) - отдаем исходное имя
+            return name
+        return super().stored_name(name)
@@ -1,10 +1,15 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from .views import load_metrics, serve_static
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('accounts.urls')),
     path('', include('games.urls')),
+    path('metrics/load/', load_metrics, name='load_metrics'),
+    # Собранная статика (в DEBUG ее перехватывает runserver)
+    re_path(r'^%s(?P<path>.+)$' % settings.STATIC_URL.lstrip('/'), serve_static, name='static'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
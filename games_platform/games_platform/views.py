@@ -0,0 +1,96 @@
+import mimetypes
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from games.jobs import queue_stats
+from .overload import monitor
+from .ratelimit import client_ip
+
+# Варианты, которые готовит CompressedManifestStaticFilesStorage, в порядке предпочтения
+PRECOMPRESSED_VARIANTS = (
+    ('br', '.br'),
+    ('gzip', '.gz'),
+)
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def is_hashed_static_name(path):
+    """Имя файла с хешем содержимого из манифеста collectstatic"""
+    return path in getattr(staticfiles_storage, 'hashed_files', {}).values()
+
+
+def accepted_encodings(header):
+    """Кодировка -> q из Accept-Encoding; q=0 - явный отказ от кодировки"""
+    weights = {}
+    for item in header.split(','):
+        token, *params = [part.strip() for part in item.split(';')]
+        if not token:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[token.lower()] = q
+    return weights
+
+
+def serve_static(request, path):
+    """Отдача собранной статики: сжатые варианты и immutable для хешированных имен"""
+    try:
+        if not staticfiles_storage.exists(path):
+            raise Http404('Файл не найден')
+    except SuspiciousFileOperation:
+        raise Http404('Файл не найден')
+
+    weights = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+    served_name, content_encoding = path, None
+    for encoding, suffix in PRECOMPRESSED_VARIANTS:
+        accepted = weights.get(encoding, weights.get('*', 0)) > 0
+        if accepted and staticfiles_storage.exists(path + suffix):
+            served_name, content_encoding = path + suffix, encoding
+            break
+
+    content_type, _ = mimetypes.guess_type(path)
+    response = FileResponse(
+        staticfiles_storage.open(served_name),
+        content_type=content_type or 'application/octet-stream',
+    )
+    if content_encoding:
+        response.headers['Content-Encoding'] = content_encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+
+    if is_hashed_static_name(path):
+        # Имя меняется вместе с содержимым, поэтому файл можно кешировать навсегда
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, no_cache=True)
+
+    return response
+
+
+def load_metrics(request):
+    """Метрики нагрузки процесса и глубина очереди задач (Prometheus) для INTERNAL_IPS и администраторов"""
+    # client_ip берет X-Forwarded-For только от NUM_PROXIES доверенных прокси: за прокси
+    # REMOTE_ADDR - адрес самого прокси, а заголовок без прокси подделывает клиент
+    allowed = client_ip(request) in settings.INTERNAL_IPS or (
+        request.user.is_authenticated and request.user.is_admin()
+    )
+    if not allowed:
+        raise Http404
+
+    lines = [monitor.metrics()]
+    for status, count in sorted(queue_stats().items()):
+        if status == 'oldest_ready_age':
+            lines.append(f'job_queue_oldest_ready_seconds {count:.0f}\n')
+        else:
+            lines.append(f'job_queue_depth{{status="{status}"}} {count}\n')
+    return HttpResponse(''.join(lines), content_type='text/plain; version=0.0.4')
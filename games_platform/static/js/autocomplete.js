@@ -0,0 +1,94 @@
+// Подсказки названий игр в поиске каталога из GET /api/v1/games/suggest/?q=
+(function() {
+    const DELAY_MS = 100;
+
+    function attach(input) {
+        const url = input.dataset.suggestUrl;
+        const list = document.getElementById(input.getAttribute('aria-controls'));
+        const answers = new Map();  // запрос -> подсказки, повторный ввод не ходит на сервер
+        let timer = null;
+        let controller = null;
+        let active = -1;
+
+        function render(results) {
+            list.innerHTML = '';
+            active = -1;
+            results.forEach(game => {
+                const item = document.createElement('li');
+                const link = document.createElement('a');
+                link.href = game.url;
+                link.textContent = game.title;
+                item.appendChild(link);
+                list.appendChild(item);
+            });
+            list.hidden = results.length === 0;
+        }
+
+        function highlight(index) {
+            const items = list.querySelectorAll('li');
+            if (!items.length) {
+                return;
+            }
+            active = (index + items.length) % items.length;
+            items.forEach((item, i) => item.classList.toggle('active', i === active));
+        }
+
+        function load(query) {
+            if (answers.has(query)) {
+                render(answers.get(query));
+                return;
+            }
+            if (controller) {
+                controller.abort();
+            }
+            controller = new AbortController();
+            fetch(`${url}?q=${encodeURIComponent(query)}`, {
+                headers: {'Accept': 'application/json'},
+                signal: controller.signal,
+            })
+                .then(response => response.ok ? response.json() : Promise.reject(response.status))
+                .then(data => {
+                    answers.set(query, data.results);
+                    if (input.value.trim() === query) {
+                        render(data.results);
+                    }
+                })
+                .catch(error => {
+                    if (error.name !== 'AbortError') {
+                        console.error('Error:', error);
+                    }
+                });
+        }
+
+        input.addEventListener('input', () => {
+            clearTimeout(timer);
+            const query = input.value.trim();
+            if (!query) {
+                render([]);
+                return;
+            }
+            timer = setTimeout(() => load(query), DELAY_MS);
+        });
+
+        input.addEventListener('keydown', event => {
+            if (list.hidden) {
+                return;
+            }
+            if (event.key === 'ArrowDown' || event.key === 'ArrowUp') {
+                event.preventDefault();
+                highlight(active + (event.key === 'ArrowDown' ? 1 : -1));
+            } else if (event.key === 'Enter' && active >= 0) {
+                event.preventDefault();
+                window.location = list.querySelectorAll('a')[active].href;
+            } else if (event.key === 'Escape') {
+                render([]);
+            }
+        });
+
+        // Клик по подсказке срабатывает раньше blur
+        input.addEventListener('blur', () => setTimeout(() => { list.hidden = true; }, 150));
+        input.addEventListener('focus', () => { list.hidden = list.children.length === 0; });
+    }
+
+    document.querySelectorAll('input[data-suggest-url]').forEach(attach);
+})();
@@ -0,0 +1,132 @@
+// Облачные сохранения для игр в iframe: мост postMessage между игрой и страницей игры.
+//
+// Страница игры: CloudSave.host(iframe, gameId) - запросы игры уходят в /api/v1/games/<id>/saves/.
+// Игра подключает этот же файл и вызывает CloudSave.load/save/patch/remove/list; версии
+// слотов мост помнит сам, при конфликте промис отклоняется с {status: 409, version}.
+const CloudSave = (function() {
+    const TAG = 'cloud-save';
+    const TIMEOUT_MS = 15000;
+
+    // --- Страница игры ---
+
+    function csrfToken() {
+        const match = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]*)/);
+        return match ? decodeURIComponent(match[1]) : '';
+    }
+
+    function host(frame, gameId) {
+        const base = `/api/v1/games/${gameId}/saves/`;
+
+        function request(message) {
+            const slotUrl = base + encodeURIComponent(message.slot || '') + '/';
+            const options = {
+                headers: {'Accept': 'application/json', 'X-CSRFToken': csrfToken()},
+                credentials: 'same-origin',
+            };
+            let url = slotUrl;
+            switch (message.op) {
+                case 'list':
+                    url = base;
+                    break;
+                case 'load':
+                    break;
+                case 'save':
+                case 'patch':
+                    options.method = message.op === 'save' ? 'PUT' : 'PATCH';
+                    options.headers['Content-Type'] = 'application/json';
+                    options.body = JSON.stringify(message.op === 'save'
+                        ? {version: message.version, data: message.data}
+                        : {version: message.version, patch: message.patch});
+                    break;
+                case 'remove':
+                    options.method = 'DELETE';
+                    url = `${slotUrl}?version=${message.version}`;
+                    break;
+                default:
+                    return Promise.resolve({status: 400, body: {error: 'Неизвестная операция'}});
+            }
+            return fetch(url, options).then(response =>
+                response.json().catch(() => ({})).then(body => ({status: response.status, body}))
+            );
+        }
+
+        window.addEventListener('message', event => {
+            const message = event.data;
+            if (event.source !== frame.contentWindow || !message || message.tag !== TAG || !message.op) {
+                return;
+            }
+            request(message)
+                .catch(() => ({status: 0, body: {error: 'Нет связи с сервером'}}))
+                .then(reply => {
+                    // sandbox без allow-same-origin дает игре origin "null"
+                    frame.contentWindow.postMessage({tag: TAG, id: message.id, ...reply}, '*');
+                });
+        });
+    }
+
+    // --- Игра внутри iframe ---
+
+    const versions = {};  // слот -> последняя известная версия
+    const waiting = new Map();  // id запроса -> {resolve, reject, timer}
+    let lastId = 0;
+
+    window.addEventListener('message', event => {
+        const reply = event.data;
+        if (event.source !== window.parent || !reply || reply.tag !== TAG || !waiting.has(reply.id)) {
+            return;
+        }
+        const {resolve, reject, timer} = waiting.get(reply.id);
+        waiting.delete(reply.id);
+        clearTimeout(timer);
+        if (reply.status >= 200 && reply.status < 300) {
+            resolve(reply.body);
+        } else {
+            reject({status: reply.status, error: reply.body.error, version: reply.body.version});
+        }
+    });
+
+    function call(op, fields) {
+        if (window.parent === window) {
+            return Promise.reject({status: 0, error: 'Игра запущена не на странице платформы'});
+        }
+        const id = ++lastId;
+        return new Promise((resolve, reject) => {
+            const timer = setTimeout(() => {
+                waiting.delete(id);
+                reject({status: 0, error: 'Нет ответа от страницы'});
+            }, TIMEOUT_MS);
+            waiting.set(id, {resolve, reject, timer});
+            window.parent.postMessage({tag: TAG, id, op, ...fields}, '*');
+        });
+    }
+
+    // Ответ записи несет новую версию слота; при конфликте запоминаем текущую
+    function tracked(slot, promise) {
+        return promise.then(body => {
+            versions[slot] = body.result ? body.result.version : 0;
+            return body.result;
+        }, error => {
+            if (error.status === 409) {
+                versions[slot] = error.version;
+            }
+            throw error;
+        });
+    }
+
+    return {
+        host,
+        list: () => call('list', {}).then(body => body.results),
+        // Состояние слота или null, если слота нет
+        load: slot => tracked(slot, call('load', {slot})).then(result => result.data, error => {
+            if (error.status === 404) {
+                versions[slot] = 0;
+                return null;
+            }
+            throw error;
+        }),
+        save: (slot, data) => tracked(slot, call('save', {slot, data, version: versions[slot] || 0})),
+        // Частичное изменение: {key: value} меняет поле, {key: null} удаляет
+        patch: (slot, changes) => tracked(slot, call('patch', {slot, patch: changes, version: versions[slot] || 0})),
+        remove: slot => tracked(slot, call('remove', {slot, version: versions[slot] || 0})),
+    };
+})();
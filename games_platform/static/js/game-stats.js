@@ -0,0 +1,64 @@
+// Пакетное получение счетчиков игр: запросы за один такт собираются в один GET /api/v1/games/stats/
+const GameStats = (function() {
+    const URL = '/api/v1/games/stats/';
+    const MAX_IDS = 300;
+    const DELAY_MS = 50;
+
+    let pending = new Map();  // id игры -> список ожидающих промисов
+    let timer = null;
+
+    function flush() {
+        const batch = pending;
+        pending = new Map();
+        timer = null;
+
+        const ids = Array.from(batch.keys());
+        for (let i = 0; i < ids.length; i += MAX_IDS) {
+            const chunk = ids.slice(i, i + MAX_IDS);
+            fetch(`${URL}?ids=${chunk.join(',')}`, {headers: {'Accept': 'application/json'}})
+                .then(response => response.ok ? response.json() : Promise.reject(response.status))
+                .then(data => {
+                    chunk.forEach(id => {
+                        const stats = data.results[id] || null;
+                        batch.get(id).forEach(({resolve}) => resolve(stats));
+                    });
+                })
+                .catch(error => {
+                    chunk.forEach(id => batch.get(id).forEach(({reject}) => reject(error)));
+                });
+        }
+    }
+
+    // Счетчики одной игры (null, если игра недоступна)
+    function get(gameId) {
+        const id = String(gameId);
+        return new Promise((resolve, reject) => {
+            if (!pending.has(id)) {
+                pending.set(id, []);
+            }
+            pending.get(id).push({resolve, reject});
+            if (timer === null) {
+                timer = setTimeout(flush, DELAY_MS);
+            }
+        });
+    }
+
+    // Обновить все карточки с data-stats-game-id: значения пишутся в дочерние [data-stat]
+    function refreshCards(root = document) {
+        root.querySelectorAll('[data-stats-game-id]').forEach(card => {
+            get(card.dataset.statsGameId).then(stats => {
+                if (!stats) {
+                    return;
+                }
+                card.querySelectorAll('[data-stat]').forEach(element => {
+                    const value = stats[element.dataset.stat];
+                    if (value !== undefined) {
+                        element.textContent = value;
+                    }
+                });
+            }).catch(error => console.error('Error:', error));
+        });
+    }
+
+    return {get, refreshCards};
+})();
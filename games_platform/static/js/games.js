@@ -1,12 +1,17 @@
 // Функции для работы с играми
 document.addEventListener('DOMContentLoaded', function() {
 
+    // Живые обновления страницы игры (server-sent events)
+    startLiveUpdates(document.querySelector('[data-live-url]'));
+
     // Лайки/дизлайки
     const likeButtons = document.querySelectorAll('.like-btn, .dislike-btn');
     likeButtons.forEach(button => {
         button.addEventListener('click', function() {
             const gameId = this.dataset.gameId;
             const action = this.dataset.action;
+            const stat = `${action}s`;
+            expectOwnUpdate(stat);
 
             fetch(`/games/${gameId}/toggle-like/`, {
                 method: 'POST',
@@ -19,17 +24,13 @@ document.addEventListener('DOMContentLoaded', function() {
             })
             .then(response => response.json())
             .then(data => {
-                if (data.success) {
-                    // Обновляем счетчики
-                    const likeBtn = document.querySelector(`.like-btn[data-game-id="${gameId}"]`);
-                    const dislikeBtn = document.querySelector(`.dislike-btn[data-game-id="${gameId}"]`);
-
-                    if (likeBtn) {
-                        likeBtn.querySelector('.like-count').textContent = data.likes;
-                    }
-                    if (dislikeBtn) {
-                        dislikeBtn.querySelector('.dislike-count').textContent = data.dislikes;
-                    }
+                if (!data.success || data.deferred) {
+                    // Отказ или отложенный лайк: изменение придет только из потока (если вообще придет)
+                    forgetOwnUpdate(stat);
+                } else {
+                    // Счетчики из ответа точны; то же изменение из потока будет пропущено
+                    setStat('likes', data.likes);
+                    setStat('dislikes', data.dislikes);
 
                     // Визуальная обратная связь
                     this.classList.add('active');
@@ -39,6 +40,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 }
             })
             .catch(error => {
+                forgetOwnUpdate(stat);
                 console.error('Error:', error);
             });
         });
@@ -57,6 +59,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
             // Отправляем запрос на увеличение счетчика
             const gameId = window.location.pathname.split('/').filter(p => p).pop();
+            expectOwnUpdate('plays');
 
             fetch(`/games/${gameId}/increment-play/`, {
                 method: 'POST',
@@ -70,13 +73,13 @@ document.addEventListener('DOMContentLoaded', function() {
             .then(data => {
                 if (data.success && data.play_count !== undefined) {
                     // Обновляем счетчик на странице
-                    const playCountElement = document.querySelector('.play-count');
-                    if (playCountElement) {
-                        playCountElement.textContent = `Запусков: ${data.play_count}`;
-                    }
+                    setStat('plays', data.play_count);
+                } else {
+                    forgetOwnUpdate('plays');
                 }
             })
             .catch(error => {
+                forgetOwnUpdate('plays');
                 console.error('Error:', error);
             });
         });
@@ -142,6 +145,86 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 });
 
+// Собственные действия страницы, которые еще придут из потока: счетчик -> сроки ожидания.
+// Ответ на свой POST уже показал точное значение, поэтому столько же единиц из потока пропускается.
+// Действие мог обработать другой процесс, чей хаб в этот поток не пишет - ожидание ограничено сроком.
+const OWN_UPDATE_TTL_MS = 10000;
+const ownUpdates = {};
+
+function expectOwnUpdate(name) {
+    (ownUpdates[name] = ownUpdates[name] || []).push(Date.now() + OWN_UPDATE_TTL_MS);
+}
+
+function forgetOwnUpdate(name) {
+    (ownUpdates[name] || []).shift();
+}
+
+// Часть изменения из потока, которая не является нашим же действием
+function foreignDelta(name, delta) {
+    const now = Date.now();
+    const pending = (ownUpdates[name] || []).filter(expires => expires > now);
+    const skipped = Math.min(pending.length, Math.max(delta, 0));
+    ownUpdates[name] = pending.slice(skipped);
+    return delta - skipped;
+}
+
+function setStat(name, value) {
+    document.querySelectorAll(`[data-live-stat="${name}"]`).forEach(element => {
+        element.textContent = value;
+    });
+}
+
+// Подписка на обновления игры: к счетчикам прибавляются изменения, новые комментарии дописываются
+function startLiveUpdates(container) {
+    if (!container || !window.EventSource) {
+        return null;
+    }
+
+    const source = new EventSource(container.dataset.liveUrl);
+
+    source.addEventListener('update', function(event) {
+        const batch = JSON.parse(event.data);
+
+        Object.entries(batch.stats || {}).forEach(([name, total]) => {
+            const delta = foreignDelta(name, total);
+            if (!delta) {
+                return;
+            }
+            document.querySelectorAll(`[data-live-stat="${name}"]`).forEach(element => {
+                element.textContent = (parseInt(element.textContent, 10) || 0) + delta;
+            });
+        });
+
+        const list = document.querySelector('.comments-list');
+        (batch.comments || []).forEach(comment => {
+            if (!list || document.getElementById(`comment-${comment.id}`)) {
+                return;
+            }
+            const empty = list.querySelector('.no-comments');
+            if (empty) {
+                empty.remove();
+            }
+
+            const element = document.createElement('div');
+            element.className = 'comment';
+            element.id = `comment-${comment.id}`;
+            const author = document.createElement('div');
+            author.className = 'comment-header author-name';
+            author.textContent = comment.user;
+            const text = document.createElement('div');
+            text.className = 'comment-text';
+            text.textContent = comment.text;
+            element.append(author, text);
+            list.prepend(element);
+        });
+    });
+
+    // Пропущено слишком много обновлений - перечитываем страницу
+    source.addEventListener('resync', () => window.location.reload());
+
+    return source;
+}
+
 // Вспомогательная функция для получения CSRF токена
 function getCookie(name) {
     let cookieValue = null;